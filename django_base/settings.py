@@ -172,4 +172,48 @@ DEFAULT_FROM_EMAIL = 'AIT Anzoátegui <asebastianbrito@gmail.com>'
 
 # URLs de redirección después del reset
 LOGIN_REDIRECT_URL = '/'
-LOGOUT_REDIRECT_URL = '/login/'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/login/'
+
+# Caché compartida por todos los procesos del servidor (resultados de encuestas, contenido
+# del sitio, páginas públicas y avance de respaldos). Con varios servidores usar Redis:
+# CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'}}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+# Caché de resultados de encuestas
+# Segundos que se reutilizan los resultados de una encuesta ACTIVA (las CERRADAS no vencen)
+POLL_RESULTS_CACHE_TTL = 30
+
+# Tamaño máximo en bytes de la caché de gráficas de los reportes PDF (MEDIA_ROOT/report_charts)
+PDF_CHART_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Exportación de reportes PDF en segundo plano
+REPORTS_ROOT = BASE_DIR / 'reports'  # PDF generados (se sirven solo mediante vistas con permisos)
+REPORT_EXPORT_WORKERS = 2  # Hilos por proceso que generan reportes
+REPORT_BULK_EXPORT_PROCESSES = 2  # Procesos que generan reportes en la exportación masiva (ZIP)
+REPORT_JOB_RETENTION_DAYS = 7  # Días que se conservan los trabajos terminados y sus PDF (prune_reports)
+
+# Caché del contenido del sitio (imágenes de Inicio/Acerca de y slides del carousel)
+# Cada cambio lo invalida en todos los procesos al confirmarse; este vencimiento es solo de seguridad
+SITE_CONTENT_CACHE_TTL = 300
+
+# Segundos que se sirven desde la caché Inicio, Acerca de y Contacto a visitantes anónimos
+# (un cambio en el contenido del sitio publica la página nueva en cuanto se confirma)
+PUBLIC_PAGE_CACHE_TTL = 600
+
+# Compresión de los respaldos de base de datos: 'gz' (rápida) o 'xz' (archivos más pequeños)
+BACKUP_COMPRESSION = 'gz'
+
+# Minutos tras los que un respaldo o restauración sin terminar libera el candado
+# (el proceso que lo ejecutaba se detuvo)
+BACKUP_JOB_STALE_MINUTES = 120
+
+# Retención de respaldos (comando prune_backups): se conserva el último respaldo
+# de cada uno de los últimos N días y M semanas con respaldos
+BACKUP_KEEP_DAILY = 7
+BACKUP_KEEP_WEEKLY = 4
@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.forms import UserChangeForm, UserCreationForm
-from .models import User, Rol, Poll, Question, Options, Participation, QuestionDetails, SiteContent
+from django.utils import timezone
+from .models import User, Rol, Poll, Question, Options, Participation, QuestionDetails, OptionTally, SiteContent, ReportJob, BackupJob
 
 # Configuración personalizada para el modelo User
 class CustomUserAdmin(UserAdmin):
@@ -36,34 +37,34 @@ class CustomUserAdmin(UserAdmin):
     
     def activate_users(self, request, queryset):
         """Activar usuarios seleccionados"""
-        count = queryset.update(is_active=True)
+        count = queryset.update(is_active=True, updated_at=timezone.now())
         self.message_user(request, f'{count} usuarios activados')
     activate_users.short_description = "✅ Activar usuarios"
     
     def deactivate_users(self, request, queryset):
         """Desactivar usuarios seleccionados"""
-        count = queryset.update(is_active=False)
+        count = queryset.update(is_active=False, updated_at=timezone.now())
         self.message_user(request, f'{count} usuarios desactivados')
     deactivate_users.short_description = "❌ Desactivar usuarios"
     
     def make_admin(self, request, queryset):
         """Cambiar rol a Administrador"""
         admin_role, created = Rol.objects.get_or_create(name='Administrador')
-        count = queryset.update(rol=admin_role)
+        count = queryset.update(rol=admin_role, updated_at=timezone.now())
         self.message_user(request, f'{count} usuarios cambiados a Administrador')
     make_admin.short_description = "👑 Hacer Administrador"
     
     def make_worker(self, request, queryset):
         """Cambiar rol a Trabajador"""
         worker_role, created = Rol.objects.get_or_create(name='Trabajador')
-        count = queryset.update(rol=worker_role)
+        count = queryset.update(rol=worker_role, updated_at=timezone.now())
         self.message_user(request, f'{count} usuarios cambiados a Trabajador')
     make_worker.short_description = "👔 Hacer Trabajador"
     
     def make_user(self, request, queryset):
         """Cambiar rol a Usuario"""
         user_role, created = Rol.objects.get_or_create(name='Usuario')
-        count = queryset.update(rol=user_role)
+        count = queryset.update(rol=user_role, updated_at=timezone.now())
         self.message_user(request, f'{count} usuarios cambiados a Usuario')
     make_user.short_description = "👤 Hacer Usuario"
 
@@ -117,7 +118,10 @@ admin.site.register(Question, QuestionAdmin)
 admin.site.register(Options)
 admin.site.register(Participation)
 admin.site.register(QuestionDetails)
+admin.site.register(OptionTally)
 admin.site.register(SiteContent, SiteContentAdmin)
+admin.site.register(ReportJob)
+admin.site.register(BackupJob)
 
 # Personalizar títulos del admin
 admin.site.site_header = "AIT Anzoátegui - Administración"
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from model_poll.models import BackupJob
+from posts.backup_jobs import BackupJobBusy, run_backup_job, start_backup_job
+
+class Command(BaseCommand):
+    help = 'Crea un respaldo comprimido en backups/ (completo o incremental desde el último respaldo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true', help='Exportar solo los cambios desde el último respaldo')
+        parser.add_argument('--compression', choices=['gz', 'xz'], help='Compresión (por defecto BACKUP_COMPRESSION)')
+
+    def handle(self, *args, **options):
+        # Mismo candado que el panel: no se solapa con otro respaldo o restauración
+        try:
+            job = start_backup_job(BackupJob.Kind.CREAR, incremental=options['incremental'], background=False)
+        except BackupJobBusy:
+            raise CommandError('Ya hay un respaldo o restauración en curso.')
+
+        run_backup_job(job.id, compression=options['compression'])
+        job.refresh_from_db()
+        if job.status != BackupJob.Status.COMPLETADO:
+            raise CommandError(f'Error al crear respaldo: {job.error}')
+        self.stdout.write(self.style.SUCCESS(f'{job.result} creado: {job.filename} ({job.duration} s)'))
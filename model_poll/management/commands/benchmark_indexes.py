@@ -0,0 +1,187 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from model_poll.models import Rol, User, Poll, Question, Options, Participation, QuestionDetails, SiteContent
+from posts.tallies import answer_counts
+
+# Prefijo de los datos de prueba que crea este comando
+SEED_PREFIX = 'bench_'
+
+# Índices compuestos de la migración 0010 que se comparan (modelo, nombre)
+BENCHMARK_INDEXES = [
+    (Poll, 'poll_status_start_idx'),
+    (Poll, 'poll_public_start_idx'),
+    (QuestionDetails, 'qdetails_question_option_idx'),
+    (SiteContent, 'sitecontent_type_active_idx'),
+    (User, 'user_rol_username_idx'),
+]
+
+class Command(BaseCommand):
+    help = (
+        'Compara el plan (EXPLAIN) y el tiempo de las consultas del panel con y sin los índices compuestos, '
+        'en una base de datos de prueba aparte'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--polls', type=int, default=200, help='Encuestas de prueba a crear (por defecto 200)')
+        parser.add_argument('--users', type=int, default=500, help='Usuarios de prueba a crear (por defecto 500)')
+        parser.add_argument('--repeat', type=int, default=20, help='Ejecuciones por consulta (por defecto 20)')
+        parser.add_argument('--output', help='Archivo donde guardar el informe además de mostrarlo')
+        parser.add_argument('--keep', action='store_true', help='No eliminar la base de datos de prueba al terminar')
+
+    def handle(self, *args, **options):
+        self.lines = []
+        # Los índices se quitan y los datos se crean en una base de prueba (test_<nombre>,
+        # como manage.py test): la base real no pierde índices ni muestra encuestas de prueba.
+        # En MySQL el DDL no es transaccional, así que no se toca la base en uso.
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self._benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keep'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write('\n'.join(self.lines) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Informe guardado en {options["output"]}'))
+
+    def _benchmark(self, options):
+        self._seed(options['polls'], options['users'])
+        queries = self._queries()
+        self._log(f'Motor: {connection.vendor} (base de prueba {connection.settings_dict["NAME"]})')
+
+        self._log('\n=== Con índices compuestos ===')
+        with_indexes = self._run(queries, options['repeat'])
+
+        dropped = []
+        try:
+            self._drop_indexes(dropped)
+            self._log('\n=== Sin índices compuestos ===')
+            without_indexes = self._run(queries, options['repeat'])
+        finally:
+            self._restore_indexes(dropped)
+
+        self._log('\n=== Resumen (mediana) ===')
+        for label in queries:
+            before, after = without_indexes[label], with_indexes[label]
+            speedup = before / after if after else 0
+            self._log(f'{label}: {before:.2f} ms -> {after:.2f} ms (x{speedup:.1f})')
+
+    def _log(self, text):
+        self.lines.append(text)
+        self.stdout.write(text)
+
+    def _seed(self, poll_count, user_count):
+        """Crea encuestas, usuarios, respuestas y contenido con bulk_create.
+
+        Los objetos se vuelven a consultar tras cada bulk_create porque MySQL no devuelve los ids.
+        """
+        now = timezone.now()
+        roles = [Rol.objects.get_or_create(name=name)[0] for name in ('Administrador', 'Trabajador', 'Usuario')]
+
+        with transaction.atomic():
+            User.objects.bulk_create([
+                User(username=f'{SEED_PREFIX}user_{i}', password='!', rol=random.choice(roles))
+                for i in range(user_count)
+            ])
+            users = list(User.objects.filter(username__startswith=SEED_PREFIX))
+            Poll.objects.bulk_create([
+                Poll(
+                    title=f'{SEED_PREFIX}poll_{i}',
+                    status=random.choice(Poll.Status.values),
+                    is_public=random.random() < 0.7,
+                    star_date=now - timedelta(days=random.randint(0, 365)),
+                )
+                for i in range(poll_count)
+            ])
+            polls = list(Poll.objects.filter(title__startswith=SEED_PREFIX))
+            Question.objects.bulk_create([
+                Question(poll=poll, question_text=f'Pregunta {order}', question_type=Question.QuestionType.SELECCION_MULTIPLE, order=order)
+                for poll in polls for order in range(3)
+            ])
+            questions = list(Question.objects.filter(poll__in=polls))
+            Options.objects.bulk_create([
+                Options(question=question, options_text=f'Opción {value}', value=value)
+                for question in questions for value in range(1, 5)
+            ])
+            options_by_question = {}
+            for option in Options.objects.filter(question__in=questions):
+                options_by_question.setdefault(option.question_id, []).append(option)
+            questions_by_poll = {}
+            for question in questions:
+                questions_by_poll.setdefault(question.poll_id, []).append(question)
+
+            Participation.objects.bulk_create([
+                Participation(poll=poll, user=user)
+                for user in users for poll in random.sample(polls, min(len(polls), 5))
+            ], batch_size=1000)
+            participations = list(Participation.objects.filter(poll__in=polls))
+            QuestionDetails.objects.bulk_create([
+                QuestionDetails(
+                    participation=participation,
+                    question=question,
+                    selected_options=random.choice(options_by_question[question.id])
+                )
+                for participation in participations for question in questions_by_poll[participation.poll_id]
+            ], batch_size=1000)
+
+            SiteContent.objects.bulk_create([
+                SiteContent(
+                    content_type=random.choice(SiteContent.ContentType.values),
+                    title=f'{SEED_PREFIX}content_{i}',
+                    is_active=random.random() < 0.5,
+                    order=i
+                )
+                for i in range(poll_count)
+            ])
+
+        self.stdout.write(
+            f'Datos de prueba: {len(polls)} encuestas, {len(users)} usuarios, '
+            f'{len(participations) * 3} respuestas'
+        )
+
+    def _queries(self):
+        """Consultas del panel y de las vistas públicas con la misma forma que en las vistas"""
+        poll = Poll.objects.filter(title__startswith=SEED_PREFIX).order_by('id').first()
+        role = Rol.objects.get(name='Trabajador')
+        return {
+            'Encuestas activas por fecha': Poll.objects.filter(status='ACTIVA').order_by('-star_date'),
+            'Encuestas públicas por fecha': Poll.objects.filter(is_public=True).order_by('-star_date'),
+            'Encuestas vencidas (programador)': Poll.objects.filter(status='ACTIVA', end_date__lt=timezone.now()),
+            'Conteo de respuestas de una encuesta': answer_counts(question__poll=poll),
+            'Slides activos del carousel': SiteContent.objects.filter(content_type='CAROUSEL_SLIDE', is_active=True).order_by('order'),
+            'Usuarios por rol': User.objects.filter(rol=role).order_by('username'),
+        }
+
+    def _run(self, queries, repeat):
+        """Muestra el EXPLAIN de cada consulta y devuelve la mediana en milisegundos"""
+        results = {}
+        for label, queryset in queries.items():
+            self._log(f'\n-- {label}')
+            self._log(queryset.explain())
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                samples.append((time.perf_counter() - start) * 1000)
+            results[label] = statistics.median(samples)
+            self._log(f'Tiempo: {results[label]:.2f} ms (mediana de {repeat})')
+        return results
+
+    def _drop_indexes(self, dropped):
+        """Quita los índices compuestos; `dropped` guarda los que se quitaron para restaurarlos"""
+        for model, name in BENCHMARK_INDEXES:
+            index = next(index for index in model._meta.indexes if index.name == name)
+            with connection.schema_editor() as schema_editor:
+                schema_editor.remove_index(model, index)
+            dropped.append((model, index))
+
+    def _restore_indexes(self, dropped):
+        for model, index in dropped:
+            with connection.schema_editor() as schema_editor:
+                schema_editor.add_index(model, index)
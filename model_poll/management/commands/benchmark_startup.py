@@ -0,0 +1,62 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Código que ejecuta cada proceso medido: arranca Django, importa las vistas
+# (lo que hace un worker al atender su primera petición) y los módulos extra
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+import posts.views
+for module in sys.argv[1:]:
+    __import__(module)
+elapsed = time.perf_counter() - start
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss = rss / 1024
+except ImportError:  # Windows: RSS no disponible
+    rss = 0
+print(json.dumps({'seconds': elapsed, 'rss_kb': rss}))
+"""
+
+# Escenarios: arranque actual y arranque con las importaciones que antes hacía posts.views
+SCENARIOS = [
+    ('Carga diferida (actual)', []),
+    ('Carga anticipada (reportlab + matplotlib)', ['posts.reports', 'matplotlib.pyplot']),
+]
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de arranque y la memoria (RSS) de un worker con y sin cargar reportlab/matplotlib'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Procesos a medir por escenario (por defecto 5)')
+
+    def _measure(self, modules):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'django_base.settings'))
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT, *modules],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        results = {}
+        for name, modules in SCENARIOS:
+            samples = [self._measure(modules) for _ in range(options['runs'])]
+            seconds = statistics.median(sample['seconds'] for sample in samples)
+            rss_mb = statistics.median(sample['rss_kb'] for sample in samples) / 1024
+            results[name] = (seconds, rss_mb)
+            self.stdout.write(f'{name}: {seconds * 1000:.0f} ms, {rss_mb:.1f} MB RSS (mediana de {options["runs"]})')
+
+        (lazy_s, lazy_mb), (eager_s, eager_mb) = results.values()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ahorro por worker: {(eager_s - lazy_s) * 1000:.0f} ms y {eager_mb - lazy_mb:.1f} MB'
+        ))
@@ -0,0 +1,41 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from posts.bulk_export import stream_reports_zip
+from posts.poll_filters import statistics_polls
+
+class Command(BaseCommand):
+    help = 'Exporta en un ZIP los reportes PDF de varias encuestas (mismos filtros que el dashboard de estadísticas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Ruta del ZIP (por defecto Reportes_AIT_YYYYMMDD_HHMMSS.zip)')
+        parser.add_argument('--search', default='', help='Texto a buscar en título, descripción o autor')
+        parser.add_argument('--status', default='', choices=['', 'BORRADOR', 'ACTIVA', 'CERRADA'], help='Estado de las encuestas')
+        parser.add_argument('--date-from', default='', help='Fecha de inicio mínima (AAAA-MM-DD)')
+        parser.add_argument('--date-to', default='', help='Fecha de inicio máxima (AAAA-MM-DD)')
+        parser.add_argument('--processes', type=int, default=None, help='Procesos en paralelo para generar los reportes')
+
+    def handle(self, *args, **options):
+        params = {
+            'search': options['search'],
+            'status': options['status'],
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+        }
+        poll_ids = list(statistics_polls(None, params).values_list('id', flat=True))
+        if not poll_ids:
+            self.stdout.write(self.style.WARNING('No hay encuestas que coincidan con los filtros'))
+            return
+
+        output = options['output'] or f"Reportes_AIT_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+
+        def on_report(filename, error):
+            if error:
+                self.stdout.write(self.style.ERROR(f'{filename}: {error}'))
+            else:
+                self.stdout.write(f'Agregado: {filename}')
+
+        with open(output, 'wb') as f:
+            for chunk in stream_reports_zip(poll_ids, options['processes'], on_report):
+                f.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'{len(poll_ids)} reportes exportados en {output}'))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from posts.backup_jobs import active_job
+from posts.backups import (
+    BACKUP_KEEP_DAILY, BACKUP_KEEP_WEEKLY, apply_retention, collect_garbage, import_backup_files, retention_plan, store_usage
+)
+
+class Command(BaseCommand):
+    help = 'Aplica la retención de respaldos (N diarios, M semanales) y borra los fragmentos sin uso del almacén'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--daily', type=int, default=BACKUP_KEEP_DAILY, help=f'Días con respaldo a conservar (por defecto {BACKUP_KEEP_DAILY})')
+        parser.add_argument('--weekly', type=int, default=BACKUP_KEEP_WEEKLY, help=f'Semanas con respaldo a conservar (por defecto {BACKUP_KEEP_WEEKLY})')
+        parser.add_argument('--import-files', action='store_true', help='Mover antes al almacén los respaldos sueltos de backups/')
+        parser.add_argument('--gc-only', action='store_true', help='Solo borrar fragmentos sin uso, sin aplicar la retención')
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar qué se eliminaría sin borrar nada')
+
+    def handle(self, *args, **options):
+        if options['daily'] < 1:
+            raise CommandError('Se debe conservar al menos el respaldo de un día (--daily 1).')
+        if active_job():
+            raise CommandError('Hay un respaldo o restauración en curso; intenta más tarde.')
+
+        before = store_usage()
+        if options['import_files'] and not options['dry_run']:
+            for filename in import_backup_files():
+                self.stdout.write(f'Importado al almacén: {filename}')
+
+        if options['gc_only']:
+            removed, freed = collect_garbage()
+        elif options['dry_run']:
+            keep, remove = retention_plan(options['daily'], options['weekly'])
+            for filename in keep:
+                self.stdout.write(f'Conservar: {filename}')
+            for filename in remove:
+                self.stdout.write(self.style.WARNING(f'Eliminar: {filename}'))
+            return
+        else:
+            deleted, failed, (removed, freed) = apply_retention(options['daily'], options['weekly'])
+            for filename in deleted:
+                self.stdout.write(self.style.WARNING(f'Eliminado: {filename}'))
+            for filename, error in failed:
+                self.stdout.write(self.style.ERROR(f'No se pudo eliminar {filename}: {error}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{removed} fragmentos sin uso borrados ({freed / 1024:.1f} KB). '
+            f'Almacén: {before / 1024:.1f} KB -> {store_usage() / 1024:.1f} KB'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from posts.report_jobs import REPORT_JOB_RETENTION_DAYS, purge_old_reports
+
+class Command(BaseCommand):
+    help = 'Elimina los trabajos de reportes PDF terminados hace más de N días y los PDF sin trabajo en reports/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=REPORT_JOB_RETENTION_DAYS,
+            help=f'Conservar los trabajos terminados en estos días (por defecto {REPORT_JOB_RETENTION_DAYS})'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days no puede ser negativo.')
+
+        deleted, removed = purge_old_reports(options['days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} trabajos de reportes eliminados, {removed} archivos borrados de reports/'
+        ))
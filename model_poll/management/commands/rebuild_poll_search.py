@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from posts.poll_filters import rebuild_poll_search
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de encuestas (título, descripción y autor)'
+
+    def handle(self, *args, **options):
+        total = rebuild_poll_search()
+        self.stdout.write(self.style.SUCCESS(f'Índice de búsqueda reconstruido: {total} palabras'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from posts.user_filters import rebuild_user_search
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de usuarios por nombre (UserSearchToken)'
+
+    def handle(self, *args, **options):
+        total = rebuild_user_search()
+        self.stdout.write(self.style.SUCCESS(f'Índice de búsqueda reconstruido: {total} palabras'))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from model_poll.models import OptionTally
+from posts.tallies import answer_counts, rebuild_tallies
+
+class Command(BaseCommand):
+    help = 'Reconstruye los contadores de respuestas (OptionTally) desde QuestionDetails e informa las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo informa las diferencias sin modificar los contadores'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Conteos reales agrupados por (pregunta, opción)
+            expected = {
+                (question_id, option_id): total
+                for question_id, option_id, value, total in answer_counts()
+            }
+            stored = {
+                (question_id, option_id): count
+                for question_id, option_id, count in OptionTally.objects.filter(count__gt=0).values_list('question_id', 'option_id', 'count')
+            }
+
+            drift = []
+            for key in expected.keys() | stored.keys():
+                if expected.get(key, 0) != stored.get(key, 0):
+                    drift.append((key, stored.get(key, 0), expected.get(key, 0)))
+
+            for (question_id, option_id), stored_count, expected_count in sorted(drift):
+                self.stdout.write(
+                    f'Pregunta {question_id} / Opción {option_id}: contador {stored_count} -> real {expected_count}'
+                )
+
+            if not drift:
+                self.stdout.write(self.style.SUCCESS('Los contadores coinciden con las respuestas registradas'))
+            else:
+                self.stdout.write(self.style.WARNING(f'Se encontraron {len(drift)} contadores con diferencias'))
+
+            if options['dry_run']:
+                return
+
+            rebuild_tallies()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Contadores reconstruidos: {len(expected)} opciones con respuestas')
+        )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from model_poll.models import BackupJob
+from posts.backup_jobs import BackupJobBusy, run_backup_job, start_backup_job
+from posts.backups import backup_exists
+
+class Command(BaseCommand):
+    help = 'Restaura un respaldo de backups/ con inserciones por lotes (aplica su cadena si es incremental)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('filename', help='Nombre del archivo en backups/')
+
+    def handle(self, *args, **options):
+        if not backup_exists(options['filename']):
+            raise CommandError(f'No existe el respaldo {options["filename"]}.')
+        # Mismo candado que el panel: no se solapa con otro respaldo o restauración
+        try:
+            job = start_backup_job(BackupJob.Kind.RESTAURAR, filename=options['filename'], background=False)
+        except BackupJobBusy:
+            raise CommandError('Ya hay un respaldo o restauración en curso.')
+
+        last = {}
+
+        def progress(count, fraction, name):
+            # Una línea por cada 5% avanzado de cada archivo
+            step = int(fraction * 20)
+            if last.get(name) != step:
+                last[name] = step
+                self.stdout.write(f'{name}: {fraction:.0%} ({count} registros)')
+
+        run_backup_job(job.id, progress=progress)
+        job.refresh_from_db()
+        if job.status != BackupJob.Status.COMPLETADO:
+            raise CommandError(f'Error al restaurar: {job.error}')
+        self.stdout.write(self.style.SUCCESS(f'Respaldo restaurado: {job.result} ({job.duration} s)'))
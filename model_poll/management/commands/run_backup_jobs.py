@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from model_poll.models import BackupJob
+from posts.backup_jobs import BACKUP_JOB_STALE_MINUTES, release_stale_jobs, run_backup_job
+
+class Command(BaseCommand):
+    help = 'Libera trabajos de respaldo abandonados y ejecuta el pendiente (por ejemplo, tras reiniciar el servidor)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=BACKUP_JOB_STALE_MINUTES,
+            help=f'Liberar trabajos activos sin terminar después de estos minutos (por defecto {BACKUP_JOB_STALE_MINUTES})'
+        )
+
+    def handle(self, *args, **options):
+        released = release_stale_jobs(options['stale_minutes'])
+        if released:
+            self.stdout.write(self.style.WARNING(f'{released} trabajos abandonados marcados con error'))
+
+        # El candado permite como máximo un trabajo pendiente
+        job = BackupJob.objects.filter(status=BackupJob.Status.PENDIENTE, lock__isnull=False).first()
+        if job:
+            run_backup_job(job.id)
+            job.refresh_from_db()
+            if job.status == BackupJob.Status.COMPLETADO:
+                self.stdout.write(self.style.SUCCESS(f'{job.get_kind_display()} completado: {job.filename} ({job.result})'))
+            else:
+                self.stdout.write(self.style.ERROR(f'{job.get_kind_display()} falló: {job.error}'))
+
+        self.stdout.write(self.style.SUCCESS('Procesamiento de respaldos finalizado'))
@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from posts.lifecycle import apply_due_transitions, next_transition_at
+
+class Command(BaseCommand):
+    help = 'Cierra encuestas vencidas y activa las programadas; duerme hasta la próxima fecha de inicio o fin'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Aplicar las transiciones pendientes una sola vez y salir (para cron)'
+        )
+        parser.add_argument(
+            '--max-sleep',
+            type=int,
+            default=60,
+            help='Segundos máximos entre revisiones, para detectar encuestas creadas o editadas (por defecto 60)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            closed, activated = apply_due_transitions()
+            if closed or activated:
+                self.stdout.write(
+                    f'{timezone.now():%d/%m/%Y %H:%M:%S} - Encuestas cerradas: {closed}, activadas: {activated}'
+                )
+
+            if options['once']:
+                break
+
+            # Dormir hasta la próxima transición programada (con un máximo)
+            sleep_for = options['max_sleep']
+            due = next_transition_at()
+            if due:
+                sleep_for = min(sleep_for, max((due - timezone.now()).total_seconds(), 0) + 1)
+            time.sleep(sleep_for)
+
+        self.stdout.write(self.style.SUCCESS('Transiciones de encuestas aplicadas'))
@@ -0,0 +1,52 @@
+import time
+from django.core.management.base import BaseCommand
+from model_poll.models import ReportJob
+from posts.report_jobs import REPORT_JOB_STALE_MINUTES, requeue_stale_jobs, run_report_job
+
+class Command(BaseCommand):
+    help = 'Procesa los trabajos de exportación de reportes PDF pendientes (por ejemplo, tras reiniciar el servidor)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Seguir procesando trabajos nuevos indefinidamente'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=5,
+            help='Segundos entre revisiones cuando se usa --loop (por defecto 5)'
+        )
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=REPORT_JOB_STALE_MINUTES,
+            help=f'Reintentar trabajos EN_PROCESO sin avance en estos minutos (por defecto {REPORT_JOB_STALE_MINUTES})'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # Trabajos abandonados por un proceso que se detuvo
+            requeued = requeue_stale_jobs(options['stale_minutes'])
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'{requeued} trabajos abandonados vuelven a la cola'))
+
+            pending = list(
+                ReportJob.objects.filter(status=ReportJob.Status.PENDIENTE)
+                .order_by('created_at')
+                .values_list('id', flat=True)
+            )
+            for job_id in pending:
+                run_report_job(job_id)
+                job = ReportJob.objects.get(id=job_id)
+                if job.status == ReportJob.Status.COMPLETADO:
+                    self.stdout.write(self.style.SUCCESS(f'Reporte {job_id} generado: {job.file_path}'))
+                elif job.status == ReportJob.Status.ERROR:
+                    self.stdout.write(self.style.ERROR(f'Reporte {job_id} falló: {job.error}'))
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Procesamiento de reportes finalizado'))
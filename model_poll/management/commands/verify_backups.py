@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from posts.backups import (
+    STATUS_CORRUPT, STATUS_LABELS, STATUS_MISSING, STATUS_OK, backup_exists, rebuild_catalog, verify_backup, verify_catalog
+)
+
+class Command(BaseCommand):
+    help = 'Verifica los respaldos del catálogo (checksum y registros) y marca los dañados o desconocidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filename', help='Verificar solo este respaldo')
+        parser.add_argument('--pending', action='store_true', help='Verificar solo los respaldos nunca verificados')
+        parser.add_argument('--rebuild', action='store_true', help='Solo actualizar el catálogo con los archivos en disco, sin verificar')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            added, missing = rebuild_catalog()
+            for filename in added:
+                self.stdout.write(f'Agregado al catálogo: {filename}')
+            for filename in missing:
+                self.stdout.write(self.style.WARNING(f'Falta el archivo: {filename}'))
+            self.stdout.write(self.style.SUCCESS('Catálogo actualizado'))
+            return
+
+        if options['filename']:
+            if not backup_exists(options['filename']):
+                raise CommandError(f'No existe el respaldo {options["filename"]}.')
+            entries = [verify_backup(options['filename'])]
+        else:
+            entries = verify_catalog(pending_only=options['pending'])
+
+        failed = 0
+        for entry in entries:
+            label = f'{entry["filename"]}: {STATUS_LABELS.get(entry["status"], entry["status"])}'
+            if entry['status'] in (STATUS_CORRUPT, STATUS_MISSING):
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'{label} ({entry["error"]})'))
+            elif entry['status'] == STATUS_OK:
+                self.stdout.write(label)
+            else:
+                self.stdout.write(self.style.WARNING(label))
+
+        message = f'{len(entries)} respaldos verificados, {failed} con problemas'
+        self.stdout.write(self.style.ERROR(message) if failed else self.style.SUCCESS(message))
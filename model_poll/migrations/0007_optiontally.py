@@ -0,0 +1,45 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_tallies(apps, schema_editor):
+    # Inicializar los conteos con las respuestas ya registradas
+    QuestionDetails = apps.get_model('model_poll', 'QuestionDetails')
+    OptionTally = apps.get_model('model_poll', 'OptionTally')
+    rows = (
+        QuestionDetails.objects
+        .filter(selected_options__isnull=False)
+        .values('question_id', 'selected_options_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    OptionTally.objects.bulk_create(
+        [OptionTally(question_id=row['question_id'], option_id=row['selected_options_id'], count=row['total']) for row in rows],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_poll', '0006_alter_sitecontent_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OptionTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('option', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conteos', to='model_poll.options')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conteos', to='model_poll.question')),
+            ],
+            options={
+                'unique_together': {('question', 'option')},
+            },
+        ),
+        migrations.RunPython(populate_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:26
+
+import model_poll.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_poll', '0007_optiontally'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='poll',
+            name='results_version',
+            field=models.CharField(default=model_poll.models.new_results_version, editable=False, help_text='Cambia con cada participación o edición para invalidar la caché de resultados', max_length=32),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('model_poll', '0009_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(fields=['status', 'star_date'], name='poll_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(fields=['is_public', 'star_date'], name='poll_public_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='questiondetails',
+            index=models.Index(fields=['question', 'selected_options'], name='qdetails_question_option_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitecontent',
+            index=models.Index(fields=['content_type', 'is_active', 'order'], name='sitecontent_type_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['rol', 'username'], name='user_rol_username_idx'),
+        ),
+    ]
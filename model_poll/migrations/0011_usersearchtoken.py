@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:40
+
+import re
+import unicodedata
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def search_tokens(text):
+    # Copia fija de model_poll.models.search_tokens al crear esta migración:
+    # los cambios futuros de esa función no deben cambiar lo que hace la migración
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return [token[:50] for token in re.findall(r'\w+', text)]
+
+
+def populate_search_tokens(apps, schema_editor):
+    # Indexar los nombres de los usuarios ya registrados
+    User = apps.get_model('model_poll', 'User')
+    UserSearchToken = apps.get_model('model_poll', 'UserSearchToken')
+    rows = User.objects.values_list('id', 'first_name', 'last_name', 'full_name')
+    UserSearchToken.objects.bulk_create(
+        [
+            UserSearchToken(user_id=user_id, token=token)
+            for user_id, first_name, last_name, full_name in rows.iterator()
+            for token in set(search_tokens(f'{first_name} {last_name} {full_name}'))
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_poll', '0010_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens_busqueda', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'user'], name='user_search_token_idx')],
+                'unique_together': {('user', 'token')},
+            },
+        ),
+        migrations.RunPython(populate_search_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:41
+
+import re
+import unicodedata
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Copias fijas de model_poll.models al crear esta migración: los cambios futuros
+# de esas funciones no deben cambiar lo que hace la migración
+def search_tokens(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return [token[:50] for token in re.findall(r'\w+', text)]
+
+
+def poll_search_weights(title, description, author_name):
+    weights = {}
+    for text, weight in ((description, 1), (author_name, 2), (title, 3)):
+        for token in search_tokens(text):
+            if len(token) > 1:
+                weights[token] = max(weights.get(token, 0), weight)
+    return weights
+
+
+def populate_search_tokens(apps, schema_editor):
+    # Indexar las encuestas ya creadas
+    Poll = apps.get_model('model_poll', 'Poll')
+    PollSearchToken = apps.get_model('model_poll', 'PollSearchToken')
+    rows = Poll.objects.values_list(
+        'id', 'title', 'description',
+        'created_by__first_name', 'created_by__last_name', 'created_by__full_name'
+    )
+    tokens = []
+    for poll_id, title, description, first_name, last_name, full_name in rows.iterator():
+        author_name = f'{first_name or ""} {last_name or ""} {full_name or ""}'
+        for token, weight in poll_search_weights(title, description, author_name).items():
+            tokens.append(PollSearchToken(poll_id=poll_id, token=token, weight=weight))
+    PollSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_poll', '0011_usersearchtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50)),
+                ('weight', models.PositiveSmallIntegerField(default=1, help_text='3=título, 2=autor, 1=descripción')),
+                ('poll', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens_busqueda', to='model_poll.poll')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'poll'], name='poll_search_token_idx')],
+                'unique_together': {('poll', 'token')},
+            },
+        ),
+        migrations.RunPython(populate_search_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_poll', '0012_pollsearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Última modificación (respaldos incrementales)'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='poll',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Última modificación (respaldos incrementales)'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Última modificación (respaldos incrementales)'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='options',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Última modificación (respaldos incrementales)'),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='participation',
+            name='sent_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_poll', '0013_change_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackupJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('CREAR', 'Crear respaldo'), ('RESTAURAR', 'Restaurar respaldo')], max_length=20)),
+                ('status', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En proceso'), ('COMPLETADO', 'Completado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=20)),
+                ('filename', models.CharField(blank=True, default='', help_text='Respaldo creado o respaldo a restaurar', max_length=255)),
+                ('incremental', models.BooleanField(default=False)),
+                ('download', models.BooleanField(default=False, help_text='Descargar el respaldo al terminar')),
+                ('lock', models.CharField(blank=True, editable=False, max_length=20, null=True, unique=True)),
+                ('result', models.CharField(blank=True, default='', max_length=255)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='respaldos_solicitados', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_poll', '0014_backupjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='poll',
+            name='auto_activate',
+            field=models.BooleanField(default=False, help_text='Borrador programado: run_poll_scheduler lo activa en su fecha de inicio'),
+        ),
+    ]
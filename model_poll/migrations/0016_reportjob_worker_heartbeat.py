@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model_poll', '0015_poll_auto_activate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Último avance del proceso; sin avance reciente el trabajo vuelve a la cola', null=True),
+        ),
+        migrations.AddField(
+            model_name='reportjob',
+            name='worker',
+            field=models.CharField(blank=True, default='', help_text='Proceso que lo ejecuta (host:pid:id); solo ese proceso puede actualizarlo', max_length=64),
+        ),
+    ]
@@ -1,3 +1,6 @@
+import re
+import unicodedata
+import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
@@ -21,6 +24,22 @@ class Rol(models.Model):
 # AbstractUser ya incluye: username, first_name, last_name, email, password, is_staff, is_active, etc.    
 # Campo adicional para 'nombre_completo' según tu ERD, aunque Django prefiere first_name y last_name
 
+def search_tokens(text):
+    """Palabras normalizadas (minúsculas, sin acentos) para el índice de búsqueda de usuarios"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return [token[:50] for token in re.findall(r'\w+', text)]
+
+def poll_search_weights(title, description, author_name):
+    """Palabras de búsqueda de una encuesta con su peso: título 3, autor 2, descripción 1"""
+    weights = {}
+    for text, weight in ((description, 1), (author_name, 2), (title, 3)):
+        for token in search_tokens(text):
+            # Las palabras de una letra no aportan a la búsqueda
+            if len(token) > 1:
+                weights[token] = max(weights.get(token, 0), weight)
+    return weights
+
 class User(AbstractUser):
 
     cedula = models.CharField(max_length=9, unique=True, help_text="Cédula de identidad", null=True, blank=True)
@@ -29,6 +48,27 @@ class User(AbstractUser):
         
     # Relación con el Rol
     rol = models.ForeignKey(Rol, on_delete=models.SET_NULL, null=True, blank=True, related_name="usuarios")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, help_text="Última modificación (respaldos incrementales)")
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Listado de usuarios filtrado por rol y ordenado por nombre de usuario
+            models.Index(fields=['rol', 'username'], name='user_rol_username_idx'),
+        ]
+
+    # Campos del nombre que alimentan los índices de búsqueda de usuarios y encuestas
+    SEARCH_NAME_FIELDS = ('first_name', 'last_name', 'full_name')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Nombre tal como se cargó: save() solo toca los índices si cambia
+        if set(cls.SEARCH_NAME_FIELDS) <= set(field_names):
+            instance._loaded_search_name = instance._search_name()
+        return instance
+
+    def _search_name(self):
+        return tuple(getattr(self, field) for field in self.SEARCH_NAME_FIELDS)
 
     def save(self, *args, **kwargs):
         # Opcional: Sincronizar nombre_completo con first_name y last_name
@@ -48,13 +88,63 @@ class User(AbstractUser):
                 worker_role, created = Rol.objects.get_or_create(name='Trabajador')
                 self.rol = user_role
         
+        # auto_now no se escribe con update_fields: incluirlo para los respaldos incrementales
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'updated_at'}
         super().save(*args, **kwargs)
+        
+        # Mantener el índice de búsqueda por nombre solo si el nombre cambió
+        # (no al guardar last_login, el rol, etc.)
+        update_fields = kwargs.get('update_fields')
+        name_saved = update_fields is None or set(update_fields) & set(self.SEARCH_NAME_FIELDS)
+        if name_saved and self._search_name() != getattr(self, '_loaded_search_name', None):
+            if UserSearchToken.refresh_for(self):
+                # Actualizar también la búsqueda de sus encuestas, en bloque
+                PollSearchToken.refresh_for_author(self)
+            self._loaded_search_name = self._search_name()
 
     def __str__(self):
         return self.username
 
+### Índice de Búsqueda de Usuarios
+
+class UserSearchToken(models.Model):
+    # Una fila por palabra del nombre de cada usuario; permite buscar por prefijo
+    # de nombre o apellido usando un índice en lugar de icontains sobre la tabla
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tokens_busqueda")
+    token = models.CharField(max_length=50)
+
+    class Meta:
+        unique_together = ('user', 'token')
+        indexes = [
+            models.Index(fields=['token', 'user'], name='user_search_token_idx'),
+        ]
+
+    @classmethod
+    def tokens_for(cls, user):
+        return set(search_tokens(f'{user.first_name} {user.last_name} {user.full_name}'))
+
+    @classmethod
+    def refresh_for(cls, user):
+        """Sincroniza las palabras de búsqueda de un usuario con su nombre actual"""
+        tokens = cls.tokens_for(user)
+        current = set(cls.objects.filter(user=user).values_list('token', flat=True))
+        if tokens == current:
+            return False
+        cls.objects.filter(user=user).exclude(token__in=tokens).delete()
+        cls.objects.bulk_create([cls(user=user, token=token) for token in tokens - current], ignore_conflicts=True)
+        return True
+
+    def __str__(self):
+        return f"{self.token} ({self.user_id})"
+
 ### Tabla de Encuestas
 
+def new_results_version():
+    """Genera una versión nueva para invalidar los resultados en caché de una encuesta"""
+    return uuid.uuid4().hex
+
 class Poll(models.Model):
 
     class Status(models.TextChoices):
@@ -71,6 +161,41 @@ class Poll(models.Model):
     is_public = models.BooleanField(default=True, help_text="True=Pública (usuarios), False=Interna (trabajadores)")
     star_date = models.DateTimeField(null=True, blank=True, help_text="Fecha y hora de inicio de la encuesta")
     end_date = models.DateTimeField(null=True, blank=True, help_text="Fecha y hora de finalización de la encuesta")
+    auto_activate = models.BooleanField(default=False, help_text="Borrador programado: run_poll_scheduler lo activa en su fecha de inicio")
+    results_version = models.CharField(max_length=32, default=new_results_version, editable=False, help_text="Cambia con cada participación o edición para invalidar la caché de resultados")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, help_text="Última modificación (respaldos incrementales)")
+
+    class Meta:
+        indexes = [
+            # Listados por estado y fecha de inicio (encuestas activas, programador)
+            models.Index(fields=['status', 'star_date'], name='poll_status_start_idx'),
+            # Listados de encuestas públicas por fecha de inicio
+            models.Index(fields=['is_public', 'star_date'], name='poll_public_start_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding:
+            # results_version solo la cambia bump_results_version: guardar una copia leída
+            # antes de una participación no debe devolver la versión anterior
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'results_version'
+            ]
+        # auto_now no se escribe con update_fields: incluirlo para los respaldos incrementales
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
+        
+        # Mantener el índice de búsqueda (no al cambiar solo el estado, etc.)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & {'title', 'description', 'created_by'}:
+            PollSearchToken.refresh_for(self)
+
+    def has_ended(self):
+        """Indica si la fecha de fin ya pasó (solo lectura; el cierre lo aplica run_poll_scheduler)"""
+        from django.utils import timezone
+        return bool(self.end_date and timezone.now() > self.end_date)
 
     def check_and_update_status(self):
         """Verifica y actualiza el estado de la encuesta según las fechas"""
@@ -86,6 +211,57 @@ class Poll(models.Model):
     def __str__(self):
         return self.title 
 
+### Índice de Búsqueda de Encuestas
+
+class PollSearchToken(models.Model):
+    # Una fila por palabra del título, la descripción y el nombre del autor;
+    # el peso permite ordenar los resultados por relevancia
+
+    poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name="tokens_busqueda")
+    token = models.CharField(max_length=50)
+    weight = models.PositiveSmallIntegerField(default=1, help_text="3=título, 2=autor, 1=descripción")
+
+    class Meta:
+        unique_together = ('poll', 'token')
+        indexes = [
+            models.Index(fields=['token', 'poll'], name='poll_search_token_idx'),
+        ]
+
+    @staticmethod
+    def author_name(author):
+        return f'{author.first_name} {author.last_name} {author.full_name}' if author else ''
+
+    @classmethod
+    def weights_for(cls, poll):
+        return poll_search_weights(poll.title, poll.description, cls.author_name(poll.created_by))
+
+    @classmethod
+    def refresh_for(cls, poll):
+        """Sincroniza las palabras de búsqueda de una encuesta con su contenido actual"""
+        weights = cls.weights_for(poll)
+        current = dict(cls.objects.filter(poll=poll).values_list('token', 'weight'))
+        if weights == current:
+            return
+        cls.objects.filter(poll=poll).delete()
+        cls.objects.bulk_create([cls(poll=poll, token=token, weight=weight) for token, weight in weights.items()])
+
+    @classmethod
+    def refresh_for_author(cls, author):
+        """Reconstruye en bloque las palabras de todas las encuestas de un autor (tras cambiar su nombre)"""
+        author_name = cls.author_name(author)
+        cls.objects.filter(poll__created_by=author).delete()
+        cls.objects.bulk_create(
+            [
+                cls(poll_id=poll_id, token=token, weight=weight)
+                for poll_id, title, description in Poll.objects.filter(created_by=author).values_list('id', 'title', 'description')
+                for token, weight in poll_search_weights(title, description, author_name).items()
+            ],
+            batch_size=1000
+        )
+
+    def __str__(self):
+        return f"{self.token} ({self.poll_id})"
+
 ### Tabla de Preguntas
 
 class Question(models.Model):
@@ -106,6 +282,7 @@ class Question(models.Model):
     scale_min_label = models.CharField(max_length=100, null=True, blank=True, help_text="Etiqueta opcional para mínimo")
     scale_max_label = models.CharField(max_length=100, null=True, blank=True, help_text="Etiqueta opcional para máximo")
     rating_stars = models.IntegerField(null=True, blank=True, help_text="Número de estrellas para calificación (3-10)")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, help_text="Última modificación (respaldos incrementales)")
 
     class Meta:
         ordering = ['order'] # Ordena las preguntas por defecto según el campo 'order'
@@ -121,6 +298,7 @@ class Options(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="opciones")
     options_text = models.CharField(max_length=255)
     value = models.IntegerField(null=True, blank=True, help_text="Valor numérico opcional para análisis")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, help_text="Última modificación (respaldos incrementales)")
 
     def __str__(self):
         return self.options_text
@@ -132,7 +310,7 @@ class Participation(models.Model):
 
     poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name="participaciones")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="participaciones")
-    sent_date = models.DateTimeField(auto_now_add=True)
+    sent_date = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
         unique_together = ('poll', 'user')
@@ -151,11 +329,32 @@ class QuestionDetails(models.Model):
     class Meta:
         # Solo una respuesta por pregunta por participación
         unique_together = ('participation', 'question')
+        indexes = [
+            # Conteo de respuestas por pregunta y opción sin recorrer la tabla
+            models.Index(fields=['question', 'selected_options'], name='qdetails_question_option_idx'),
+        ]
 
     def __str__(self):
         return f"Respuesta a Pregunta ID {self.question.id} (Participación ID {self.participation.id})"
 
 
+### Tabla de Conteos por Opción
+
+class OptionTally(models.Model):
+    # Se mantiene en la misma transacción que crea las respuestas (submit_poll)
+    # y se reconstruye con el comando reconcile_tallies
+
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="conteos")
+    option = models.ForeignKey(Options, on_delete=models.CASCADE, related_name="conteos")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('question', 'option')
+
+    def __str__(self):
+        return f"{self.option.options_text}: {self.count}"
+
+
 ### Tabla de Contenido Dinámico
 
 def content_upload_path(instance, filename):
@@ -190,8 +389,87 @@ class SiteContent(models.Model):
     
     class Meta:
         ordering = ['content_type', 'order']
+        indexes = [
+            # Contenido activo de un tipo en orden de visualización
+            models.Index(fields=['content_type', 'is_active', 'order'], name='sitecontent_type_active_idx'),
+        ]
         verbose_name = 'Contenido del Sitio'
         verbose_name_plural = 'Contenidos del Sitio'
     
     def __str__(self):
-        return f"{self.get_content_type_display()} - {self.title}"
\ No newline at end of file
+        return f"{self.get_content_type_display()} - {self.title}"
+
+
+### Tabla de Trabajos de Exportación de Reportes
+
+class ReportJob(models.Model):
+
+    class Status(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        EN_PROCESO = 'EN_PROCESO', 'En proceso'
+        COMPLETADO = 'COMPLETADO', 'Completado'
+        ERROR = 'ERROR', 'Error'
+
+    poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name="reportes")
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="reportes_solicitados")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDIENTE)
+    total_questions = models.PositiveIntegerField(default=0)
+    processed_questions = models.PositiveIntegerField(default=0)
+    file_path = models.CharField(max_length=500, blank=True, default='', help_text="Ruta del PDF generado")
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=64, blank=True, default='', help_text="Proceso que lo ejecuta (host:pid:id); solo ese proceso puede actualizarlo")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Último avance del proceso; sin avance reciente el trabajo vuelve a la cola")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Reporte de {self.poll.title} ({self.get_status_display()})"
+
+
+### Tabla de Trabajos de Respaldo y Restauración
+
+class BackupJob(models.Model):
+
+    class Kind(models.TextChoices):
+        CREAR = 'CREAR', 'Crear respaldo'
+        RESTAURAR = 'RESTAURAR', 'Restaurar respaldo'
+
+    class Status(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        EN_PROCESO = 'EN_PROCESO', 'En proceso'
+        COMPLETADO = 'COMPLETADO', 'Completado'
+        ERROR = 'ERROR', 'Error'
+
+    # Valor del candado mientras el trabajo está pendiente o en proceso
+    LOCK = 'respaldo'
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDIENTE)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="respaldos_solicitados")
+    filename = models.CharField(max_length=255, blank=True, default='', help_text="Respaldo creado o respaldo a restaurar")
+    incremental = models.BooleanField(default=False)
+    download = models.BooleanField(default=False, help_text="Descargar el respaldo al terminar")
+    # Único: la base de datos impide dos trabajos activos a la vez (NULL al terminar)
+    lock = models.CharField(max_length=20, null=True, blank=True, unique=True, editable=False)
+    result = models.CharField(max_length=255, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.filename} ({self.get_status_display()})"
+
+    @property
+    def duration(self):
+        """Segundos entre el inicio y el fin del trabajo, o None si no terminó"""
+        if self.started_at and self.finished_at:
+            return round((self.finished_at - self.started_at).total_seconds(), 1)
+        return None
@@ -0,0 +1,71 @@
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from posts.content_cache import content_version
+
+# Segundos que se sirve una página pública desde la caché
+PUBLIC_PAGE_CACHE_TTL = getattr(settings, 'PUBLIC_PAGE_CACHE_TTL', 600)
+
+CACHE_HEADER = 'X-Page-Cache'
+
+
+def _page_key(request):
+    # Las páginas públicas no leen parámetros GET: ?utm_source=... comparte la misma copia
+    return f'public_page:{content_version()}:{request.path}'
+
+
+def _has_pending_messages(request):
+    """Hay mensajes flash por mostrar (p. ej. tras cerrar sesión); la página no es genérica"""
+    return bool(request.COOKIES.get('messages')) or '_messages' in request.session
+
+
+def _is_cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # La página usó {% csrf_token %}: el token es propio de este visitante
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def anonymous_page_cache(view_func):
+    """Sirve la página desde la caché a visitantes anónimos (GET/HEAD).
+
+    La clave incluye la versión del contenido del sitio, así que un cambio
+    en SiteContent publica la página nueva en todos los procesos en cuanto se
+    confirma (la caché de settings.CACHES es compartida). Las respuestas
+    llevan X-Page-Cache (HIT, MISS o BYPASS) y Vary: Cookie para que ningún
+    proxy entregue la copia anónima a un usuario con sesión.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or request.user.is_authenticated
+            or _has_pending_messages(request)
+        ):
+            response = view_func(request, *args, **kwargs)
+            response[CACHE_HEADER] = 'BYPASS'
+            return response
+
+        key = _page_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response[CACHE_HEADER] = 'HIT'
+        else:
+            response = view_func(request, *args, **kwargs)
+            if request.method == 'GET' and _is_cacheable(request, response):
+                cache.set(key, (response.content, response['Content-Type']), PUBLIC_PAGE_CACHE_TTL)
+                response[CACHE_HEADER] = 'MISS'
+            else:
+                response[CACHE_HEADER] = 'BYPASS'
+
+        patch_vary_headers(response, ['Cookie'])
+        return response
+
+    return wrapper
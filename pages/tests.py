@@ -1,3 +1,83 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from unittest import addModuleCleanup
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from model_poll.models import User, SiteContent
 
-# Create your tests here.
+
+def setUpModule():
+    # Caché de archivos propia de las pruebas: el mismo backend que el servidor, sin mezclar datos
+    cache_dir = tempfile.mkdtemp()
+    cache_settings = override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': cache_dir,
+    }})
+    cache_settings.enable()
+    addModuleCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+    addModuleCleanup(cache_settings.disable)
+
+
+class AnonymousPageCacheTests(TestCase):
+    """Inicio, Acerca de y Contacto se sirven desde la caché compartida a visitantes anónimos"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_second_anonymous_visit_is_served_from_cache(self):
+        first = self.client.get(reverse('home'))
+        second = self.client.get(reverse('home'))
+
+        self.assertEqual(first['X-Page-Cache'], 'MISS')
+        self.assertEqual(second['X-Page-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+
+    def test_query_string_shares_the_cached_copy(self):
+        self.client.get(reverse('contact'))
+        response = self.client.get(reverse('contact'), {'utm_source': 'correo'})
+
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+
+    def test_responses_vary_on_cookie(self):
+        for _ in range(2):
+            response = self.client.get(reverse('about'))
+            self.assertIn('Cookie', response['Vary'])
+
+    def test_logged_in_user_bypasses_cache(self):
+        self.client.get(reverse('home'))
+        self.client.force_login(User.objects.create_user(username='visitante', password='clave'))
+
+        response = self.client.get(reverse('home'))
+
+        self.assertEqual(response['X-Page-Cache'], 'BYPASS')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_post_bypasses_cache(self):
+        response = self.client.post(reverse('contact'))
+
+        self.assertEqual(response['X-Page-Cache'], 'BYPASS')
+
+    def test_site_content_change_publishes_new_page(self):
+        slide = SiteContent.objects.create(content_type='CAROUSEL_SLIDE', title='Slide original')
+        self.client.get(reverse('home'))
+        self.assertEqual(self.client.get(reverse('home'))['X-Page-Cache'], 'HIT')
+
+        # La invalidación ocurre al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            slide.title = 'Slide actualizado'
+            slide.save()
+        response = self.client.get(reverse('home'))
+
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'Slide actualizado')
+        self.assertNotContains(response, 'Slide original')
+
+    def test_site_content_delete_publishes_new_page(self):
+        slide = SiteContent.objects.create(content_type='CAROUSEL_SLIDE', title='Slide temporal')
+        self.assertContains(self.client.get(reverse('home')), 'Slide temporal')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            slide.delete()
+
+        self.assertNotContains(self.client.get(reverse('home')), 'Slide temporal')
@@ -4,30 +4,33 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.forms import PasswordChangeForm
 from .forms import CustomLoginForm
-from model_poll.models import User, Rol, SiteContent
+from model_poll.models import User, Rol
+from posts.content_cache import active_content
+from .page_cache import anonymous_page_cache
 
+@anonymous_page_cache
 def home(request):
-    # Obtener contenido dinámico
-    home_images = SiteContent.objects.filter(content_type='HOME_IMAGE', is_active=True).order_by('order')
-    carousel_slides = SiteContent.objects.filter(content_type='CAROUSEL_SLIDE', is_active=True).order_by('order')
+    # Obtener contenido dinámico (desde la caché, sin consultar la base de datos)
+    content = active_content()
     
     context = {
-        'home_images': home_images,
-        'carousel_slides': carousel_slides,
+        'home_images': content['HOME_IMAGE'],
+        'carousel_slides': content['CAROUSEL_SLIDE'],
     }
     return render(request, 'pages/home.html', context)
 
+@anonymous_page_cache
 def contact(request):
     return render(request, 'pages/contact.html')
 
+@anonymous_page_cache
 def about(request):
-    # Obtener contenido dinámico
-    about_images = SiteContent.objects.filter(content_type='ABOUT_IMAGE', is_active=True).order_by('order')
-    carousel_slides = SiteContent.objects.filter(content_type='CAROUSEL_SLIDE', is_active=True).order_by('order')
+    # Obtener contenido dinámico (desde la caché, sin consultar la base de datos)
+    content = active_content()
     
     context = {
-        'about_images': about_images,
-        'carousel_slides': carousel_slides,
+        'about_images': content['ABOUT_IMAGE'],
+        'carousel_slides': content['CAROUSEL_SLIDE'],
     }
     return render(request, 'pages/about.html', context)
 
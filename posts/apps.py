@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "posts"
+
+    def ready(self):
+        # Registra las señales que invalidan la caché del contenido del sitio
+        from . import content_cache  # noqa: F401
@@ -0,0 +1,168 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from model_poll.models import BackupJob
+from .backups import create_backup_file
+from .restore import restore_and_rebuild
+
+# Minutos tras los que un trabajo activo se considera abandonado (proceso detenido)
+BACKUP_JOB_STALE_MINUTES = getattr(settings, 'BACKUP_JOB_STALE_MINUTES', 120)
+# El progreso se guarda en la caché compartida (settings.CACHES): la fila del trabajo
+# no se puede actualizar desde dentro de la transacción de una restauración, y la
+# caché de archivos no depende de esa transacción, así que cualquier proceso lo ve
+PROGRESS_TTL = 60 * 60 * 24
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class BackupJobBusy(Exception):
+    """Ya hay un respaldo o restauración pendiente o en proceso"""
+
+    def __init__(self, job):
+        super().__init__('Ya hay un respaldo o restauración en curso.')
+        self.job = job
+
+
+def _get_executor():
+    # Un solo hilo: los trabajos de este proceso nunca se solapan
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='backup-job')
+        return _executor
+
+
+def _progress_key(job_id):
+    return f'backup_job_progress:{job_id}'
+
+
+def active_job():
+    """Trabajo que tiene el candado (pendiente o en proceso), o None"""
+    return BackupJob.objects.select_related('requested_by').filter(lock__isnull=False).first()
+
+
+def release_stale_jobs(minutes=BACKUP_JOB_STALE_MINUTES):
+    """Libera el candado de trabajos abandonados por un proceso que se detuvo"""
+    limit = timezone.now() - timedelta(minutes=minutes)
+    return BackupJob.objects.filter(
+        Q(started_at__isnull=True) | Q(started_at__lt=limit),
+        lock__isnull=False,
+        created_at__lt=limit
+    ).update(
+        status=BackupJob.Status.ERROR,
+        error='Trabajo abandonado (el proceso se detuvo antes de terminar).',
+        finished_at=timezone.now(),
+        lock=None
+    )
+
+
+def start_backup_job(kind, user=None, filename='', incremental=False, download=False, background=True):
+    """Registra un trabajo tomando el candado y, si background, lo ejecuta en el pool local.
+
+    El candado es una columna única: si otro trabajo lo tiene (en este u otro
+    proceso) la inserción falla y se lanza BackupJobBusy.
+    """
+    release_stale_jobs()
+    try:
+        with transaction.atomic():
+            job = BackupJob.objects.create(
+                kind=kind,
+                requested_by=user,
+                filename=filename,
+                incremental=incremental,
+                download=download,
+                lock=BackupJob.LOCK
+            )
+    except IntegrityError:
+        raise BackupJobBusy(active_job())
+    if background:
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.id))
+    return job
+
+
+def claim_job(job_id):
+    """Marca el trabajo como EN_PROCESO si sigue pendiente"""
+    return BackupJob.objects.filter(id=job_id, status=BackupJob.Status.PENDIENTE).update(
+        status=BackupJob.Status.EN_PROCESO,
+        started_at=timezone.now()
+    ) == 1
+
+
+def run_backup_job(job_id, progress=None, compression=None):
+    """Crea o restaura el respaldo de un trabajo pendiente y libera el candado al terminar.
+
+    progress(objetos, fracción, detalle) se llama además de guardar el avance en la caché.
+    """
+    if not claim_job(job_id):
+        return
+    job = BackupJob.objects.get(id=job_id)
+
+    def report(count, fraction, detail=''):
+        cache.set(_progress_key(job_id), {'processed': count, 'percent': int(fraction * 100), 'detail': detail}, PROGRESS_TTL)
+        if progress:
+            progress(count, fraction, detail)
+
+    try:
+        if job.kind == BackupJob.Kind.CREAR:
+            backup = create_backup_file(compression=compression, incremental=job.incremental, progress=report)
+            filename = backup['filename']
+            kind = 'incremental' if backup['type'] == 'incremental' else 'completo'
+            result = f'Respaldo {kind} de {backup["size"]} KB'
+        else:
+            filename = job.filename
+            applied, loaded = restore_and_rebuild(
+                filename, progress=lambda name, count, fraction: report(count, fraction, name)
+            )
+            result = f'{applied} archivo(s), {loaded} registros'
+        BackupJob.objects.filter(id=job_id).update(
+            status=BackupJob.Status.COMPLETADO,
+            filename=filename,
+            result=result,
+            finished_at=timezone.now(),
+            lock=None
+        )
+    except Exception as e:
+        BackupJob.objects.filter(id=job_id).update(
+            status=BackupJob.Status.ERROR,
+            error=str(e),
+            finished_at=timezone.now(),
+            lock=None
+        )
+    finally:
+        cache.delete(_progress_key(job_id))
+
+
+def _run_in_thread(job_id):
+    try:
+        run_backup_job(job_id)
+    finally:
+        # Cada hilo abre su propia conexión: cerrarla al terminar
+        connection.close()
+
+
+def job_progress(job):
+    """Datos de progreso de un trabajo para la respuesta JSON"""
+    progress = (cache.get(_progress_key(job.id)) or {}) if job.status == BackupJob.Status.EN_PROCESO else {}
+    data = {
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'percent': 100 if job.status == BackupJob.Status.COMPLETADO else progress.get('percent', 0),
+        'processed': progress.get('processed', 0),
+        'detail': progress.get('detail', ''),
+        'filename': job.filename,
+        'result': job.result,
+        'error': job.error,
+        'duration': job.duration,
+    }
+    if job.status == BackupJob.Status.COMPLETADO and job.kind == BackupJob.Kind.CREAR:
+        data['download_url'] = reverse('dashboard:download_backup_file', args=[job.filename])
+    return data
@@ -0,0 +1,998 @@
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: bloqueo con msvcrt
+    fcntl = None
+    import msvcrt
+
+# Directorio de respaldos y compresión por defecto ('gz' rápida, 'xz' más pequeña)
+BACKUP_DIR = os.path.join(settings.BASE_DIR, 'backups')
+BACKUP_COMPRESSION = getattr(settings, 'BACKUP_COMPRESSION', 'gz')
+
+# Extensiones que acepta loaddata y que se listan en el panel
+BACKUP_EXTENSIONS = ('.json', '.json.gz', '.json.xz')
+META_SUFFIX = '.meta.json'
+
+# Modelos que no se respaldan (igual que los --exclude que usaba dumpdata);
+# el historial de trabajos de respaldo no debe cambiar al restaurar
+EXCLUDED_MODELS = {'contenttypes.contenttype', 'auth.permission', 'sessions.session', 'model_poll.backupjob'}
+
+# Respaldos incrementales: campo que indica cuándo cambió cada fila
+INCREMENTAL_FIELDS = {
+    'model_poll.user': 'updated_at',
+    'model_poll.poll': 'updated_at',
+    'model_poll.question': 'updated_at',
+    'model_poll.options': 'updated_at',
+    'model_poll.participation': 'sent_date',
+    'model_poll.questiondetails': 'participation__sent_date',
+    'model_poll.sitecontent': 'updated_at',
+}
+
+# Tablas derivadas o de trabajo que no van en los incrementales:
+# se reconstruyen después de restaurar (reconcile_tallies, rebuild_*_search)
+INCREMENTAL_SKIPPED_MODELS = {
+    'model_poll.optiontally',
+    'model_poll.usersearchtoken',
+    'model_poll.pollsearchtoken',
+    'model_poll.reportjob',
+}
+
+# Margen hacia atrás para no perder filas de transacciones que confirmaron
+# después de iniciar el respaldo anterior con una fecha anterior
+INCREMENTAL_MARGIN = timedelta(minutes=5)
+
+CHUNK_SIZE = 1024 * 1024
+
+# Almacén por contenido: cada respaldo es un manifiesto con los hashes de sus
+# fragmentos; los fragmentos iguales entre respaldos se guardan una sola vez
+STORE_DIRNAME = 'store'
+
+# Fragmentos definidos por contenido: se corta antes de un objeto ("model":)
+# cuando el hash de los bytes previos cumple la máscara, así un cambio en una
+# fila solo altera su fragmento y los siguientes vuelven a coincidir
+CHUNK_MIN = 16 * 1024
+CHUNK_MAX = 1024 * 1024
+CHUNK_MASK = 0x7F
+CHUNK_MARKER = b'"model":'
+CHUNK_WINDOW = 64
+
+# Separadores entre objetos del arreglo JSON de un respaldo
+_WHITESPACE = re.compile(r'[\s,]*')
+
+# Los fragmentos sin referencias se borran después de este tiempo (un respaldo
+# en curso puede estar usándolos antes de escribir su manifiesto)
+GC_GRACE = timedelta(hours=1)
+
+# Catálogo: índice JSON con el tamaño, checksum, registros, migraciones y
+# duración de cada respaldo; el panel se dibuja solo con él
+CATALOG_FILENAME = 'catalog.json'
+# Lo modifican el servidor y los comandos (procesos distintos): se bloquea este archivo
+CATALOG_LOCK_FILENAME = 'catalog.lock'
+
+# Estados del catálogo (los marca verify_backups)
+STATUS_OK = 'ok'
+STATUS_PENDING = 'sin_verificar'
+STATUS_UNKNOWN = 'desconocido'
+STATUS_CORRUPT = 'corrupto'
+STATUS_MISSING = 'faltante'
+STATUS_LABELS = {
+    STATUS_OK: 'Verificado',
+    STATUS_PENDING: 'Sin verificar',
+    STATUS_UNKNOWN: 'Desconocido',
+    STATUS_CORRUPT: 'Dañado',
+    STATUS_MISSING: 'Falta el archivo',
+}
+
+_catalog_lock = threading.Lock()
+
+# Retención por defecto: último respaldo de N días y de M semanas
+BACKUP_KEEP_DAILY = getattr(settings, 'BACKUP_KEEP_DAILY', 7)
+BACKUP_KEEP_WEEKLY = getattr(settings, 'BACKUP_KEEP_WEEKLY', 4)
+
+# Cada fragmento se comprime por separado: los miembros gzip y los flujos xz
+# concatenados forman un archivo válido, así la descarga es la unión de fragmentos
+_COMPRESSORS = {
+    'gz': lambda data: gzip.compress(data, compresslevel=6, mtime=0),
+    'xz': lambda data: lzma.compress(data, preset=6),
+    'raw': lambda data: data,
+}
+
+_DECOMPRESSORS = {
+    'gz': lambda fileobj: gzip.GzipFile(fileobj=fileobj),
+    'xz': lambda fileobj: lzma.LZMAFile(fileobj),
+}
+
+
+class ChunkWriter(io.RawIOBase):
+    """Recibe el JSON sin comprimir, lo corta en fragmentos por contenido y los guarda.
+
+    Los fragmentos que ya existen en el almacén no se vuelven a escribir.
+    """
+
+    def __init__(self, compression):
+        self.compression = compression or 'raw'
+        self.size = 0
+        self.new_bytes = 0
+        self.chunks = []
+        self._buffer = bytearray()
+        self._scan = 0
+        self._digest = hashlib.sha256()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._digest.update(data)
+        self.size += len(data)
+        self._cut()
+        return len(data)
+
+    @property
+    def sha256(self):
+        """Checksum del JSON sin comprimir"""
+        return self._digest.hexdigest()
+
+    def _cut(self):
+        buffer = self._buffer
+        while len(buffer) >= CHUNK_MIN:
+            start = max(self._scan, CHUNK_MIN)
+            cut = None
+            while (position := buffer.find(CHUNK_MARKER, start, CHUNK_MAX)) != -1:
+                if zlib.crc32(buffer[position - CHUNK_WINDOW:position]) & CHUNK_MASK == 0:
+                    cut = position
+                    break
+                start = position + 1
+            if cut is None:
+                if len(buffer) < CHUNK_MAX:
+                    # El marcador puede quedar partido entre dos escrituras
+                    self._scan = max(len(buffer) - len(CHUNK_MARKER) + 1, 0)
+                    return
+                cut = CHUNK_MAX
+            self._store(bytes(buffer[:cut]))
+            del buffer[:cut]
+            self._scan = 0
+
+    def finish(self):
+        if self._buffer:
+            self._store(bytes(self._buffer))
+            self._buffer = bytearray()
+        return self.chunks
+
+    def _store(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = chunk_path(digest, self.compression)
+        try:
+            # Marcar el fragmento como usado para que la limpieza no lo borre
+            os.utime(path)
+            stored_size = os.path.getsize(path)
+        except FileNotFoundError:
+            compressed = _COMPRESSORS[self.compression](data)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+            stored_size = len(compressed)
+            self.new_bytes += stored_size
+        self.chunks.append([digest, stored_size])
+
+
+class ChunkReader(io.RawIOBase):
+    """Lee los fragmentos de un manifiesto como un solo archivo (admite seek para Range)"""
+
+    def __init__(self, chunks, compression):
+        self._paths = [chunk_path(digest, compression) for digest, _ in chunks]
+        self._starts = []
+        self.size = 0
+        for _, stored_size in chunks:
+            self._starts.append(self.size)
+            self.size += stored_size
+        self._position = 0
+        self._file = None
+        self._index = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._position = max(offset, 0)
+        return self._position
+
+    def readinto(self, buffer):
+        if self._position >= self.size:
+            return 0
+        index = bisect_right(self._starts, self._position) - 1
+        if index != self._index:
+            if self._file:
+                self._file.close()
+            self._file = open(self._paths[index], 'rb')
+            self._index = index
+        end = self._starts[index + 1] if index + 1 < len(self._starts) else self.size
+        self._file.seek(self._position - self._starts[index])
+        count = self._file.readinto(memoryview(buffer)[:min(len(buffer), end - self._position)])
+        if not count:
+            raise ValueError(f'Fragmento incompleto: {os.path.basename(self._paths[index])}')
+        self._position += count
+        return count
+
+    def close(self):
+        if self._file:
+            self._file.close()
+        super().close()
+
+
+def _store_dir(*parts):
+    return os.path.join(BACKUP_DIR, STORE_DIRNAME, *parts)
+
+
+def chunk_path(digest, compression):
+    return _store_dir('chunks', digest[:2], f'{digest}.{compression or "raw"}')
+
+
+def _manifest_path(filename):
+    return _store_dir('manifests', filename + '.json')
+
+
+def _file_compression(filename):
+    """'gz', 'xz' o None según la extensión del respaldo"""
+    extension = filename.rsplit('.', 1)[-1]
+    return extension if extension in ('gz', 'xz') else None
+
+
+def is_backup_filename(filename):
+    return (
+        filename.endswith(BACKUP_EXTENSIONS)
+        and not filename.endswith(META_SUFFIX)
+        and os.path.basename(filename) == filename
+    )
+
+
+def is_stored(filename):
+    """Indica si el respaldo está en el almacén por fragmentos (y no como archivo suelto)"""
+    return os.path.isfile(_manifest_path(filename))
+
+
+def backup_exists(filename):
+    return is_backup_filename(filename) and (
+        is_stored(filename) or os.path.isfile(os.path.join(BACKUP_DIR, filename))
+    )
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_json(path, data):
+    # Escritura atómica: un manifiesto a medias nunca aparece en la lista
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def read_meta(filename):
+    """Manifiesto de un respaldo del almacén, o metadatos de un archivo suelto"""
+    if is_stored(filename):
+        return _read_json(_manifest_path(filename))
+    return _read_json(os.path.join(BACKUP_DIR, filename) + META_SUFFIX)
+
+
+def open_backup(filename):
+    """Archivo binario (comprimido como indica su extensión) de un respaldo"""
+    if is_stored(filename):
+        meta = read_meta(filename)
+        return io.BufferedReader(ChunkReader(meta['chunks'], meta.get('compression')), CHUNK_SIZE)
+    return open(os.path.join(BACKUP_DIR, filename), 'rb')
+
+
+def backup_size(filename):
+    if is_stored(filename):
+        return sum(stored_size for _, stored_size in read_meta(filename)['chunks'])
+    return os.path.getsize(os.path.join(BACKUP_DIR, filename))
+
+
+def open_backup_text(raw, filename):
+    """Texto JSON de un respaldo a partir de su archivo binario (descomprime según la extensión)"""
+    compression = _file_compression(filename)
+    return io.TextIOWrapper(_DECOMPRESSORS[compression](raw) if compression else raw, encoding='utf-8')
+
+
+def iter_backup_objects(text):
+    """Recorre el arreglo JSON de un respaldo objeto por objeto, sin cargarlo completo.
+
+    Acepta el JSON compacto de los respaldos y el JSON indentado de dumpdata.
+    """
+    decoder = json.JSONDecoder()
+    buffer = text.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('El respaldo no es un arreglo JSON.')
+    position = 1
+    while True:
+        position = _WHITESPACE.match(buffer, position).end()
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # Objeto cortado al final del buffer: leer la siguiente parte
+            chunk = text.read(CHUNK_SIZE)
+            if not chunk:
+                raise ValueError('El respaldo está incompleto o dañado.')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        position = end
+        yield obj
+
+
+def backup_models():
+    """Modelos a respaldar, ordenados para que loaddata respete las dependencias"""
+    app_list = [(app_config, None) for app_config in apps.get_app_configs() if app_config.models_module is not None]
+    return [
+        model for model in serializers.sort_dependencies(app_list, allow_cycles=True)
+        if model._meta.label_lower not in EXCLUDED_MODELS and not model._meta.proxy and model._meta.managed
+    ]
+
+
+def _backup_querysets(since=None):
+    """Consultas a respaldar: todo, o solo lo creado/modificado desde `since`.
+
+    En un incremental las tablas sin campo de cambios (roles, grupos...) se
+    copian completas; son pequeñas.
+    """
+    querysets = []
+    for model in backup_models():
+        label = model._meta.label_lower
+        queryset = model._default_manager.order_by(model._meta.pk.name)
+        if since is not None:
+            if label in INCREMENTAL_SKIPPED_MODELS:
+                continue
+            if label in INCREMENTAL_FIELDS:
+                queryset = queryset.filter(**{f'{INCREMENTAL_FIELDS[label]}__gte': since})
+        querysets.append((label, queryset))
+    return querysets
+
+
+def _iter_objects(querysets, counts, progress=None):
+    total = 0
+    for index, (label, queryset) in enumerate(querysets):
+        counts[label] = 0
+        for obj in queryset.iterator(chunk_size=2000):
+            counts[label] += 1
+            total += 1
+            if progress and total % 1000 == 0:
+                progress(total, index / len(querysets))
+            yield obj
+    if progress:
+        progress(total, 1.0)
+
+
+def _pk_ranges(queryset):
+    """Ids existentes como rangos [[inicio, fin], ...] (detecta filas eliminadas al restaurar)"""
+    ranges = []
+    for pk in queryset.values_list('pk', flat=True).iterator(chunk_size=10000):
+        if not isinstance(pk, int):
+            return None
+        if ranges and pk == ranges[-1][1] + 1:
+            ranges[-1][1] = pk
+        else:
+            ranges.append([pk, pk])
+    return ranges
+
+
+def write_backup(compression, objects):
+    """Serializa los objetos como JSON compacto directamente hacia el almacén por fragmentos.
+
+    Se escribe por partes: nunca se tiene el respaldo completo en memoria.
+    Devuelve el ChunkWriter con los fragmentos y el tamaño sin comprimir.
+    """
+    writer = ChunkWriter(compression)
+    text = io.TextIOWrapper(io.BufferedWriter(writer, CHUNK_SIZE), encoding='utf-8')
+    serializers.serialize('json', objects, stream=text, separators=(',', ':'))
+    text.flush()
+    text.detach()
+    writer.finish()
+    return writer
+
+
+def _write_manifest(filename, writer, meta):
+    meta.update({
+        'raw_size': writer.size,
+        'sha256': writer.sha256,
+        'compression': writer.compression if writer.compression != 'raw' else None,
+        'new_bytes': writer.new_bytes,
+        'chunks': writer.chunks,
+    })
+    _write_json(_manifest_path(filename), meta)
+
+
+def _backup_names():
+    """Nombres de todos los respaldos: manifiestos del almacén y archivos sueltos"""
+    names = set()
+    if os.path.isdir(_store_dir('manifests')):
+        names.update(name[:-len('.json')] for name in os.listdir(_store_dir('manifests')) if name.endswith('.json'))
+    if os.path.isdir(BACKUP_DIR):
+        names.update(name for name in os.listdir(BACKUP_DIR) if is_backup_filename(name))
+    return {name for name in names if is_backup_filename(name)}
+
+
+def latest_chain_backup():
+    """Último respaldo creado por este módulo (con manifiesto), base de un incremental"""
+    latest = None
+    for filename in _backup_names():
+        meta = read_meta(filename)
+        if meta.get('started_at') and (latest is None or meta['started_at'] > latest[1]['started_at']):
+            latest = (filename, meta)
+    return latest
+
+
+def create_backup_file(compression=None, incremental=False, progress=None):
+    """Crea un respaldo comprimido en el almacén de BACKUP_DIR y devuelve su información.
+
+    Con incremental=True solo exporta las filas creadas o modificadas desde el
+    respaldo anterior y lo enlaza en el manifiesto (parent/base). Si no hay
+    respaldo anterior se crea uno completo. progress(objetos, fracción) se
+    llama cada 1000 objetos.
+    """
+    compression = compression or BACKUP_COMPRESSION
+
+    start = time.perf_counter()
+    started_at = timezone.now()
+    previous = latest_chain_backup() if incremental else None
+    if previous:
+        parent, parent_meta = previous
+        since = datetime.fromisoformat(parent_meta['started_at']) - INCREMENTAL_MARGIN
+        meta = {
+            'type': 'incremental',
+            'parent': parent,
+            'base': parent_meta.get('base') or parent,
+            'since': since.isoformat(),
+        }
+    else:
+        since = None
+        meta = {'type': 'full', 'parent': None, 'base': None, 'since': None}
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    suffix = '_inc' if since else ''
+    filename = f'backup_ait_{timestamp}{suffix}.json.{compression}'
+
+    querysets = _backup_querysets(since)
+    counts = {}
+    writer = write_backup(compression, _iter_objects(querysets, counts, progress))
+
+    meta.update({
+        'started_at': started_at.isoformat(),
+        'counts': counts,
+        'migrations': migration_state(),
+    })
+    if since:
+        # Los incrementales no traen las filas eliminadas: se guardan los ids vivos
+        meta['live_ids'] = {
+            label: _pk_ranges(apps.get_model(label)._default_manager.order_by('pk'))
+            for label in INCREMENTAL_FIELDS
+        }
+    meta['duration'] = round(time.perf_counter() - start, 2)
+    _write_manifest(filename, writer, meta)
+    register_backup(filename, STATUS_OK)
+    return backup_info(filename)
+
+
+def backup_chain(filename):
+    """Nombres del respaldo completo base y de los incrementales hasta `filename`, en orden"""
+    chain = []
+    while filename:
+        if not backup_exists(filename):
+            raise ValueError(f'No existe el respaldo {filename} (o falta en la cadena incremental).')
+        chain.append(filename)
+        filename = read_meta(filename).get('parent')
+    chain.reverse()
+    return chain
+
+
+def _store_stream(filename, fileobj, meta=None):
+    """Guarda en el almacén un respaldo leído de un archivo (comprimido según su nombre)"""
+    compression = _file_compression(filename)
+    source = _DECOMPRESSORS[compression](fileobj) if compression else fileobj
+    writer = ChunkWriter(compression)
+    while chunk := source.read(CHUNK_SIZE):
+        writer.write(chunk)
+    writer.finish()
+    meta = dict(meta or {})
+    meta.setdefault('type', 'full')
+    _write_manifest(filename, writer, meta)
+
+
+def _available_name(filename):
+    """Nombre libre para un respaldo: agrega _1, _2... antes de la extensión si ya existe"""
+    extension = next(ext for ext in sorted(BACKUP_EXTENSIONS, key=len, reverse=True) if filename.endswith(ext))
+    stem = filename[:-len(extension)]
+    candidate, number = filename, 0
+    while backup_exists(candidate):
+        number += 1
+        candidate = f'{stem}_{number}{extension}'
+    return candidate
+
+
+def save_uploaded_backup(uploaded_file):
+    """Guarda un respaldo subido en el almacén por fragmentos (se descomprime por partes).
+
+    Un nombre repetido se renombra: reemplazar el manifiesto rompería los
+    incrementales que dependen del respaldo existente. Devuelve el nombre guardado.
+    """
+    filename = _available_name(os.path.basename(uploaded_file.name))
+    uploaded_file.seek(0)
+    _store_stream(filename, uploaded_file)
+    register_backup(filename)
+    return filename
+
+
+def import_backup_files():
+    """Mueve al almacén los respaldos sueltos de BACKUP_DIR (anteriores al almacén o copiados a mano).
+
+    Devuelve la lista de nombres importados.
+    """
+    imported = []
+    for filename in sorted(_backup_names()):
+        path = os.path.join(BACKUP_DIR, filename)
+        if is_stored(filename) or not os.path.isfile(path):
+            continue
+        meta = read_meta(filename)
+        mtime = os.path.getmtime(path)
+        with open(path, 'rb') as f:
+            _store_stream(filename, f, meta)
+        # Conservar la fecha del archivo original en la lista
+        os.utime(_manifest_path(filename), (mtime, mtime))
+        _remove_loose_file(path)
+        register_backup(filename, read_catalog().get(filename, {}).get('status', STATUS_PENDING))
+        imported.append(filename)
+    return imported
+
+
+def _remove_loose_file(path):
+    os.remove(path)
+    try:
+        os.remove(path + META_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def delete_backup_file(filename, collect=True):
+    """Elimina un respaldo; sus fragmentos sin otras referencias se liberan con collect_garbage"""
+    for other in _backup_names():
+        if read_meta(other).get('parent') == filename:
+            raise ValueError(f'El respaldo incremental {other} depende de este archivo.')
+    if is_stored(filename):
+        os.remove(_manifest_path(filename))
+    else:
+        _remove_loose_file(os.path.join(BACKUP_DIR, filename))
+    _update_catalog({filename: None})
+    if collect:
+        collect_garbage()
+
+
+def collect_garbage(grace=GC_GRACE):
+    """Borra los fragmentos que ningún manifiesto usa. Devuelve (archivos, bytes) liberados"""
+    chunks_dir = _store_dir('chunks')
+    if not os.path.isdir(chunks_dir):
+        return 0, 0
+    referenced = set()
+    for filename in _backup_names():
+        if is_stored(filename):
+            meta = read_meta(filename)
+            referenced.update(
+                os.path.basename(chunk_path(digest, meta.get('compression'))) for digest, _ in meta.get('chunks', [])
+            )
+
+    limit = time.time() - grace.total_seconds()
+    removed = freed = 0
+    for directory, _, names in os.walk(chunks_dir):
+        for name in names:
+            path = os.path.join(directory, name)
+            stat = os.stat(path)
+            if name not in referenced and stat.st_mtime <= limit:
+                os.remove(path)
+                removed += 1
+                freed += stat.st_size
+    if removed:
+        _update_catalog({}, store_size=store_usage())
+    return removed, freed
+
+
+def retention_plan(keep_daily=BACKUP_KEEP_DAILY, keep_weekly=BACKUP_KEEP_WEEKLY):
+    """Respaldos del almacén que se conservan y los que sobran según la retención.
+
+    Se conserva el más reciente de cada uno de los últimos `keep_daily` días y
+    `keep_weekly` semanas con respaldos, junto con la cadena de cada incremental
+    conservado. Los archivos sueltos (sin importar) no se tocan.
+    """
+    stored = [info for info in list_backups() if info['stored']]
+    keep = set()
+    days, weeks = set(), set()
+    for info in stored:
+        day = info['date'].date()
+        week = info['date'].isocalendar()[:2]
+        if day not in days and len(days) < keep_daily:
+            days.add(day)
+            keep.add(info['filename'])
+        if week not in weeks and len(weeks) < keep_weekly:
+            weeks.add(week)
+            keep.add(info['filename'])
+    for filename in list(keep):
+        try:
+            keep.update(backup_chain(filename))
+        except ValueError:
+            # Cadena incompleta: se conserva lo que queda de ella
+            pass
+    # De más reciente a más antiguo: un incremental se borra antes que su base
+    remove = [info['filename'] for info in stored if info['filename'] not in keep]
+    return sorted(keep), remove
+
+
+def apply_retention(keep_daily=BACKUP_KEEP_DAILY, keep_weekly=BACKUP_KEEP_WEEKLY):
+    """Elimina los respaldos que sobran y los fragmentos que dejan de usarse.
+
+    Un respaldo que no se puede eliminar no detiene a los demás: se devuelve
+    en la lista de errores (eliminados, [(nombre, error)], (fragmentos, bytes)).
+    """
+    _, remove = retention_plan(keep_daily, keep_weekly)
+    removed, failed = [], []
+    for filename in remove:
+        try:
+            delete_backup_file(filename, collect=False)
+        except (OSError, ValueError) as e:
+            failed.append((filename, str(e)))
+        else:
+            removed.append(filename)
+    return removed, failed, collect_garbage()
+
+
+def migration_state():
+    """Última migración aplicada de cada app (el esquema con el que se creó un respaldo)"""
+    state = {}
+    for app, name in MigrationRecorder(connection).applied_migrations():
+        if name > state.get(app, ''):
+            state[app] = name
+    return state
+
+
+def read_catalog():
+    """Entradas del catálogo por nombre de respaldo"""
+    return _read_json(_store_dir(CATALOG_FILENAME)).get('backups', {})
+
+
+def catalog_store_size():
+    """Bytes del almacén registrados en el catálogo (sin recorrer los fragmentos)"""
+    return _read_json(_store_dir(CATALOG_FILENAME)).get('store_size', 0)
+
+
+@contextmanager
+def _locked_catalog():
+    """Catálogo completo para modificarlo; se guarda al salir.
+
+    El candado es del sistema operativo (flock / msvcrt.locking) sobre un archivo
+    aparte, así ningún proceso pierde los cambios de otro. El archivo se
+    reemplaza de forma atómica.
+    """
+    path = _store_dir(CATALOG_FILENAME)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _catalog_lock, open(_store_dir(CATALOG_LOCK_FILENAME), 'a+b') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK se rinde tras 10 intentos: seguir esperando
+                    pass
+        try:
+            catalog = _read_json(path)
+            catalog.setdefault('backups', {})
+            yield catalog
+            _write_json(path, catalog)
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _update_catalog(changes, store_size=None):
+    """Aplica {nombre: entrada} al catálogo (None elimina la entrada)"""
+    with _locked_catalog() as catalog:
+        for filename, entry in changes.items():
+            if entry is None:
+                catalog['backups'].pop(filename, None)
+            else:
+                catalog['backups'][filename] = entry
+        if store_size is not None:
+            catalog['store_size'] = store_size
+
+
+def catalog_entry(filename, status=STATUS_PENDING):
+    """Entrada del catálogo a partir del manifiesto (o de los metadatos de un archivo suelto)"""
+    stored = is_stored(filename)
+    meta = read_meta(filename)
+    path = _manifest_path(filename) if stored else os.path.join(BACKUP_DIR, filename)
+    return {
+        'filename': filename,
+        'stored': stored,
+        'type': meta.get('type', 'full'),
+        'parent': meta.get('parent'),
+        'size': backup_size(filename),
+        'raw_size': meta.get('raw_size'),
+        'new_bytes': meta.get('new_bytes'),
+        'sha256': meta.get('sha256'),
+        'counts': meta.get('counts'),
+        'migrations': meta.get('migrations'),
+        'duration': meta.get('duration'),
+        'date': datetime.fromtimestamp(os.path.getmtime(path)).isoformat(),
+        'status': status,
+        'error': '',
+        'verified_at': None,
+    }
+
+
+def register_backup(filename, status=STATUS_PENDING):
+    _update_catalog({filename: catalog_entry(filename, status)}, store_size=store_usage())
+
+
+def rebuild_catalog():
+    """Agrega al catálogo los respaldos que no tiene y marca los que ya no están en disco.
+
+    Un archivo suelto sin metadatos no lo creó el sistema: queda como desconocido.
+    Devuelve (agregados, faltantes).
+    """
+    with _locked_catalog() as catalog:
+        entries = catalog['backups']
+        names = _backup_names()
+        added = sorted(names - entries.keys())
+        for filename in added:
+            status = STATUS_PENDING if is_stored(filename) or read_meta(filename) else STATUS_UNKNOWN
+            entries[filename] = catalog_entry(filename, status)
+        missing = []
+        for filename in entries.keys() - names:
+            if entries[filename]['status'] != STATUS_MISSING:
+                entries[filename].update(status=STATUS_MISSING, error='El archivo del respaldo no existe.')
+                missing.append(filename)
+        catalog['store_size'] = store_usage()
+    return added, missing
+
+
+class _HashingReader(io.RawIOBase):
+    """Calcula el SHA-256 y el tamaño de lo que se lee de otro archivo"""
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._fileobj.read(len(buffer))
+        buffer[:len(data)] = data
+        self.digest.update(data)
+        self.size += len(data)
+        return len(data)
+
+
+def verify_backup(filename):
+    """Comprueba que un respaldo se pueda leer completo y coincida con el catálogo.
+
+    Lee todos los fragmentos, descomprime, valida el JSON objeto por objeto y
+    compara checksum y registros por modelo. Actualiza y devuelve la entrada.
+    """
+    entry = read_catalog().get(filename) or catalog_entry(filename, STATUS_UNKNOWN)
+    entry.update(error='', verified_at=timezone.now().isoformat())
+    if not backup_exists(filename):
+        entry.update(status=STATUS_MISSING, error='El archivo del respaldo no existe.')
+        return _save_verification(filename, entry)
+
+    try:
+        if is_stored(filename):
+            meta = read_meta(filename)
+            for digest, stored_size in meta['chunks']:
+                path = chunk_path(digest, meta.get('compression'))
+                if not os.path.isfile(path) or os.path.getsize(path) != stored_size:
+                    raise ValueError(f'Falta o está incompleto el fragmento {digest[:12]}.')
+
+        counts = {}
+        with open_backup(filename) as raw:
+            compression = _file_compression(filename)
+            reader = _HashingReader(_DECOMPRESSORS[compression](raw) if compression else raw)
+            text = io.TextIOWrapper(io.BufferedReader(reader, CHUNK_SIZE), encoding='utf-8')
+            for obj in iter_backup_objects(text):
+                counts[obj['model']] = counts.get(obj['model'], 0) + 1
+            while text.read(CHUNK_SIZE):
+                pass
+
+        if entry.get('sha256') and reader.digest.hexdigest() != entry['sha256']:
+            raise ValueError('El checksum no coincide con el registrado al crear el respaldo.')
+        expected = {label: count for label, count in (entry.get('counts') or {}).items() if count}
+        if expected and expected != counts:
+            raise ValueError('Los registros por modelo no coinciden con el catálogo.')
+    except (OSError, EOFError, ValueError, KeyError, lzma.LZMAError, zlib.error) as e:
+        entry.update(status=STATUS_CORRUPT, error=str(e))
+    else:
+        entry.update(
+            status=STATUS_UNKNOWN if entry['status'] == STATUS_UNKNOWN else STATUS_OK,
+            sha256=reader.digest.hexdigest(),
+            raw_size=reader.size,
+            counts=entry.get('counts') or counts,
+        )
+    return _save_verification(filename, entry)
+
+
+def _save_verification(filename, entry):
+    """Guarda el resultado de verify_backup sobre la entrada actual del catálogo.
+
+    La verificación puede tardar: solo se escriben sus campos, y no se vuelve a
+    agregar un respaldo que otro proceso eliminó mientras tanto.
+    """
+    fields = {key: entry[key] for key in ('status', 'error', 'verified_at', 'sha256', 'raw_size', 'counts')}
+    with _locked_catalog() as catalog:
+        current = catalog['backups'].get(filename)
+        if current is None and entry['status'] != STATUS_MISSING and backup_exists(filename):
+            current = catalog['backups'][filename] = entry
+        if current is not None:
+            current.update(fields)
+            entry = current
+    return entry
+
+
+def verify_catalog(pending_only=False):
+    """Actualiza el catálogo con el disco y verifica sus respaldos (los no verificados si pending_only)"""
+    rebuild_catalog()
+    entries = []
+    for filename, entry in sorted(read_catalog().items()):
+        if pending_only and entry.get('verified_at'):
+            continue
+        entries.append(verify_backup(filename))
+    return entries
+
+
+def _backup_info(entry, current_migrations=None):
+    """Datos de un respaldo para el panel a partir de su entrada del catálogo"""
+    size = entry['size']
+    raw_size = entry.get('raw_size')
+    new_bytes = entry.get('new_bytes')
+    counts = entry.get('counts') or {}
+    migrations = entry.get('migrations')
+    return {
+        'filename': entry['filename'],
+        'size': round(size / 1024, 2),  # KB
+        'raw_size': round(raw_size / 1024, 2) if raw_size is not None else None,  # KB
+        'ratio': round(raw_size / size, 1) if raw_size and size else None,
+        # Bytes que este respaldo agregó al almacén (el resto ya existía)
+        'new_size': round(new_bytes / 1024, 2) if entry['stored'] and new_bytes is not None else None,  # KB
+        'date': datetime.fromisoformat(entry['date']),
+        'type': entry.get('type', 'full'),
+        'parent': entry.get('parent'),
+        'stored': entry['stored'],
+        'status': entry['status'],
+        'status_display': STATUS_LABELS.get(entry['status'], entry['status']),
+        'error': entry.get('error', ''),
+        'rows': sum(counts.values()) if counts else None,
+        'polls': counts.get('model_poll.poll'),
+        'users': counts.get('model_poll.user'),
+        'duration': entry.get('duration'),
+        'sha256': entry.get('sha256'),
+        # Un respaldo de otro esquema puede necesitar migraciones al restaurarlo
+        'same_schema': migrations == current_migrations if migrations and current_migrations else None,
+    }
+
+
+def backup_info(filename):
+    entry = read_catalog().get(filename) or catalog_entry(filename)
+    return _backup_info(entry)
+
+
+def list_backups():
+    """Respaldos del catálogo, del más reciente al más antiguo (sin recorrer el disco)"""
+    if not os.path.exists(_store_dir(CATALOG_FILENAME)):
+        # Primera vez: crear el catálogo con los respaldos existentes
+        rebuild_catalog()
+    current_migrations = migration_state()
+    backups = [_backup_info(entry, current_migrations) for entry in read_catalog().values()]
+    backups.sort(key=lambda x: x['date'], reverse=True)
+    return backups
+
+
+def store_usage():
+    """Bytes ocupados por los fragmentos del almacén"""
+    total = 0
+    for directory, _, names in os.walk(_store_dir('chunks')):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in names)
+    return total
+
+
+def _read_range(f, length):
+    try:
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def backup_file_response(request, filename):
+    """Sirve un respaldo por partes sin cargarlo en memoria, con soporte de Range.
+
+    Permite reanudar descargas interrumpidas de respaldos grandes. Un respaldo
+    del almacén se envía como la unión de sus fragmentos comprimidos.
+    """
+    size = backup_size(filename)
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)', request.headers.get('Range', '').strip())
+
+    if not match or not (match[1] or match[2]):
+        response = FileResponse(open_backup(filename), as_attachment=True, filename=filename)
+        response['Content-Length'] = str(size)
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    if match[1]:
+        start = int(match[1])
+        end = min(int(match[2]), size - 1) if match[2] else size - 1
+    else:
+        # bytes=-N: los últimos N bytes
+        start = max(size - int(match[2]), 0)
+        end = size - 1
+
+    if start > end or start >= size:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    f = open_backup(filename)
+    f.seek(start)
+    response = StreamingHttpResponse(_read_range(f, end - start + 1), status=206, content_type='application/octet-stream')
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Accept-Ranges'] = 'bytes'
+    return response
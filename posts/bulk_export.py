@@ -0,0 +1,96 @@
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.conf import settings
+from django.db import connections
+from django.utils.text import slugify
+
+# Procesos que generan reportes en paralelo durante una exportación masiva
+BULK_EXPORT_PROCESSES = getattr(settings, 'REPORT_BULK_EXPORT_PROCESSES', 2)
+
+# Este módulo se importa en los procesos hijos antes de django.setup():
+# los modelos y el código de reportes se importan dentro de las funciones.
+
+
+def _init_worker():
+    """Inicializa Django en cada proceso hijo (contexto spawn)"""
+    import django
+    django.setup()
+
+
+def render_poll_report(poll_id):
+    """Genera el PDF de una encuesta en un proceso hijo; devuelve (nombre de archivo, bytes)"""
+    from model_poll.models import Poll
+    from .reports import build_poll_report
+    from .results_cache import get_results_snapshot
+
+    try:
+        poll = Poll.objects.select_related('created_by').get(id=poll_id)
+        pdf = build_poll_report(poll, get_results_snapshot(poll))
+        return report_filename(poll), pdf
+    finally:
+        connections.close_all()
+
+
+def report_filename(poll):
+    return f'Reporte_{poll.id}_{slugify(poll.title) or "encuesta"}.pdf'
+
+
+class _ZipStream:
+    """Archivo de solo escritura que acumula lo que zipfile escribe para enviarlo por partes"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_reports_zip(poll_ids, processes=None, on_report=None):
+    """Genera un ZIP con el reporte PDF de cada encuesta y lo entrega por partes.
+
+    Cada reporte se dibuja en un proceso separado (matplotlib y reportlab usan
+    CPU y pyplot no es seguro entre hilos). Los PDF se agregan al ZIP en el
+    orden en que terminan. on_report(nombre, error) se llama por cada encuesta.
+    """
+    poll_ids = list(poll_ids)
+    stream = _ZipStream()
+    archive = zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    if poll_ids:
+        # Los hijos no deben heredar conexiones abiertas del proceso padre
+        connections.close_all()
+        workers = min(processes or BULK_EXPORT_PROCESSES, len(poll_ids))
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as executor:
+            futures = {executor.submit(render_poll_report, poll_id): poll_id for poll_id in poll_ids}
+            for future in as_completed(futures):
+                try:
+                    filename, pdf = future.result()
+                except Exception as e:
+                    filename = f'Reporte_{futures[future]}_error.txt'
+                    archive.writestr(filename, f'No se pudo generar el reporte: {e}')
+                    if on_report:
+                        on_report(filename, e)
+                else:
+                    archive.writestr(filename, pdf)
+                    if on_report:
+                        on_report(filename, None)
+                yield stream.pop()
+
+    archive.close()
+    yield stream.pop()
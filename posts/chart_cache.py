@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import tempfile
+from io import BytesIO
+from django.conf import settings
+
+# Subdirectorio de MEDIA_ROOT y tamaño máximo de la caché de gráficas de los reportes PDF
+CHART_CACHE_SUBDIR = 'report_charts'
+CHART_CACHE_MAX_BYTES = getattr(settings, 'PDF_CHART_CACHE_MAX_BYTES', 50 * 1024 * 1024)
+
+PIE_COLORS = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40']
+CHART_DPI = 150
+CHART_FIGSIZE = (6, 4)
+
+
+def _render_chart(chart_type, labels, values, style):
+    """Dibuja la gráfica con matplotlib y devuelve el PNG en bytes.
+
+    Usa Figure directamente (sin pyplot) para poder dibujar desde varios hilos.
+    """
+    from matplotlib.figure import Figure
+
+    chart_buffer = BytesIO()
+    fig = Figure(figsize=CHART_FIGSIZE)
+    ax = fig.subplots()
+
+    if chart_type == 'pie':
+        if values:
+            ax.pie(values, labels=labels, autopct='%1.1f%%', colors=PIE_COLORS[:len(values)])
+        else:
+            ax.text(0.5, 0.5, 'Sin respuestas', ha='center', va='center', transform=ax.transAxes, fontsize=12)
+
+    elif chart_type == 'bar':
+        ax.bar(labels, values, color=style['color'])
+        ax.set_xlabel(style['xlabel'], fontsize=10)
+        ax.set_ylabel('Número de respuestas', fontsize=10)
+        ax.set_ylim(0, max(values) + 1 if values and max(values) > 0 else 1)
+
+    fig.tight_layout()
+    fig.savefig(chart_buffer, format='png', dpi=CHART_DPI, bbox_inches='tight')
+    return chart_buffer.getvalue()
+
+
+def _chart_key(chart_type, labels, values, style):
+    payload = json.dumps(
+        [chart_type, list(labels), list(values), style, CHART_DPI, CHART_FIGSIZE],
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _cache_dir():
+    # Se lee en cada llamada: sigue a MEDIA_ROOT aunque cambie después de importar el módulo
+    return os.path.join(settings.MEDIA_ROOT, CHART_CACHE_SUBDIR)
+
+
+def _evict(keep_path):
+    """Elimina las gráficas menos usadas hasta quedar bajo CHART_CACHE_MAX_BYTES"""
+    entries = []
+    total = 0
+    for entry in os.scandir(os.path.dirname(keep_path)):
+        if entry.is_file() and entry.name.endswith('.png'):
+            stats = entry.stat()
+            entries.append((stats.st_mtime, stats.st_size, entry.path))
+            total += stats.st_size
+
+    if total <= CHART_CACHE_MAX_BYTES:
+        return
+
+    for mtime, size, path in sorted(entries):
+        if path == keep_path:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        if total <= CHART_CACHE_MAX_BYTES:
+            break
+
+
+def chart_png(chart_type, labels, values, style=None):
+    """Devuelve el PNG de una gráfica, dibujándola solo si no está en caché.
+
+    La clave es un hash de (tipo, etiquetas, valores, estilo); al usar una gráfica
+    se actualiza su fecha de modificación para el desalojo LRU.
+    """
+    style = style or {}
+    cache_dir = _cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f'{_chart_key(chart_type, labels, values, style)}.png')
+
+    try:
+        with open(path, 'rb') as f:
+            png = f.read()
+    except FileNotFoundError:
+        png = None
+
+    if png is not None:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # Desalojada por otro proceso mientras se leía
+        return png
+
+    png = _render_chart(chart_type, labels, values, style)
+
+    # Escritura atómica para que otros procesos nunca lean un archivo incompleto
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(png)
+    os.replace(tmp_path, path)
+
+    _evict(path)
+    return png
@@ -0,0 +1,60 @@
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from model_poll.models import SiteContent
+
+# Vencimiento de seguridad del contenido en caché; las señales lo invalidan
+# en todos los procesos porque la caché (settings.CACHES) es compartida
+SITE_CONTENT_CACHE_TTL = getattr(settings, 'SITE_CONTENT_CACHE_TTL', 300)
+
+VERSION_KEY = 'site_content:version'
+
+
+def content_version():
+    """Versión actual del contenido del sitio; cambia con cada alta, edición o baja"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _load_active_content():
+    grouped = {content_type: [] for content_type in SiteContent.ContentType.values}
+    for content in SiteContent.objects.filter(is_active=True).order_by('content_type', 'order'):
+        grouped[content.content_type].append(content)
+    return grouped
+
+
+def active_content():
+    """Contenido activo agrupado por content_type ({tipo: [SiteContent, ...]} en orden).
+
+    La clave incluye la versión: un proceso que leyó datos viejos los guarda
+    bajo una versión que ya nadie consulta.
+    """
+    key = f'site_content:{content_version()}'
+    grouped = cache.get(key)
+    if grouped is None:
+        grouped = _load_active_content()
+        cache.set(key, grouped, SITE_CONTENT_CACHE_TTL)
+    return grouped
+
+
+def active_content_of(content_type):
+    """Lista del contenido activo de un tipo, por orden de visualización"""
+    return active_content().get(content_type, [])
+
+
+def invalidate_site_content():
+    """Cambia la versión para que todos los procesos vuelvan a leer el contenido"""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+@receiver(post_save, sender=SiteContent)
+@receiver(post_delete, sender=SiteContent)
+def _site_content_changed(sender, **kwargs):
+    # Después del commit, para que otro proceso no recargue datos sin confirmar
+    transaction.on_commit(invalidate_site_content)
@@ -0,0 +1,60 @@
+import csv
+from model_poll.models import Participation, QuestionDetails
+
+CSV_HEADER = ['Participante', 'Cédula', 'Fecha de envío', 'Pregunta', 'Tipo', 'Opción', 'Valor', 'Respuesta de texto']
+
+
+class _Echo:
+    """Pseudo-archivo para csv.writer: devuelve cada línea en lugar de guardarla"""
+
+    def write(self, value):
+        return value
+
+
+def _answer_batches(poll, batch_size):
+    """Respuestas de la encuesta por bloques de `batch_size` participaciones.
+
+    Paginación por id de participación (keyset) en lugar de .iterator(): con
+    mysqlclient el cursor trae todo el resultado al cliente de una vez.
+    """
+    last_id = 0
+    while True:
+        participation_ids = list(
+            Participation.objects.filter(poll=poll, id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not participation_ids:
+            return
+        last_id = participation_ids[-1]
+        yield (
+            QuestionDetails.objects
+            .filter(participation_id__in=participation_ids)
+            .select_related('participation__user', 'question', 'selected_options')
+            .order_by('participation_id', 'question__order', 'question_id')
+        )
+
+
+def stream_poll_answers_csv(poll, batch_size=500):
+    """Genera las filas CSV de todas las respuestas de una encuesta, una por QuestionDetails.
+
+    La memoria depende del tamaño del bloque, no del número de respuestas.
+    """
+    writer = csv.writer(_Echo())
+    # BOM para que Excel reconozca UTF-8
+    yield '\ufeff' + writer.writerow(CSV_HEADER)
+
+    for answers in _answer_batches(poll, batch_size):
+        for answer in answers:
+            user = answer.participation.user
+            option = answer.selected_options
+            yield writer.writerow([
+                user.username,
+                user.cedula or '',
+                answer.participation.sent_date.strftime('%d/%m/%Y %H:%M:%S'),
+                answer.question.question_text,
+                answer.question.get_question_type_display(),
+                option.options_text if option else '',
+                option.value if option and option.value is not None else '',
+                answer.answer_text or '',
+            ])
@@ -5,6 +5,7 @@ app_name = 'dashboard'
 
 urlpatterns = [
     path('', views.poll_manager, name='home'),
+    path('polls/', views.poll_manager_rows, name='poll_rows'),
     path('users/', views.user_list, name='users'),
     path('create/', views.create_poll, name='create'),
     path('statistics/', views.poll_statistics, name='statistics'),
@@ -12,10 +13,12 @@ urlpatterns = [
     path('content/<int:content_id>/delete/', views.delete_content, name='delete_content'),
     path('backup/', views.backup_manager, name='backup'),
     path('backup/download/', views.download_backup, name='download_backup'),
+    path('backup/download/<str:filename>/', views.download_backup_file, name='download_backup_file'),
     path('backup/create/', views.create_backup, name='create_backup'),
     path('backup/upload/', views.upload_backup, name='upload_backup'),
     path('backup/restore/<str:filename>/', views.restore_backup, name='restore_backup'),
     path('backup/delete/<str:filename>/', views.delete_backup, name='delete_backup'),
+    path('backup/jobs/<int:job_id>/', views.backup_job_status, name='backup_job_status'),
     path('change_user_role/<int:user_id>/<str:new_role>/', views.change_user_role, name='change_user_role'),
     path('manage_user/<int:user_id>/', views.manage_user, name='manage_user'),
     path('toggle_user/<int:user_id>/', views.toggle_user, name='toggle_user'),
@@ -23,4 +26,9 @@ urlpatterns = [
     path('<int:poll_id>/edit/', views.edit_poll, name='edit'),
     path('<int:poll_id>/delete/', views.delete_poll, name='delete'),
     path('export-pdf/<int:poll_id>/', views.export_poll_pdf, name='export_pdf'),
+    path('export-csv/<int:poll_id>/', views.export_poll_csv, name='export_csv'),
+    path('export-zip/', views.export_polls_zip, name='export_zip'),
+    path('export-pdf/<int:poll_id>/job/', views.enqueue_poll_report, name='export_pdf_job'),
+    path('export-jobs/<int:job_id>/', views.report_job_status, name='export_job_status'),
+    path('export-jobs/<int:job_id>/download/', views.download_report_job, name='export_job_download'),
 ]
@@ -0,0 +1,37 @@
+from django.db.models import Min
+from django.utils import timezone
+from model_poll.models import Poll
+
+
+def apply_due_transitions(now=None):
+    """Cierra las encuestas vencidas y activa los borradores programados cuya fecha de inicio llegó.
+
+    Solo se activan los borradores marcados con auto_activate: un borrador sin
+    programar sigue siendo borrador aunque tenga fecha de inicio. Cada
+    transición es un único UPDATE; devuelve (cerradas, activadas).
+    """
+    now = now or timezone.now()
+    closed = Poll.objects.filter(
+        status=Poll.Status.ACTIVA,
+        end_date__isnull=False,
+        end_date__lt=now
+    ).update(status=Poll.Status.CERRADA, updated_at=now)
+
+    # Un borrador cuyo periodo ya terminó no se activa
+    activated = Poll.objects.filter(
+        status=Poll.Status.BORRADOR,
+        auto_activate=True,
+        star_date__isnull=False,
+        star_date__lte=now
+    ).exclude(end_date__lt=now).update(status=Poll.Status.ACTIVA, auto_activate=False, updated_at=now)
+
+    return closed, activated
+
+
+def next_transition_at(now=None):
+    """Fecha de la próxima transición programada (cierre o activación), o None"""
+    now = now or timezone.now()
+    next_end = Poll.objects.filter(status=Poll.Status.ACTIVA, end_date__gte=now).aggregate(due=Min('end_date'))['due']
+    next_start = Poll.objects.filter(status=Poll.Status.BORRADOR, auto_activate=True, star_date__gt=now).aggregate(due=Min('star_date'))['due']
+    due_dates = [due for due in (next_end, next_start) if due]
+    return min(due_dates) if due_dates else None
@@ -0,0 +1,147 @@
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from model_poll.models import Poll, Question, Participation, PollSearchToken, search_tokens
+
+
+def _count_subquery(model):
+    counts = (
+        model.objects.filter(poll=OuterRef('pk'))
+        .order_by()
+        .values('poll')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def with_poll_counts(polls):
+    """Agrega question_count y participation_count a cada encuesta.
+
+    Son subconsultas correlacionadas: evitan un COUNT por fila en las plantillas
+    sin multiplicar filas como harían dos JOIN con Count.
+    """
+    return polls.annotate(
+        question_count=_count_subquery(Question),
+        participation_count=_count_subquery(Participation),
+    )
+
+
+# Ordenamientos permitidos en el listado del panel (parámetro sort); el id desempata
+# para que la paginación no repita ni salte encuestas con la misma fecha
+MANAGER_SORTS = {
+    'fecha': ('-star_date', '-id'),
+    'fecha_asc': ('star_date', 'id'),
+    'titulo': ('title', 'id'),
+    'preguntas': ('-question_count', '-id'),
+    'respuestas': ('-participation_count', '-id'),
+}
+
+
+def manager_polls(user):
+    """Encuestas que un usuario puede ver en el panel de gestión"""
+    # Administrador: Ve todas las encuestas
+    # Trabajador: Solo ve encuestas públicas
+    if user.rol.name == 'Administrador':
+        return Poll.objects.all()
+    return Poll.objects.filter(is_public=True)
+
+
+def filter_manager_polls(polls, params):
+    """Aplica los filtros del panel (status, visibility, author) y el orden (sort).
+
+    Devuelve el queryset anotado con los conteos, listo para paginar.
+    """
+    status_filter = params.get('status', '')
+    visibility = params.get('visibility', '')
+    author = params.get('author', '')
+
+    if status_filter in Poll.Status.values:
+        polls = polls.filter(status=status_filter)
+
+    if visibility == 'publica':
+        polls = polls.filter(is_public=True)
+    elif visibility == 'interna':
+        polls = polls.filter(is_public=False)
+
+    if author.isdigit():
+        polls = polls.filter(created_by_id=author)
+
+    ordering = MANAGER_SORTS.get(params.get('sort'), MANAGER_SORTS['fecha'])
+    return with_poll_counts(polls).order_by(*ordering)
+
+
+def search_polls(polls, search_query):
+    """Filtra por el índice PollSearchToken y ordena por relevancia.
+
+    Cada palabra buscada debe ser prefijo de alguna palabra del título, la
+    descripción o el nombre del autor. La relevancia suma los pesos de las
+    palabras que coinciden (título 3, autor 2, descripción 1).
+    """
+    terms = [term for term in search_tokens(search_query) if len(term) > 1]
+    if not terms:
+        return polls
+
+    matches = Q()
+    for term in terms:
+        polls = polls.filter(pk__in=PollSearchToken.objects.filter(token__istartswith=term).values('poll'))
+        matches |= Q(token__istartswith=term)
+
+    rank = (
+        PollSearchToken.objects.filter(matches, poll=OuterRef('pk'))
+        .order_by()
+        .values('poll')
+        .annotate(total=Sum('weight'))
+        .values('total')
+    )
+    return polls.annotate(search_rank=Subquery(rank, output_field=IntegerField())).order_by('-search_rank', '-star_date')
+
+
+def rebuild_poll_search():
+    """Reconstruye PollSearchToken para todas las encuestas (tras restauraciones)"""
+    with transaction.atomic():
+        PollSearchToken.objects.all().delete()
+        for poll in Poll.objects.select_related('created_by').iterator():
+            PollSearchToken.refresh_for(poll)
+    return PollSearchToken.objects.count()
+
+
+def can_view_statistics(user, poll):
+    """Si el usuario ve la encuesta en estadísticas (y puede exportar sus reportes)"""
+    # Misma regla que statistics_polls: el Trabajador solo ve encuestas públicas
+    return user.rol.name == 'Administrador' or poll.is_public
+
+
+def statistics_polls(user, params):
+    """Encuestas visibles en el dashboard de estadísticas con los filtros aplicados.
+
+    user=None devuelve todas las encuestas (uso desde comandos de gestión).
+    params es un diccionario (por ejemplo request.GET) con search, status,
+    date_from y date_to.
+    """
+    # Administrador: Ve todas las encuestas
+    # Trabajador: Solo ve encuestas públicas (is_public=True)
+    if user is None or user.rol.name == 'Administrador':
+        all_polls = Poll.objects.all().order_by('-star_date')
+    else:
+        all_polls = Poll.objects.filter(is_public=True).order_by('-star_date')
+    
+    # Aplicar filtros
+    search_query = params.get('search', '')
+    status_filter = params.get('status', '')
+    date_from = params.get('date_from', '')
+    date_to = params.get('date_to', '')
+    
+    if search_query:
+        all_polls = search_polls(all_polls, search_query)
+    
+    if status_filter:
+        all_polls = all_polls.filter(status=status_filter)
+    
+    if date_from:
+        all_polls = all_polls.filter(star_date__gte=date_from)
+    
+    if date_to:
+        all_polls = all_polls.filter(star_date__lte=date_to)
+    
+    return all_polls
@@ -0,0 +1,199 @@
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from model_poll.models import ReportJob
+
+# Directorio donde se guardan los PDF generados en segundo plano (no es público)
+REPORTS_DIR = getattr(settings, 'REPORTS_ROOT', os.path.join(settings.BASE_DIR, 'reports'))
+# Hilos por proceso que generan reportes
+REPORT_WORKERS = getattr(settings, 'REPORT_EXPORT_WORKERS', 2)
+# Días que se conservan los trabajos terminados y sus PDF
+REPORT_JOB_RETENTION_DAYS = getattr(settings, 'REPORT_JOB_RETENTION_DAYS', 7)
+# Minutos sin avance tras los que un trabajo EN_PROCESO se considera abandonado
+REPORT_JOB_STALE_MINUTES = 30
+# Segundos que se respeta un archivo sin trabajo antes de borrarlo (escritura en curso)
+FILE_GRACE_SECONDS = 60 * 60
+
+REPORT_FILE_RE = re.compile(r'^reporte_(\d+)\.pdf$')
+
+
+class JobLost(Exception):
+    """El trabajo volvió a la cola y lo tomó otro proceso: este debe dejarlo"""
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix='report-export')
+        return _executor
+
+
+def enqueue_report(poll, user):
+    """Registra un trabajo de exportación y lo envía al pool local al confirmar la transacción"""
+    job = ReportJob.objects.create(
+        poll=poll,
+        requested_by=user,
+        total_questions=poll.preguntas.count()
+    )
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.id))
+    return job
+
+
+def _worker_id():
+    return f'{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def claim_job(job_id):
+    """Marca el trabajo como EN_PROCESO si sigue pendiente; evita que dos procesos lo ejecuten.
+
+    Devuelve el identificador del proceso que lo tomó, o None si ya no estaba pendiente.
+    """
+    worker = _worker_id()
+    now = timezone.now()
+    claimed = ReportJob.objects.filter(id=job_id, status=ReportJob.Status.PENDIENTE).update(
+        status=ReportJob.Status.EN_PROCESO,
+        worker=worker,
+        started_at=now,
+        heartbeat_at=now
+    )
+    return worker if claimed == 1 else None
+
+
+def _owned(job_id, worker):
+    """El trabajo, solo si sigue en proceso a nombre de este proceso"""
+    return ReportJob.objects.filter(id=job_id, status=ReportJob.Status.EN_PROCESO, worker=worker)
+
+
+def requeue_stale_jobs(minutes=REPORT_JOB_STALE_MINUTES):
+    """Devuelve a la cola los trabajos EN_PROCESO sin avance en los últimos minutos.
+
+    El proceso anterior, si seguía vivo, pierde el trabajo en su siguiente avance
+    (JobLost), así que nunca hay dos procesos que lo terminen.
+    """
+    limit = timezone.now() - timedelta(minutes=minutes)
+    return ReportJob.objects.filter(
+        Q(heartbeat_at__lt=limit) | Q(heartbeat_at__isnull=True, started_at__lt=limit),
+        status=ReportJob.Status.EN_PROCESO
+    ).update(status=ReportJob.Status.PENDIENTE, worker='', heartbeat_at=None)
+
+
+def run_report_job(job_id):
+    """Genera el PDF de un trabajo pendiente y lo guarda en REPORTS_DIR"""
+    from .reports import build_poll_report
+    from .results_cache import get_results_snapshot
+
+    worker = None
+    try:
+        worker = claim_job(job_id)
+        if worker is None:
+            return
+
+        job = ReportJob.objects.select_related('poll', 'poll__created_by').get(id=job_id)
+        poll = job.poll
+
+        def progress(processed, total):
+            # Cada avance es también el latido del trabajo
+            updated = _owned(job_id, worker).update(
+                processed_questions=processed,
+                total_questions=total,
+                heartbeat_at=timezone.now()
+            )
+            if not updated:
+                raise JobLost()
+
+        pdf = build_poll_report(poll, get_results_snapshot(poll), progress)
+
+        # Escritura atómica para no servir archivos incompletos
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        file_path = os.path.join(REPORTS_DIR, f'reporte_{job.id}.pdf')
+        fd, tmp_path = tempfile.mkstemp(dir=REPORTS_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pdf)
+        os.replace(tmp_path, file_path)
+
+        _owned(job_id, worker).update(
+            status=ReportJob.Status.COMPLETADO,
+            file_path=file_path,
+            finished_at=timezone.now()
+        )
+    except JobLost:
+        return
+    except Exception as e:
+        jobs = _owned(job_id, worker) if worker else ReportJob.objects.filter(id=job_id)
+        jobs.update(
+            status=ReportJob.Status.ERROR,
+            error=str(e),
+            finished_at=timezone.now()
+        )
+
+
+def _run_in_thread(job_id):
+    try:
+        run_report_job(job_id)
+    finally:
+        # Cada hilo abre su propia conexión: cerrarla al terminar
+        connection.close()
+
+
+def purge_old_reports(days=REPORT_JOB_RETENTION_DAYS):
+    """Elimina los trabajos terminados hace más de days días y los PDF que ya no tienen trabajo.
+
+    También borra los PDF de trabajos eliminados con su encuesta y los .tmp que
+    dejó un proceso detenido. Devuelve (trabajos eliminados, archivos eliminados).
+    """
+    limit = timezone.now() - timedelta(days=days)
+    deleted, _ = ReportJob.objects.filter(
+        status__in=[ReportJob.Status.COMPLETADO, ReportJob.Status.ERROR],
+        finished_at__lt=limit
+    ).delete()
+
+    if not os.path.isdir(REPORTS_DIR):
+        return deleted, 0
+
+    live_ids = set(ReportJob.objects.values_list('id', flat=True))
+    # Archivos recientes: trabajos creados después de leer live_ids o escrituras en curso
+    grace_limit = time.time() - FILE_GRACE_SECONDS
+    removed = 0
+    for name in os.listdir(REPORTS_DIR):
+        match = REPORT_FILE_RE.match(name)
+        if match:
+            orphan = int(match.group(1)) not in live_ids
+        else:
+            orphan = name.endswith('.tmp')
+        path = os.path.join(REPORTS_DIR, name)
+        try:
+            if orphan and os.path.getmtime(path) < grace_limit:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return deleted, removed
+
+
+def job_progress(job):
+    """Datos de progreso de un trabajo para la respuesta JSON"""
+    percent = int(job.processed_questions * 100 / job.total_questions) if job.total_questions else 0
+    if job.status == ReportJob.Status.COMPLETADO:
+        percent = 100
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'processed_questions': job.processed_questions,
+        'total_questions': job.total_questions,
+        'percent': percent,
+        'error': job.error,
+    }
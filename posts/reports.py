@@ -0,0 +1,221 @@
+import os
+from io import BytesIO
+from datetime import datetime
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from model_poll.models import QuestionDetails
+from .tallies import question_tally
+from .chart_cache import chart_png
+
+
+def format_datetime_12h(dt):
+    """Formatea fecha y hora en formato 12 horas: DD/MM/AAAA h:mm A.M/P.M"""
+    if not dt:
+        return 'No definida'
+    hour = dt.hour
+    minute = dt.minute
+    am_pm = 'A.M' if hour < 12 else 'P.M'
+    hour_12 = hour if hour <= 12 else hour - 12
+    hour_12 = 12 if hour_12 == 0 else hour_12
+    return f"{dt.strftime('%d/%m/%Y')} a las {hour_12}:{minute:02d} {am_pm}"
+
+
+def build_poll_report(poll, snapshot, progress=None):
+    """Genera el reporte PDF de una encuesta y devuelve su contenido en bytes.
+
+    snapshot es el resultado de get_results_snapshot(poll). Si se indica,
+    progress(procesadas, total) se llama antes de cada pregunta y al terminar.
+    """
+    tallies = snapshot['tallies']
+    
+    # Crear documento PDF
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    
+    # Estilos con Helvetica
+    title_style = ParagraphStyle('CustomTitle', fontSize=14, fontName='Helvetica-Bold', spaceAfter=20, alignment=TA_CENTER)
+    heading_style = ParagraphStyle('CustomHeading', fontSize=14, fontName='Helvetica-Bold', spaceAfter=12, textColor=colors.HexColor('#184da1'))
+    normal_style = ParagraphStyle('Normal', fontSize=12, fontName='Helvetica')
+    
+    # Contenido del PDF
+    story = []
+    
+    # Encabezado con logo
+    logo_path = os.path.join(settings.BASE_DIR, 'static', 'SVG', 'GOB AIT Color_3.png')
+    subheader_style = ParagraphStyle('SubHeader', fontSize=12, fontName='Helvetica', alignment=TA_LEFT, textColor=colors.HexColor('#666666'), leading=16)
+    
+    # Crear tabla para encabezado con logo
+    if os.path.exists(logo_path):
+        logo = Image(logo_path, width=2*inch, height=0.7*inch)
+        header_text = [[Paragraph("REPÚBLICA BOLIVARIANA DE VENEZUELA<br/>GOBERNACIÓN DEL ESTADO ANZOÁTEGUI<br/>DIRECCIÓN DE AUTOMATIZACIÓN, INFORMÁTICA Y TELECOMUNICACIONES (AIT ANZOÁTEGUI)<br/>RIF: G-200001224", subheader_style), logo]]
+        header_table = Table(header_text, colWidths=[4*inch, 2*inch])
+        header_table.setStyle(TableStyle([('VALIGN', (0, 0), (-1, -1), 'TOP'), ('ALIGN', (0, 0), (0, 0), 'LEFT'), ('ALIGN', (1, 0), (1, 0), 'RIGHT')]))
+        story.append(header_table)
+    else:
+        story.append(Paragraph("REPÚBLICA BOLIVARIANA DE VENEZUELA", subheader_style))
+        story.append(Paragraph("GOBERNACIÓN DEL ESTADO ANZOÁTEGUI", subheader_style))
+        story.append(Paragraph("DIRECCIÓN DE AUTOMATIZACIÓN, INFORMÁTICA Y TELECOMUNICACIONES (AIT ANZOÁTEGUI)", subheader_style))
+        story.append(Paragraph("RIF: G-200001224", subheader_style))
+    
+    story.append(Spacer(1, 20))
+    
+    # Título del reporte centrado
+    story.append(Paragraph(f"REPORTE DE ENCUESTA: {poll.title.upper()}", title_style))
+    
+    # Información básica
+    story.append(Paragraph("INFORMACIÓN GENERAL", heading_style))
+    
+    # Título y descripción arriba de la tabla
+    story.append(Paragraph(f"<b>Título:</b> {poll.title}", normal_style))
+    story.append(Spacer(1, 6))
+    description = poll.description or 'Sin descripción'
+    story.append(Paragraph(f"<b>Descripción:</b> {description}", normal_style))
+    story.append(Spacer(1, 12))
+    
+    # Obtener nombre del autor (created_by queda en NULL si se eliminó el usuario)
+    if poll.created_by is None:
+        autor = 'Sin autor'
+    else:
+        autor = f"{poll.created_by.first_name} {poll.created_by.last_name}" if poll.created_by.first_name else poll.created_by.username
+    
+    info_data = [
+        ['Autor:', autor],
+        ['Estado:', poll.status],
+        ['Fecha de inicio:', format_datetime_12h(poll.star_date)],
+        ['Fecha de fin:', format_datetime_12h(poll.end_date)],
+        ['Total participaciones:', str(snapshot['total_participations'])],
+        ['Fecha del reporte:', format_datetime_12h(datetime.now())]
+    ]
+    
+    info_table = Table(info_data, colWidths=[2*inch, 4*inch])
+    info_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f8f9fa')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    story.append(info_table)
+    story.append(Spacer(1, 30))
+    
+    # Preguntas y respuestas
+    story.append(Paragraph("PREGUNTAS Y RESPUESTAS", heading_style))
+    
+    questions = list(poll.preguntas.prefetch_related('opciones'))
+    for i, question in enumerate(questions, 1):
+        if progress:
+            progress(i - 1, len(questions))
+        tally = question_tally(tallies, question)
+        question_style = ParagraphStyle('QuestionStyle', fontSize=12, fontName='Helvetica-Bold', spaceAfter=10)
+        story.append(Paragraph(f"Pregunta {i}: {question.question_text}", question_style))
+        story.append(Paragraph(f"Tipo: {question.get_question_type_display()}", normal_style))
+        
+        if question.question_type == 'TEXTO_LIBRE':
+            responses = QuestionDetails.objects.filter(
+                question=question,
+                answer_text__isnull=False,
+                answer_text__gt=''
+            ).select_related('participation__user')
+            
+            if responses.exists():
+                subheading_style = ParagraphStyle('SubHeading', fontSize=12, fontName='Helvetica-Bold', spaceAfter=5)
+                story.append(Paragraph("Respuestas:", subheading_style))
+                for resp in responses:
+                    story.append(Paragraph(f"• {resp.participation.user.username} ({format_datetime_12h(resp.participation.sent_date)}): {resp.answer_text}", normal_style))
+            else:
+                story.append(Paragraph("No hay respuestas", normal_style))
+        
+        elif question.question_type in ['SELECCION_MULTIPLE', 'ESCALA_LINEAL', 'CALIFICACION']:
+            # Generar gráfica (o reutilizarla desde la caché de imágenes)
+            if question.question_type == 'SELECCION_MULTIPLE':
+                labels = []
+                sizes = []
+                
+                for option in question.opciones.all():
+                    count = tally['options'].get(option.id, 0)
+                    if count > 0:
+                        labels.append(option.options_text)
+                        sizes.append(count)
+                
+                png = chart_png('pie', labels, sizes)
+            
+            elif question.question_type == 'ESCALA_LINEAL':
+                labels = []
+                values = []
+                
+                for i in range(question.scale_min or 1, (question.scale_max or 5) + 1):
+                    labels.append(str(i))
+                    values.append(tally['values'].get(i, 0))
+                
+                png = chart_png('bar', labels, values, {'color': '#36A2EB', 'xlabel': 'Escala'})
+            
+            elif question.question_type == 'CALIFICACION':
+                labels = []
+                values = []
+                
+                for i in range(1, (question.rating_stars or 5) + 1):
+                    labels.append(f'{i}★')
+                    values.append(tally['values'].get(i, 0))
+                
+                png = chart_png('bar', labels, values, {'color': '#FFD700', 'xlabel': 'Calificación'})
+            
+            # Añadir gráfica al PDF
+            chart_img = Image(BytesIO(png), width=4.5*inch, height=3*inch)
+            chart_img.hAlign = 'CENTER'
+            story.append(Spacer(1, 10))
+            story.append(chart_img)
+            story.append(Spacer(1, 15))
+            
+            # Estadísticas de opciones
+            stats_data = [['Opción', 'Respuestas', 'Porcentaje']]
+            total_responses = tally['total']
+            
+            if question.question_type == 'SELECCION_MULTIPLE':
+                for option in question.opciones.all():
+                    count = tally['options'].get(option.id, 0)
+                    percentage = (count / total_responses * 100) if total_responses > 0 else 0
+                    stats_data.append([option.options_text, str(count), f"{percentage:.1f}%"])
+            
+            elif question.question_type in ['ESCALA_LINEAL', 'CALIFICACION']:
+                for i in range(question.scale_min or 1, (question.scale_max or question.rating_stars or 5) + 1):
+                    count = tally['values'].get(i, 0)
+                    percentage = (count / total_responses * 100) if total_responses > 0 else 0
+                    label = f'{i}★' if question.question_type == 'CALIFICACION' else str(i)
+                    stats_data.append([label, str(count), f"{percentage:.1f}%"])
+            
+            if len(stats_data) > 1:
+                stats_table = Table(stats_data, colWidths=[2*inch, 1*inch, 1*inch])
+                stats_table.setStyle(TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#184da1')),
+                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                    ('FONTSIZE', (0, 0), (-1, -1), 12),
+                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+                ]))
+                story.append(stats_table)
+            else:
+                story.append(Paragraph("No hay respuestas", normal_style))
+        
+        story.append(Spacer(1, 20))
+    
+    # Construir PDF
+    doc.build(story)
+    
+    if progress:
+        progress(len(questions), len(questions))
+    
+    # Obtener contenido del buffer
+    pdf = buffer.getvalue()
+    buffer.close()
+    
+    return pdf
@@ -0,0 +1,200 @@
+from bisect import bisect_right
+from io import StringIO
+from django.core import serializers
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+from model_poll.models import Poll
+from .backups import backup_chain, backup_models, backup_size, iter_backup_objects, open_backup, open_backup_text, read_meta
+from .content_cache import invalidate_site_content
+from .poll_filters import rebuild_poll_search
+from .results_cache import bump_results_version
+from .user_filters import rebuild_user_search
+
+# Objetos por INSERT (se reduce si el motor limita los parámetros por consulta)
+RESTORE_BATCH_SIZE = 1000
+
+class _ModelLoader:
+    """Inserta por lotes los objetos de un modelo (insert o update si el id ya existe)"""
+
+    def __init__(self, model, using):
+        self.model = model
+        self.using = using
+        connection = connections[using]
+        opts = model._meta
+        self.fields = [f for f in opts.concrete_fields if not f.generated]
+        update_fields = [f for f in self.fields if not f.primary_key]
+        # Respaldos anteriores a las columnas de cambios no traen updated_at
+        self.auto_fields = [f for f in self.fields if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+        self.insert_options = {'on_conflict': OnConflict.IGNORE}
+        if update_fields and connection.features.supports_update_conflicts:
+            self.insert_options = {
+                'on_conflict': OnConflict.UPDATE,
+                'update_fields': update_fields,
+                'unique_fields': [opts.pk] if connection.features.supports_update_conflicts_with_target else None,
+            }
+        self.batch_size = max(1, min(RESTORE_BATCH_SIZE, connection.ops.bulk_batch_size(self.fields, [None] * RESTORE_BATCH_SIZE)))
+        # Sin conflicto limitado al id (MySQL: ON DUPLICATE KEY UPDATE, o IGNORE) una fila
+        # del respaldo se fusionaría con otra que comparte username, cédula, etc.
+        self.unique_checks = []
+        if self.insert_options.get('unique_fields') is None:
+            checks, _ = model()._get_unique_checks(include_meta_constraints=True)
+            self.unique_checks = [
+                [opts.get_field(name).attname for name in fields]
+                for _, fields in checks if fields != (opts.pk.name,)
+            ]
+
+    def _check_unique_collisions(self, objs):
+        """Falla como loaddata si un valor único ya existe en una fila con otro id"""
+        manager = self.model._base_manager.using(self.using)
+        for attnames in self.unique_checks:
+            incoming = {}
+            for obj in objs:
+                values = tuple(getattr(obj, attname) for attname in attnames)
+                if None not in values:
+                    incoming[values] = obj.pk
+            if not incoming:
+                continue
+            first = {values[0] for values in incoming}
+            for *values, pk in manager.filter(**{f'{attnames[0]}__in': first}).values_list(*attnames, 'pk'):
+                other = incoming.get(tuple(values))
+                if other is not None and other != pk:
+                    raise IntegrityError(
+                        f'{self.model._meta.label} id={other}: {", ".join(attnames)}={tuple(values)} '
+                        f'ya existe en la fila id={pk}.'
+                    )
+
+    def load(self, deserialized):
+        objs = [item.object for item in deserialized]
+        self._check_unique_collisions(objs)
+        now = timezone.now()
+        for obj in objs:
+            for field in self.auto_fields:
+                if getattr(obj, field.attname) is None:
+                    setattr(obj, field.attname, now)
+        for i in range(0, len(objs), self.batch_size):
+            # raw=True como loaddata: conserva updated_at/sent_date del respaldo (auto_now no se aplica)
+            self.model._base_manager.using(self.using)._insert(
+                objs[i:i + self.batch_size], fields=self.fields, raw=True, **self.insert_options
+            )
+        self._load_m2m(deserialized)
+
+    def _load_m2m(self, deserialized):
+        for field in self.model._meta.many_to_many:
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            rows = [
+                through(**{source: item.object.pk, target: pk})
+                for item in deserialized if field.name in (item.m2m_data or {})
+                for pk in item.m2m_data[field.name]
+            ]
+            owners = [item.object.pk for item in deserialized if field.name in (item.m2m_data or {})]
+            if owners:
+                through._base_manager.using(self.using).filter(**{f'{source}__in': owners}).delete()
+                through._base_manager.using(self.using).bulk_create(rows, batch_size=self.batch_size)
+
+
+def load_backup_file(filename, progress=None, using=DEFAULT_DB_ALIAS):
+    """Carga un respaldo (.json, .json.gz o .json.xz) con INSERT por lotes.
+
+    Reemplaza a loaddata, que guarda cada objeto con una consulta. Los objetos
+    de un mismo modelo vienen juntos y en orden de dependencias, así que se
+    agrupan en lotes de RESTORE_BATCH_SIZE. progress(objetos, fracción) se
+    llama tras cada lote. Devuelve la cantidad de objetos cargados.
+    """
+    connection = connections[using]
+    size = backup_size(filename) or 1
+    loaders = {}
+    loaded = 0
+    batch = []
+
+    def flush():
+        nonlocal loaded, batch
+        if not batch:
+            return
+        model = batch[0]['model']
+        deserialized = list(serializers.deserialize('python', batch, using=using))
+        if model not in loaders:
+            loaders[model] = _ModelLoader(deserialized[0].object.__class__, using)
+        loaders[model].load(deserialized)
+        loaded += len(batch)
+        batch = []
+        if progress:
+            progress(loaded, min(raw.tell() / size, 1.0))
+
+    with open_backup(filename) as raw, transaction.atomic(using=using):
+        # Como loaddata: las referencias circulares se validan al final
+        # Se mantiene la referencia: al liberarse el TextIOWrapper cerraría el archivo
+        text = open_backup_text(raw, filename)
+        with connection.constraint_checks_disabled():
+            for obj in iter_backup_objects(text):
+                if batch and (obj['model'] != batch[0]['model'] or len(batch) >= RESTORE_BATCH_SIZE):
+                    flush()
+                batch.append(obj)
+            flush()
+
+        models = [loader.model for loader in loaders.values()]
+        connection.check_constraints(table_names=[model._meta.db_table for model in models])
+
+        # Los ids vienen del respaldo: ajustar las secuencias (PostgreSQL, Oracle)
+        sequence_sql = connection.ops.sequence_reset_sql(no_style(), models)
+        if sequence_sql:
+            with connection.cursor() as cursor:
+                for sql in sequence_sql:
+                    cursor.execute(sql)
+
+    # Las inserciones por lotes no envían post_save
+    transaction.on_commit(invalidate_site_content, using=using)
+    return loaded
+
+
+def _prune_deleted_rows(live_ids):
+    """Elimina las filas que ya no existían cuando se creó el último incremental"""
+    deleted = 0
+    for model in reversed(backup_models()):
+        ranges = live_ids.get(model._meta.label_lower)
+        if ranges is None:
+            continue
+        starts = [start for start, _ in ranges]
+        stale = [
+            pk for pk in model._default_manager.values_list('pk', flat=True).iterator(chunk_size=10000)
+            if not (index := bisect_right(starts, pk)) or pk > ranges[index - 1][1]
+        ]
+        for i in range(0, len(stale), 1000):
+            deleted += model._default_manager.filter(pk__in=stale[i:i + 1000]).delete()[0]
+    return deleted
+
+
+def restore_backup_chain(filename, progress=None):
+    """Restaura un respaldo; si es incremental aplica antes su base y los incrementales previos.
+
+    Todo ocurre en una transacción. progress(archivo, objetos, fracción) se
+    llama durante la carga. Devuelve (archivos aplicados, objetos cargados).
+    """
+    chain = backup_chain(filename)
+    loaded = 0
+    with transaction.atomic():
+        for name in chain:
+            on_batch = (lambda count, fraction, name=name: progress(name, count, fraction)) if progress else None
+            loaded += load_backup_file(name, progress=on_batch)
+        live_ids = read_meta(chain[-1]).get('live_ids')
+        if live_ids:
+            _prune_deleted_rows(live_ids)
+    return len(chain), loaded
+
+
+def restore_and_rebuild(filename, progress=None):
+    """Restaura la cadena de un respaldo y reconstruye las tablas derivadas.
+
+    Los respaldos no pasan por submit_poll ni guardan los índices de búsqueda
+    de los incrementales: se recalculan conteos, índices y versiones de resultados.
+    """
+    applied, loaded = restore_backup_chain(filename, progress=progress)
+    call_command('reconcile_tallies', stdout=StringIO())
+    rebuild_user_search()
+    rebuild_poll_search()
+    bump_results_version(Poll.objects.all())
+    return applied, loaded
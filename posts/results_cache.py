@@ -0,0 +1,86 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from model_poll.models import Poll, new_results_version
+from .tallies import build_questions_with_results, poll_tallies
+
+# Segundos que se aceptan resultados de una encuesta activa sin recalcular
+RESULTS_CACHE_TTL = getattr(settings, 'POLL_RESULTS_CACHE_TTL', 30)
+# Tiempo máximo que un proceso mantiene el candado mientras recalcula
+RESULTS_LOCK_TIMEOUT = 30
+# Espera total (en segundos) por el proceso que recalcula cuando no hay copia previa
+RESULTS_LOCK_WAIT = 2
+
+
+def _cache_key(poll_id):
+    return f'poll_results:{poll_id}'
+
+
+def _lock_key(poll_id):
+    return f'poll_results_lock:{poll_id}'
+
+
+def build_results_snapshot(poll):
+    """Calcula los resultados de una encuesta desde los contadores"""
+    total_participations = poll.participaciones.count()
+    tallies = poll_tallies(poll)
+    return {
+        'total_participations': total_participations,
+        'tallies': tallies,
+        'questions_with_results': build_questions_with_results(poll, total_participations, tallies),
+    }
+
+
+def _store(poll, snapshot):
+    entry = {
+        'version': poll.results_version,
+        'fresh_until': time.time() + RESULTS_CACHE_TTL,
+        'snapshot': snapshot,
+    }
+    # Las encuestas cerradas no cambian: se guardan sin vencimiento
+    timeout = None if poll.status == Poll.Status.CERRADA else RESULTS_CACHE_TTL * 10
+    cache.set(_cache_key(poll.id), entry, timeout)
+
+
+def get_results_snapshot(poll):
+    """Devuelve los resultados de la encuesta desde la caché o los recalcula.
+
+    - Si la versión coincide con poll.results_version los resultados son exactos.
+    - En encuestas no cerradas se aceptan resultados de otra versión durante
+      RESULTS_CACHE_TTL segundos.
+    - Solo un proceso recalcula a la vez; los demás sirven la copia anterior o
+      esperan brevemente a que se publique la nueva.
+    """
+    key = _cache_key(poll.id)
+    entry = cache.get(key)
+
+    if entry is not None:
+        if entry['version'] == poll.results_version:
+            return entry['snapshot']
+        if poll.status != Poll.Status.CERRADA and time.time() < entry['fresh_until']:
+            return entry['snapshot']
+
+    lock_key = _lock_key(poll.id)
+    if not cache.add(lock_key, 1, RESULTS_LOCK_TIMEOUT):
+        # Otro proceso está recalculando
+        if entry is not None:
+            return entry['snapshot']
+        deadline = time.time() + RESULTS_LOCK_WAIT
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry['snapshot']
+        return build_results_snapshot(poll)
+
+    try:
+        snapshot = build_results_snapshot(poll)
+        _store(poll, snapshot)
+    finally:
+        cache.delete(lock_key)
+    return snapshot
+
+
+def bump_results_version(polls):
+    """Invalida los resultados en caché de las encuestas indicadas (queryset)"""
+    return polls.update(results_version=new_results_version())
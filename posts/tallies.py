@@ -0,0 +1,196 @@
+from django.db import connection
+from django.db.models import Count, F
+from model_poll.models import Question, QuestionDetails, OptionTally
+
+
+def _empty_tally():
+    return {'options': {}, 'values': {}, 'total': 0, 'value_sum': 0, 'value_total': 0}
+
+
+def _accumulate(rows):
+    """Agrupa filas (question_id, option_id, valor, cantidad) por pregunta"""
+    tallies = {}
+    for question_id, option_id, value, count in rows:
+        if not count:
+            continue
+        tally = tallies.setdefault(question_id, _empty_tally())
+        tally['options'][option_id] = count
+        tally['total'] += count
+        if value is not None:
+            tally['values'][value] = tally['values'].get(value, 0) + count
+            tally['value_sum'] += value * count
+            tally['value_total'] += count
+
+    for tally in tallies.values():
+        tally['average'] = tally['value_sum'] / tally['value_total'] if tally['value_total'] else 0
+
+    return tallies
+
+
+def answer_counts(**filters):
+    """Cuenta las respuestas directamente en QuestionDetails con una sola consulta agrupada.
+
+    Es la fuente de verdad que usa reconcile_tallies para comparar con OptionTally.
+    """
+    return (
+        QuestionDetails.objects
+        .filter(selected_options__isnull=False, **filters)
+        .values_list('question_id', 'selected_options_id', 'selected_options__value')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+
+def tally_answers(**filters):
+    """Tallies calculados recorriendo la tabla de respuestas"""
+    return _accumulate(answer_counts(**filters))
+
+
+def tally_counters(**filters):
+    """Lee los conteos mantenidos en OptionTally.
+
+    Devuelve un diccionario {question_id: tally} donde cada tally contiene:
+    - 'options': {option_id: cantidad}
+    - 'values': {valor numérico: cantidad} (escalas y calificaciones)
+    - 'total': respuestas con opción seleccionada
+    - 'average': promedio de los valores numéricos (0 si no hay)
+    """
+    rows = (
+        OptionTally.objects
+        .filter(count__gt=0, **filters)
+        .values_list('question_id', 'option_id', 'option__value', 'count')
+    )
+    return _accumulate(rows)
+
+
+def record_answers(answers):
+    """Suma las respuestas recién creadas a OptionTally.
+
+    Debe llamarse dentro de la misma transacción que crea los QuestionDetails.
+    """
+    pairs = {(answer.question_id, answer.selected_options_id) for answer in answers if answer.selected_options_id}
+    if not pairs:
+        return
+    OptionTally.objects.bulk_create(
+        [OptionTally(question_id=question_id, option_id=option_id) for question_id, option_id in pairs],
+        ignore_conflicts=True
+    )
+    # Una respuesta por pregunta en cada participación: cada opción suma exactamente 1
+    OptionTally.objects.filter(option_id__in=[option_id for _, option_id in pairs]).update(count=F('count') + 1)
+
+
+def rebuild_tallies(question_ids=None):
+    """Reconstruye OptionTally desde QuestionDetails con un INSERT ... SELECT agrupado.
+
+    Sin question_ids reconstruye todos los contadores. Debe llamarse dentro de una transacción.
+    """
+    tally_table = connection.ops.quote_name(OptionTally._meta.db_table)
+    answers_table = connection.ops.quote_name(QuestionDetails._meta.db_table)
+
+    delete_qs = OptionTally.objects.all()
+    where = 'selected_options_id IS NOT NULL'
+    params = []
+    if question_ids is not None:
+        question_ids = list(question_ids)
+        if not question_ids:
+            return
+        delete_qs = delete_qs.filter(question_id__in=question_ids)
+        where += f" AND question_id IN ({', '.join(['%s'] * len(question_ids))})"
+        params = question_ids
+
+    delete_qs.delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {tally_table} (question_id, option_id, count) "
+            f"SELECT question_id, selected_options_id, COUNT(*) FROM {answers_table} "
+            f"WHERE {where} GROUP BY question_id, selected_options_id",
+            params
+        )
+
+
+def poll_tallies(poll):
+    """Conteos de todas las preguntas de una encuesta en una sola consulta"""
+    return tally_counters(question__poll=poll)
+
+
+def polls_tallies(polls):
+    """Conteos de todas las preguntas de varias encuestas en una sola consulta agrupada.
+
+    polls puede ser un queryset (se usa como subconsulta) o una lista de ids.
+    """
+    if hasattr(polls, 'values'):
+        polls = polls.values('id')
+    return tally_counters(question__poll__in=polls)
+
+
+def question_tally(tallies, question):
+    """Devuelve el tally de una pregunta o uno vacío si no tiene respuestas"""
+    tally = tallies.get(question.id)
+    if tally is None:
+        tally = _empty_tally()
+        tally['average'] = 0
+    return tally
+
+
+def scale_range(question):
+    """Rango de valores que se muestran para escalas lineales y calificaciones"""
+    min_val = question.scale_min or 1
+    max_val = question.scale_max or (question.rating_stars or 5)
+    return range(min_val, max_val + 1)
+
+
+def build_questions_with_results(poll, total_participations, tallies=None):
+    """Arma la lista de preguntas con resultados que usa poll_results_modal.html"""
+    if tallies is None:
+        tallies = poll_tallies(poll)
+
+    questions = list(Question.objects.filter(poll=poll).prefetch_related('opciones'))
+
+    # Respuestas de texto de todas las preguntas en una sola consulta
+    text_responses = {}
+    text_question_ids = [q.id for q in questions if q.question_type == 'TEXTO_LIBRE']
+    if text_question_ids:
+        responses = QuestionDetails.objects.filter(
+            question_id__in=text_question_ids,
+            answer_text__isnull=False
+        ).select_related('participation__user')
+        for response in responses:
+            text_responses.setdefault(response.question_id, []).append(response)
+
+    questions_with_results = []
+    for question in questions:
+        tally = question_tally(tallies, question)
+        question_data = {
+            'id': question.id,
+            'text': question.question_text,
+            'type': question.question_type,
+            'options_list': [],
+            'text_responses': [],
+            'average_rating': 0,
+            'rating_counts': [0, 0, 0, 0, 0]
+        }
+
+        if question.question_type == 'SELECCION_MULTIPLE':
+            # Calcular porcentajes para opciones
+            for option in question.opciones.all():
+                count = tally['options'].get(option.id, 0)
+                percentage = (count / total_participations * 100) if total_participations > 0 else 0
+                question_data['options_list'].append({
+                    'text': option.options_text,
+                    'count': count,
+                    'percentage': percentage
+                })
+
+        elif question.question_type == 'TEXTO_LIBRE':
+            question_data['text_responses'] = text_responses.get(question.id, [])
+
+        elif question.question_type in ['ESCALA_LINEAL', 'CALIFICACION']:
+            # Promedio y distribución a partir de los conteos por valor
+            if tally['value_total']:
+                question_data['average_rating'] = tally['average']
+                question_data['rating_counts'] = [tally['values'].get(i, 0) for i in scale_range(question)]
+                question_data['max_rating_count'] = max(question_data['rating_counts']) if question_data['rating_counts'] else 1
+
+        questions_with_results.append(question_data)
+
+    return questions_with_results
@@ -1,3 +1,1126 @@
-from django.test import TestCase
+import gzip
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import Future
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import addModuleCleanup, mock
+from django.conf import settings
+from django.core import serializers
+from django.core.management import call_command
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from posts import backup_jobs, backups, bulk_export, chart_cache, report_jobs, restore, results_cache
+from posts.csv_export import stream_poll_answers_csv
+from posts.lifecycle import apply_due_transitions, next_transition_at
+from posts.tallies import rebuild_tallies
+from model_poll.models import Rol, User, Poll, Question, Options, Participation, QuestionDetails, OptionTally, ReportJob, BackupJob
 
-# Create your tests here.
+
+def setUpModule():
+    # Caché de archivos propia de las pruebas: el mismo backend que el servidor, sin mezclar datos
+    cache_dir = tempfile.mkdtemp()
+    cache_settings = override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': cache_dir,
+    }})
+    cache_settings.enable()
+    addModuleCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+    addModuleCleanup(cache_settings.disable)
+
+
+class DashboardQueryCountTests(TestCase):
+    """Las páginas del panel ejecutan las mismas consultas sin importar cuántas encuestas haya"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_role = Rol.objects.create(name='Administrador')
+        cls.admin = User.objects.create_user(username='admin', password='clave', rol=admin_role)
+        cls.voters = [
+            User.objects.create_user(username=f'votante{i}', password='clave')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _create_polls(self, count):
+        for i in range(count):
+            poll = Poll.objects.create(title=f'Encuesta {i}', status='ACTIVA', created_by=self.admin)
+            for order in range(2):
+                question = Question.objects.create(
+                    poll=poll,
+                    question_text=f'Pregunta {order}',
+                    question_type='SELECCION_MULTIPLE',
+                    order=order
+                )
+                option = Options.objects.create(question=question, options_text='Sí', value=1)
+                Options.objects.create(question=question, options_text='No', value=0)
+                for voter in self.voters:
+                    participation, _ = Participation.objects.get_or_create(poll=poll, user=voter)
+                    QuestionDetails.objects.create(participation=participation, question=question, selected_options=option)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def test_dashboard_home_queries_do_not_grow_with_polls(self):
+        self._create_polls(1)
+        baseline, _ = self._count_queries(reverse('dashboard:home'))
+        self._create_polls(5)
+        queries, response = self._count_queries(reverse('dashboard:home'))
+        self.assertEqual(queries, baseline)
+
+        poll = response.context['page_obj'][0]
+        self.assertEqual(poll.question_count, 2)
+        self.assertEqual(poll.participation_count, 3)
+
+    def test_statistics_queries_do_not_grow_with_polls(self):
+        self._create_polls(1)
+        baseline, _ = self._count_queries(reverse('dashboard:statistics'))
+        self._create_polls(5)
+        queries, response = self._count_queries(reverse('dashboard:statistics'))
+        self.assertEqual(queries, baseline)
+        self.assertContains(response, '3 participaciones')
+        self.assertContains(response, '2 preguntas')
+
+    def test_poll_rows_queries_do_not_grow_with_polls(self):
+        self._create_polls(1)
+        baseline, _ = self._count_queries(reverse('dashboard:poll_rows'))
+        self._create_polls(5)
+        queries, response = self._count_queries(reverse('dashboard:poll_rows'))
+        self.assertEqual(queries, baseline)
+
+        data = response.json()
+        self.assertEqual(data['total'], 6)
+        self.assertEqual(data['html'].count('<td>2</td>'), 6)
+        self.assertEqual(data['html'].count('<td>3</td>'), 6)
+
+
+class PollResultsQueryCountTests(TestCase):
+    """Los resultados de una encuesta usan las mismas consultas sin importar sus preguntas y opciones"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='clave', rol=Rol.objects.create(name='Administrador'))
+        cls.voters = [User.objects.create_user(username=f'votante{i}', password='clave') for i in range(3)]
+        cls.small = cls._create_poll('Pequeña', questions=1, options=2)
+        cls.large = cls._create_poll('Grande', questions=6, options=5)
+        rebuild_tallies()
+
+    @classmethod
+    def _create_poll(cls, title, questions, options):
+        poll = Poll.objects.create(title=title, status='CERRADA', created_by=cls.admin)
+        participations = [Participation.objects.create(poll=poll, user=voter) for voter in cls.voters]
+        for order in range(questions):
+            question_type = 'SELECCION_MULTIPLE' if order % 2 == 0 else 'ESCALA_LINEAL'
+            question = Question.objects.create(poll=poll, question_text=f'Pregunta {order}', question_type=question_type, order=order)
+            choices = [
+                Options.objects.create(question=question, options_text=f'Opción {value}', value=value)
+                for value in range(1, options + 1)
+            ]
+            for participation, option in zip(participations, choices * len(participations)):
+                QuestionDetails.objects.create(participation=participation, question=question, selected_options=option)
+        comments = Question.objects.create(poll=poll, question_text='Comentarios', question_type='TEXTO_LIBRE', order=questions)
+        for participation in participations:
+            QuestionDetails.objects.create(participation=participation, question=comments, answer_text='Bien')
+        return poll
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_results_queries_do_not_grow_with_questions_or_options(self):
+        # Sesión, usuario, encuesta, participaciones, contadores, preguntas, opciones y respuestas de texto
+        for poll, questions in ((self.small, 2), (self.large, 7)):
+            with self.assertNumQueries(8):
+                response = self.client.get(reverse('posts:results', args=[poll.id]))
+            self.assertEqual(len(response.context['questions_with_results']), questions)
+            self.assertEqual(response.context['total_participations'], 3)
+
+    def test_cached_results_only_read_the_poll(self):
+        url = reverse('posts:results', args=[self.large.id])
+        self.client.get(url)
+        # Sesión, usuario y encuesta
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertContains(response, 'Opción 5')
+
+
+class PollManagerPaginationTests(TestCase):
+    """El panel envía una página de encuestas y el resto se pide en JSON"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_role = Rol.objects.create(name='Administrador')
+        cls.admin = User.objects.create_user(username='admin', password='clave', rol=admin_role)
+        for i in range(12):
+            Poll.objects.create(title=f'Encuesta {i:02d}', status='ACTIVA' if i % 2 else 'BORRADOR', created_by=cls.admin)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_home_renders_only_first_page(self):
+        response = self.client.get(reverse('dashboard:home'), {'sort': 'titulo'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(response, 'Encuesta 00')
+        self.assertNotContains(response, 'Encuesta 11')
+
+    def test_rows_endpoint_returns_next_page_with_filters(self):
+        response = self.client.get(reverse('dashboard:poll_rows'), {'sort': 'titulo', 'page': 2})
+        data = response.json()
+        self.assertFalse(data['has_next'])
+        self.assertIn('Encuesta 11', data['html'])
+        self.assertNotIn('Encuesta 00', data['html'])
+
+        response = self.client.get(reverse('dashboard:poll_rows'), {'status': 'ACTIVA'})
+        self.assertEqual(response.json()['total'], 6)
+
+
+class UserListKeysetTests(TestCase):
+    """El listado de usuarios se recorre por cursor y los conteos salen de una sola consulta"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_role = Rol.objects.create(name='Administrador')
+        worker_role = Rol.objects.create(name='Trabajador')
+        user_role = Rol.objects.create(name='Usuario')
+        cls.admin = User.objects.create_user(username='aaa_admin', password='clave', rol=admin_role)
+        User.objects.create_user(username='aab_trabajador', password='clave', rol=worker_role)
+        User.objects.bulk_create([User(username=f'usuario{i:02d}', rol=user_role) for i in range(30)])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_cursor_pages_cover_all_users_once(self):
+        seen = []
+        params = {'format': 'json'}
+        while True:
+            data = self.client.get(reverse('dashboard:users'), params).json()
+            seen.extend(row['username'] for row in data['users'])
+            if not data['next']:
+                break
+            params['after'] = data['next']
+        self.assertEqual(seen, sorted(User.objects.values_list('username', flat=True)))
+
+        previous = self.client.get(reverse('dashboard:users'), {'format': 'json', 'before': seen[15]}).json()
+        self.assertEqual([row['username'] for row in previous['users']], seen[:15])
+        self.assertIsNone(previous['previous'])
+
+    def test_role_statistics(self):
+        response = self.client.get(reverse('dashboard:users'), {'role': 'Usuario'})
+        self.assertEqual(response.context['total_users'], 30)
+        self.assertEqual(response.context['admin_count'], 1)
+        self.assertEqual(response.context['worker_count'], 1)
+        self.assertEqual(response.context['user_count'], 30)
+
+
+class UserSearchTests(TestCase):
+    """La búsqueda de usuarios usa prefijos de cédula/username y palabras del nombre"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_role = Rol.objects.create(name='Administrador')
+        cls.admin = User.objects.create_user(username='admin', password='clave', rol=admin_role)
+        cls.jose = User.objects.create_user(username='jperez', first_name='José Luis', last_name='Pérez', cedula='12345678')
+        cls.maria = User.objects.create_user(username='mgomez', first_name='María', last_name='Gómez', cedula='12399999')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _search(self, text):
+        data = self.client.get(reverse('dashboard:users'), {'format': 'json', 'search': text}).json()
+        return {row['username'] for row in data['users']}
+
+    def test_search_by_name_tokens_ignores_accents_and_case(self):
+        self.assertEqual(self._search('jose perez'), {'jperez'})
+        self.assertEqual(self._search('GOM'), {'mgomez'})
+        self.assertEqual(self._search('luis'), {'jperez'})
+
+    def test_search_by_cedula_prefix_and_username(self):
+        self.assertEqual(self._search('123'), {'jperez', 'mgomez'})
+        self.assertEqual(self._search('12345678'), {'jperez'})
+        self.assertEqual(self._search('mgo'), {'mgomez'})
+
+    def test_tokens_follow_name_changes(self):
+        self.maria.last_name = 'Rodríguez'
+        self.maria.full_name = 'María Rodríguez'
+        self.maria.save()
+        self.assertEqual(self._search('rodriguez'), {'mgomez'})
+        self.assertEqual(self._search('gomez'), set())
+
+
+class PollSearchTests(TestCase):
+    """La búsqueda de reportes usa el índice de palabras y ordena por relevancia"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_role = Rol.objects.create(name='Administrador')
+        cls.admin = User.objects.create_user(username='admin', password='clave', rol=admin_role)
+        cls.author = User.objects.create_user(username='autor', first_name='Andrés', last_name='Transporte')
+        Poll.objects.create(title='Calidad del transporte público', created_by=cls.admin)
+        Poll.objects.create(title='Servicios de salud', description='Incluye preguntas sobre transporte', created_by=cls.admin)
+        Poll.objects.create(title='Encuesta de empleo', created_by=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _search(self, text):
+        response = self.client.get(reverse('dashboard:statistics'), {'search': text})
+        return [poll.title for poll in response.context['all_polls']]
+
+    def test_results_ranked_by_field_weight(self):
+        self.assertEqual(self._search('transp'), [
+            'Calidad del transporte público',
+            'Encuesta de empleo',
+            'Servicios de salud',
+        ])
+
+    def test_every_term_must_match_and_edits_update_index(self):
+        self.assertEqual(self._search('calidad publico'), ['Calidad del transporte público'])
+        poll = Poll.objects.get(title='Encuesta de empleo')
+        poll.title = 'Encuesta de vivienda'
+        poll.save()
+        self.assertEqual(self._search('empleo'), [])
+        self.assertEqual(self._search('vivienda'), ['Encuesta de vivienda'])
+
+    def test_author_rename_rebuilds_poll_tokens_in_bulk(self):
+        author = User.objects.get(username='autor')
+        with CaptureQueriesContext(connection) as context:
+            author.last_login = None
+            author.save()
+        self.assertFalse(any('searchtoken' in query['sql'] for query in context.captured_queries))
+
+        def rename(last_name):
+            with CaptureQueriesContext(connection) as context:
+                author.last_name = last_name
+                author.save()
+            return len(context)
+        baseline = rename('Vivienda')
+        for i in range(5):
+            Poll.objects.create(title=f'Extra {i}', created_by=author)
+        self.assertEqual(rename('Salud'), baseline)
+        # Servicios de salud (título) y las seis encuestas del autor (nombre)
+        self.assertEqual(len(self._search('salud')), 7)
+        self.assertEqual(self._search('vivienda'), [])
+
+
+class PollLifecycleTests(TestCase):
+    """El programador cierra y activa encuestas con un UPDATE por transición"""
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def _poll(self, status, start_days, end_days, auto_activate=False):
+        return Poll.objects.create(
+            title=f'{status} {start_days} {end_days}',
+            status=status,
+            star_date=self.now + timedelta(days=start_days),
+            end_date=self.now + timedelta(days=end_days),
+            auto_activate=auto_activate
+        )
+
+    def test_transitions_use_one_update_each_and_skip_unscheduled_drafts(self):
+        expired = self._poll('ACTIVA', -10, -1)
+        running = self._poll('ACTIVA', -10, 5)
+        scheduled = self._poll('BORRADOR', -1, 5, auto_activate=True)
+        draft = self._poll('BORRADOR', -1, 5)
+        late = self._poll('BORRADOR', -10, -1, auto_activate=True)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(apply_due_transitions(self.now), (1, 1))
+        statuses = dict(Poll.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[expired.id], 'CERRADA')
+        self.assertEqual(statuses[running.id], 'ACTIVA')
+        self.assertEqual(statuses[scheduled.id], 'ACTIVA')
+        self.assertEqual(statuses[draft.id], 'BORRADOR')
+        self.assertEqual(statuses[late.id], 'BORRADOR')
+        self.assertFalse(Poll.objects.get(id=scheduled.id).auto_activate)
+
+    def test_next_transition_ignores_unscheduled_drafts(self):
+        self._poll('BORRADOR', 1, 10)
+        self.assertIsNone(next_transition_at(self.now))
+        scheduled = self._poll('BORRADOR', 3, 10, auto_activate=True)
+        running = self._poll('ACTIVA', -1, 2)
+        self.assertEqual(next_transition_at(self.now), running.end_date)
+        running.delete()
+        self.assertEqual(next_transition_at(self.now), scheduled.star_date)
+
+    def test_created_draft_is_scheduled_only_when_requested(self):
+        admin = User.objects.create_user(username='admin', password='clave', rol=Rol.objects.create(name='Administrador'))
+        self.client.force_login(admin)
+        start = (self.now - timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M')
+        for title, extra in (('Borrador', {}), ('Programada', {'auto_activate': 'on'})):
+            self.client.post(reverse('dashboard:create'), {'title': title, 'status': 'BORRADOR', 'star_date': start, **extra})
+        apply_due_transitions()
+        self.assertEqual(Poll.objects.get(title='Borrador').status, 'BORRADOR')
+        self.assertEqual(Poll.objects.get(title='Programada').status, 'ACTIVA')
+
+
+class SubmitPollTests(TestCase):
+    """Las respuestas de preguntas sin opciones no invalidan la participación"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.voter = User.objects.create_user(username='votante', password='clave', rol=Rol.objects.create(name='Usuario'))
+        cls.poll = Poll.objects.create(title='Encuesta', status='ACTIVA')
+        cls.question = Question.objects.create(poll=cls.poll, question_text='¿Sí?', question_type='SELECCION_MULTIPLE')
+        cls.option = Options.objects.create(question=cls.question, options_text='Sí', value=1)
+        cls.text_question = Question.objects.create(poll=cls.poll, question_text='Comentarios', question_type='TEXTO_LIBRE', order=1)
+
+    def setUp(self):
+        self.client.force_login(self.voter)
+
+    def test_free_text_answer_does_not_reject_submission(self):
+        self.client.post(reverse('posts:submit', args=[self.poll.id]), {
+            f'question_{self.question.id}': self.option.id,
+            f'question_{self.text_question.id}': 'Todo bien',
+        })
+        answers = QuestionDetails.objects.filter(participation__poll=self.poll, participation__user=self.voter)
+        self.assertEqual(list(answers.values_list('question_id', 'selected_options_id')), [(self.question.id, self.option.id)])
+
+    def test_option_from_another_question_is_rejected(self):
+        other = Options.objects.create(
+            question=Question.objects.create(poll=Poll.objects.create(title='Otra'), question_text='x', question_type='SELECCION_MULTIPLE'),
+            options_text='No', value=0
+        )
+        self.client.post(reverse('posts:submit', args=[self.poll.id]), {f'question_{self.question.id}': other.id})
+        self.assertFalse(Participation.objects.filter(poll=self.poll).exists())
+
+
+class OptionTallyTests(TestCase):
+    """OptionTally coincide con el conteo agrupado de QuestionDetails"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='clave', rol=Rol.objects.create(name='Administrador'))
+        cls.voters = [User.objects.create_user(username=f'votante{i}', password='clave') for i in range(3)]
+        cls.poll = Poll.objects.create(title='Encuesta', status='ACTIVA', created_by=cls.admin)
+        cls.questions = []
+        for order in range(2):
+            question = Question.objects.create(
+                poll=cls.poll, question_text=f'Pregunta {order}', question_type='SELECCION_MULTIPLE', order=order
+            )
+            Options.objects.create(question=question, options_text='Sí', value=1)
+            Options.objects.create(question=question, options_text='No', value=0)
+            cls.questions.append(question)
+
+    def _vote(self, voter, choice):
+        self.client.force_login(voter)
+        self.client.post(reverse('posts:submit', args=[self.poll.id]), {
+            f'question_{question.id}': question.opciones.order_by('id')[choice].id
+            for question in self.questions
+        })
+
+    def _group_by(self):
+        rows = (
+            QuestionDetails.objects.filter(selected_options__isnull=False)
+            .values('question_id', 'selected_options_id')
+            .annotate(total=Count('id'))
+        )
+        return {(row['question_id'], row['selected_options_id']): row['total'] for row in rows}
+
+    def _stored(self):
+        rows = OptionTally.objects.filter(count__gt=0).values_list('question_id', 'option_id', 'count')
+        return {(question_id, option_id): count for question_id, option_id, count in rows}
+
+    def _vote_all(self):
+        for voter, choice in zip(self.voters, [0, 0, 1]):
+            self._vote(voter, choice)
+
+    def test_submissions_keep_tallies_in_sync(self):
+        self._vote_all()
+
+        expected = self._group_by()
+        self.assertEqual(sorted(expected.values()), [1, 1, 2, 2])
+        self.assertEqual(self._stored(), expected)
+
+    def test_delete_user_keeps_tallies_in_sync(self):
+        self._vote_all()
+        self.client.force_login(self.admin)
+
+        response = self.client.post(reverse('dashboard:delete_user', args=[self.voters[0].id]))
+
+        self.assertTrue(response.json()['success'])
+        expected = self._group_by()
+        self.assertEqual(sorted(expected.values()), [1, 1, 1, 1])
+        self.assertEqual(self._stored(), expected)
+
+    def test_reconcile_tallies_reports_and_fixes_drift(self):
+        self._vote_all()
+        first, second = self.questions[0].opciones.order_by('id')
+        OptionTally.objects.filter(option=first).update(count=7)
+        OptionTally.objects.filter(option=second).delete()
+
+        out = StringIO()
+        call_command('reconcile_tallies', '--dry-run', stdout=out)
+        self.assertIn(f'Opción {first.id}: contador 7 -> real 2', out.getvalue())
+        self.assertIn(f'Opción {second.id}: contador 0 -> real 1', out.getvalue())
+        self.assertIn('Se encontraron 2 contadores con diferencias', out.getvalue())
+        self.assertNotEqual(self._stored(), self._group_by())
+
+        call_command('reconcile_tallies', stdout=StringIO())
+        self.assertEqual(self._stored(), self._group_by())
+
+        out = StringIO()
+        call_command('reconcile_tallies', '--dry-run', stdout=out)
+        self.assertIn('Los contadores coinciden', out.getvalue())
+
+
+class ResultsCacheTests(TestCase):
+    """Los resultados se sirven desde la caché compartida y se invalidan con la versión de la encuesta"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.voter = User.objects.create_user(username='votante', password='clave', rol=Rol.objects.create(name='Usuario'))
+        cls.poll = Poll.objects.create(title='Encuesta', status='ACTIVA')
+        cls.question = Question.objects.create(poll=cls.poll, question_text='¿Sí?', question_type='SELECCION_MULTIPLE')
+        cls.option = Options.objects.create(question=cls.question, options_text='Sí', value=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def _vote(self):
+        self.client.force_login(self.voter)
+        self.client.post(reverse('posts:submit', args=[self.poll.id]), {f'question_{self.question.id}': self.option.id})
+
+    def _snapshot(self):
+        return results_cache.get_results_snapshot(Poll.objects.get(id=self.poll.id))
+
+    def test_same_version_is_served_without_recomputing(self):
+        self._snapshot()
+        with mock.patch.object(results_cache, 'build_results_snapshot') as build:
+            snapshot = self._snapshot()
+        build.assert_not_called()
+        self.assertEqual(snapshot['total_participations'], 0)
+
+    def test_closed_poll_recomputes_as_soon_as_version_changes(self):
+        Poll.objects.filter(id=self.poll.id).update(status='CERRADA')
+        self._snapshot()
+
+        # Una participación tardía (o una restauración) cambia la versión
+        Participation.objects.create(poll=self.poll, user=self.voter)
+        results_cache.bump_results_version(Poll.objects.filter(id=self.poll.id))
+
+        self.assertEqual(self._snapshot()['total_participations'], 1)
+
+    def test_active_poll_serves_previous_version_until_it_is_stale(self):
+        self._snapshot()
+        self._vote()
+
+        self.assertEqual(self._snapshot()['total_participations'], 0)
+        later = time.time() + results_cache.RESULTS_CACHE_TTL + 1
+        with mock.patch.object(results_cache.time, 'time', return_value=later):
+            snapshot = self._snapshot()
+        self.assertEqual(snapshot['total_participations'], 1)
+        self.assertEqual(snapshot['tallies'][self.question.id]['options'], {self.option.id: 1})
+
+    def test_closed_results_never_expire_and_active_ones_do(self):
+        with mock.patch.object(results_cache, 'cache', mock.MagicMock(wraps=cache)) as wrapped:
+            self._snapshot()
+            Poll.objects.filter(id=self.poll.id).update(status='CERRADA')
+            results_cache.bump_results_version(Poll.objects.filter(id=self.poll.id))
+            self._snapshot()
+
+        timeouts = [call.args[2] for call in wrapped.set.call_args_list]
+        self.assertEqual(timeouts, [results_cache.RESULTS_CACHE_TTL * 10, None])
+
+    def test_other_process_recomputing_serves_previous_copy(self):
+        self._snapshot()
+        results_cache.bump_results_version(Poll.objects.filter(id=self.poll.id))
+        key = results_cache._cache_key(self.poll.id)
+        cache.set(key, {**cache.get(key), 'fresh_until': 0})
+        cache.add(results_cache._lock_key(self.poll.id), 1, results_cache.RESULTS_LOCK_TIMEOUT)
+
+        with mock.patch.object(results_cache, 'build_results_snapshot') as build:
+            snapshot = self._snapshot()
+        build.assert_not_called()
+        self.assertEqual(snapshot['total_participations'], 0)
+
+    def test_saving_a_stale_copy_keeps_the_new_version(self):
+        stale = Poll.objects.get(id=self.poll.id)
+        self._vote()
+        version = Poll.objects.get(id=self.poll.id).results_version
+        self.assertNotEqual(version, stale.results_version)
+
+        stale.title = 'Encuesta editada'
+        stale.save()
+
+        self.assertEqual(Poll.objects.get(id=self.poll.id).results_version, version)
+
+
+class PollCsvExportTests(TestCase):
+    """El CSV pagina por participación y respeta la visibilidad de estadísticas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='clave', rol=Rol.objects.create(name='Administrador'))
+        cls.worker = User.objects.create_user(username='trabajador', password='clave', rol=Rol.objects.create(name='Trabajador'))
+        cls.poll = Poll.objects.create(title='Interna', is_public=False)
+        question = Question.objects.create(poll=cls.poll, question_text='¿Sí?', question_type='SELECCION_MULTIPLE')
+        option = Options.objects.create(question=question, options_text='Sí', value=1)
+        for i in range(5):
+            participation = Participation.objects.create(
+                poll=cls.poll, user=User.objects.create_user(username=f'votante{i}', password='clave', cedula=f'{i}')
+            )
+            QuestionDetails.objects.create(participation=participation, question=question, selected_options=option)
+
+    def test_rows_cover_every_participation_across_batches(self):
+        rows = list(stream_poll_answers_csv(self.poll, batch_size=2))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual([row.split(',')[0] for row in rows[1:]], [f'votante{i}' for i in range(5)])
+
+    def test_worker_cannot_export_internal_poll(self):
+        self.client.force_login(self.worker)
+        self.assertEqual(self.client.get(reverse('dashboard:export_csv', args=[self.poll.id])).status_code, 403)
+        self.assertEqual(self.client.post(reverse('dashboard:export_pdf_job', args=[self.poll.id])).status_code, 403)
+
+
+class ReportJobTests(TestCase):
+    """Los reportes PDF en segundo plano: cola, avance, descarga y limpieza"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create_user(username='trabajador', password='clave', rol=Rol.objects.create(name='Trabajador'))
+        cls.other = User.objects.create_user(username='otro', password='clave', rol=Rol.objects.get(name='Trabajador'))
+        cls.poll = Poll.objects.create(title='Encuesta pública', status='CERRADA', created_by=cls.worker)
+        for order in range(2):
+            Question.objects.create(poll=cls.poll, question_text=f'Pregunta {order}', question_type='TEXTO_LIBRE', order=order)
+
+    def setUp(self):
+        self.client.force_login(self.worker)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = mock.patch.object(report_jobs, 'REPORTS_DIR', self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _enqueue(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('dashboard:export_pdf_job', args=[self.poll.id]))
+        self.assertEqual(len(callbacks), 1)
+        return ReportJob.objects.get(id=response.json()['job_id']), response.json()
+
+    def _status(self, job):
+        return self.client.get(reverse('dashboard:export_job_status', args=[job.id])).json()
+
+    def test_enqueue_creates_pending_job(self):
+        job, data = self._enqueue()
+
+        self.assertEqual(job.status, ReportJob.Status.PENDIENTE)
+        self.assertEqual(job.total_questions, 2)
+        self.assertEqual(data['status_url'], reverse('dashboard:export_job_status', args=[job.id]))
+        self.assertEqual(self._status(job)['percent'], 0)
+
+    def test_claim_is_exclusive(self):
+        job, _ = self._enqueue()
+
+        worker = report_jobs.claim_job(job.id)
+        self.assertIsNotNone(worker)
+        self.assertIsNone(report_jobs.claim_job(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.Status.EN_PROCESO)
+        self.assertEqual(job.worker, worker)
+
+    def test_progress_and_download(self):
+        job, _ = self._enqueue()
+        seen = []
+
+        def build(poll, snapshot, progress):
+            progress(1, 2)
+            seen.append(self._status(job))
+            progress(2, 2)
+            return b'%PDF-1.4 reporte'
+
+        download_url = reverse('dashboard:export_job_download', args=[job.id])
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+        with mock.patch('posts.reports.build_poll_report', side_effect=build):
+            report_jobs.run_report_job(job.id)
+
+        self.assertEqual((seen[0]['status'], seen[0]['percent']), ('EN_PROCESO', 50))
+        data = self._status(job)
+        self.assertEqual((data['status'], data['percent']), ('COMPLETADO', 100))
+        self.assertEqual(data['download_url'], download_url)
+
+        response = self.client.get(download_url)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 reporte')
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(download_url).status_code, 403)
+
+    def test_requeued_job_is_finished_only_by_the_new_worker(self):
+        job, _ = self._enqueue()
+        claims = []
+
+        def build(poll, snapshot, progress):
+            # El proceso se queda sin avanzar: run_report_jobs lo devuelve a la cola y otro lo toma
+            ReportJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+            self.assertEqual(report_jobs.requeue_stale_jobs(), 1)
+            claims.append(report_jobs.claim_job(job.id))
+            progress(1, 2)
+            return b'%PDF-1.4 duplicado'
+
+        with mock.patch('posts.reports.build_poll_report', side_effect=build):
+            report_jobs.run_report_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.Status.EN_PROCESO)
+        self.assertEqual(job.worker, claims[0])
+        self.assertEqual(job.processed_questions, 0)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_prune_reports_removes_expired_jobs_and_orphan_files(self):
+        old_job, _ = self._enqueue()
+        recent_job, _ = self._enqueue()
+        with mock.patch('posts.reports.build_poll_report', return_value=b'%PDF'):
+            report_jobs.run_report_job(old_job.id)
+            report_jobs.run_report_job(recent_job.id)
+        ReportJob.objects.filter(id=old_job.id).update(finished_at=timezone.now() - timedelta(days=8))
+        for name in ('reporte_999.pdf', 'abandonado.tmp'):
+            open(os.path.join(self.directory, name), 'wb').close()
+        an_hour_ago = time.time() - report_jobs.FILE_GRACE_SECONDS - 1
+        for name in os.listdir(self.directory):
+            os.utime(os.path.join(self.directory, name), (an_hour_ago, an_hour_ago))
+
+        out = StringIO()
+        call_command('prune_reports', stdout=out)
+
+        self.assertIn('1 trabajos de reportes eliminados, 3 archivos borrados', out.getvalue())
+        self.assertEqual(list(ReportJob.objects.values_list('id', flat=True)), [recent_job.id])
+        self.assertEqual(os.listdir(self.directory), [f'reporte_{recent_job.id}.pdf'])
+
+
+class ChartCacheTests(TestCase):
+    """Las gráficas de los reportes se dibujan una vez y se desalojan por uso (LRU)"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.directory = os.path.join(media_root, 'report_charts')
+
+    def _path(self, *chart):
+        return os.path.join(self.directory, f'{chart_cache._chart_key(*chart)}.png')
+
+    def test_cached_chart_is_not_rendered_again(self):
+        with mock.patch.object(chart_cache, '_render_chart', return_value=b'png') as render:
+            first = chart_cache.chart_png('pie', ['Sí', 'No'], [3, 1])
+            second = chart_cache.chart_png('pie', ['Sí', 'No'], [3, 1])
+
+        render.assert_called_once_with('pie', ['Sí', 'No'], [3, 1], {})
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(self._path('pie', ['Sí', 'No'], [3, 1], {}))])
+
+    def test_key_changes_with_every_input(self):
+        key = chart_cache._chart_key('bar', ['1', '2'], [4, 0], {'color': '#36A2EB', 'xlabel': 'Escala'})
+
+        self.assertRegex(key, r'^[0-9a-f]{64}$')
+        self.assertEqual(key, chart_cache._chart_key('bar', ('1', '2'), (4, 0), {'xlabel': 'Escala', 'color': '#36A2EB'}))
+        for other in (
+            ('pie', ['1', '2'], [4, 0], {'color': '#36A2EB', 'xlabel': 'Escala'}),
+            ('bar', ['1', '3'], [4, 0], {'color': '#36A2EB', 'xlabel': 'Escala'}),
+            ('bar', ['1', '2'], [0, 4], {'color': '#36A2EB', 'xlabel': 'Escala'}),
+            ('bar', ['1', '2'], [4, 0], {'color': '#FFD700', 'xlabel': 'Escala'}),
+        ):
+            self.assertNotEqual(chart_cache._chart_key(*other), key)
+
+    def test_least_recently_used_charts_are_evicted(self):
+        charts = {name: ('pie', [name], [1], {}) for name in 'abc'}
+        with mock.patch.object(chart_cache, 'CHART_CACHE_MAX_BYTES', 250), \
+                mock.patch.object(chart_cache, '_render_chart', return_value=b'x' * 100):
+            chart_cache.chart_png(*charts['a'])
+            chart_cache.chart_png(*charts['b'])
+            long_ago = time.time() - 100
+            os.utime(self._path(*charts['a']), (long_ago, long_ago))
+            os.utime(self._path(*charts['b']), (long_ago + 10, long_ago + 10))
+
+            # Leer "a" la vuelve la más reciente: al agregar "c" se desaloja "b"
+            chart_cache.chart_png(*charts['a'])
+            chart_cache.chart_png(*charts['c'])
+
+        self.assertTrue(os.path.exists(self._path(*charts['a'])))
+        self.assertFalse(os.path.exists(self._path(*charts['b'])))
+        self.assertTrue(os.path.exists(self._path(*charts['c'])))
+
+    def test_new_chart_is_kept_even_over_the_limit(self):
+        with mock.patch.object(chart_cache, 'CHART_CACHE_MAX_BYTES', 50), \
+                mock.patch.object(chart_cache, '_render_chart', return_value=b'x' * 100):
+            chart_cache.chart_png('pie', ['a'], [1])
+            chart_cache.chart_png('pie', ['b'], [1])
+
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(self._path('pie', ['b'], [1], {}))])
+
+    def test_rendered_chart_is_a_png(self):
+        png = chart_cache.chart_png('bar', ['1', '2', '3'], [2, 0, 5], {'color': '#36A2EB', 'xlabel': 'Escala'})
+        self.assertTrue(png.startswith(b'\x89PNG'))
+
+
+class _InlineExecutor:
+    """Sustituye al ProcessPoolExecutor: los procesos hijos no ven la base de datos de prueba"""
+
+    def __init__(self, max_workers, mp_context, initializer):
+        self.mp_context = mp_context
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class BulkExportTests(TestCase):
+    """La exportación masiva arma un ZIP con un PDF por encuesta"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='autor', password='clave', first_name='Ana', last_name='Pérez')
+        cls.polls = [
+            Poll.objects.create(title='Satisfacción 2026', status='CERRADA', created_by=author),
+            # Sin autor: el usuario que la creó fue eliminado
+            Poll.objects.create(title='Servicio técnico', status='CERRADA'),
+        ]
+        Poll.objects.create(title='Borrador', status='BORRADOR')
+        for poll in cls.polls:
+            question = Question.objects.create(poll=poll, question_text='¿Sí?', question_type='SELECCION_MULTIPLE')
+            Options.objects.create(question=question, options_text='Sí', value=1)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        for patcher in (
+            mock.patch.object(bulk_export, 'ProcessPoolExecutor', _InlineExecutor),
+            # Los hijos cierran sus conexiones; aquí cerrarían la de la prueba
+            mock.patch.object(bulk_export, 'connections'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _members(self, data):
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            return {name: archive.read(name) for name in archive.namelist()}
+
+    def test_zip_has_one_pdf_per_poll(self):
+        reports = []
+        data = b''.join(bulk_export.stream_reports_zip(
+            [poll.id for poll in self.polls], on_report=lambda name, error: reports.append((name, error))
+        ))
+
+        members = self._members(data)
+        expected = [f'Reporte_{self.polls[0].id}_satisfaccion-2026.pdf', f'Reporte_{self.polls[1].id}_servicio-tecnico.pdf']
+        self.assertEqual(sorted(members), expected)
+        self.assertTrue(all(pdf.startswith(b'%PDF') for pdf in members.values()))
+        self.assertEqual(sorted(reports), [(name, None) for name in expected])
+
+    def test_missing_poll_is_reported_inside_the_zip(self):
+        data = b''.join(bulk_export.stream_reports_zip([self.polls[0].id, 999999]))
+
+        members = self._members(data)
+        self.assertIn('Reporte_999999_error.txt', members)
+        self.assertIn(f'Reporte_{self.polls[0].id}_satisfaccion-2026.pdf', members)
+
+    def test_command_exports_filtered_polls(self):
+        output = os.path.join(settings.MEDIA_ROOT, 'reportes.zip')
+        out = StringIO()
+        call_command('export_reports_zip', '--status', 'CERRADA', '--output', output, stdout=out)
+
+        with open(output, 'rb') as f:
+            members = self._members(f.read())
+        self.assertEqual(sorted(members), [
+            f'Reporte_{self.polls[0].id}_satisfaccion-2026.pdf',
+            f'Reporte_{self.polls[1].id}_servicio-tecnico.pdf',
+        ])
+        self.assertIn(f'2 reportes exportados en {output}', out.getvalue())
+
+
+class IncrementalBackupTests(TestCase):
+    """Los incrementales guardan solo los cambios y se restauran sobre su base"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='clave', rol=Rol.objects.create(name='Administrador'))
+        for i in range(5):
+            Poll.objects.create(title=f'Encuesta {i}', created_by=cls.admin)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = mock.patch.object(backups, 'BACKUP_DIR', self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_increment_contains_only_changes_and_restores_chain(self):
+        full = backups.create_backup_file()
+        self.assertEqual(full['type'], 'full')
+
+        # Sin margen: solo lo modificado después del respaldo completo
+        with mock.patch.object(backups, 'INCREMENTAL_MARGIN', backups.timedelta(0)):
+            edited = Poll.objects.get(title='Encuesta 0')
+            edited.title = 'Encuesta editada'
+            edited.save()
+            Poll.objects.create(title='Encuesta nueva', created_by=self.admin)
+            Poll.objects.get(title='Encuesta 1').delete()
+            increment = backups.create_backup_file(incremental=True)
+
+        self.assertEqual(increment['type'], 'incremental')
+        self.assertEqual(increment['parent'], full['filename'])
+        meta = backups.read_meta(increment['filename'])
+        self.assertEqual(meta['counts']['model_poll.poll'], 2)
+        self.assertNotIn('model_poll.pollsearchtoken', meta['counts'])
+
+        expected = set(Poll.objects.values_list('title', flat=True))
+        Poll.objects.all().delete()
+        self.assertEqual(restore.restore_backup_chain(increment['filename'])[0], 2)
+        self.assertEqual(set(Poll.objects.values_list('title', flat=True)), expected)
+
+        with self.assertRaises(ValueError):
+            backups.delete_backup_file(full['filename'])
+
+
+class RestoreEngineTests(TestCase):
+    """La restauración inserta por lotes y conserva las fechas del respaldo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='clave', rol=Rol.objects.create(name='Administrador'))
+        for i in range(30):
+            poll = Poll.objects.create(title=f'Encuesta {i}', created_by=cls.admin)
+            Participation.objects.create(poll=poll, user=cls.admin)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = mock.patch.object(backups, 'BACKUP_DIR', self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_restore_uses_batches_and_keeps_dates(self):
+        backup = backups.create_backup_file()
+        # El JSON de Django guarda milisegundos
+        sent_dates = {
+            pk: sent_date.replace(microsecond=sent_date.microsecond // 1000 * 1000)
+            for pk, sent_date in Participation.objects.values_list('id', 'sent_date')
+        }
+        Poll.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as context:
+            files, loaded = restore.restore_backup_chain(backup['filename'])
+        self.assertEqual(files, 1)
+        self.assertGreater(loaded, 60)
+        self.assertLess(len(context), 40)
+        self.assertEqual(Poll.objects.count(), 30)
+        self.assertEqual(dict(Participation.objects.values_list('id', 'sent_date')), sent_dates)
+
+    def test_upsert_without_pk_target_rejects_unique_collisions(self):
+        # Como en MySQL: el conflicto no se limita al id, se revisan antes los demás valores únicos
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            loader = restore._ModelLoader(User, 'default')
+        loader._check_unique_collisions([User(pk=self.admin.pk, username='admin')])
+        with self.assertRaisesMessage(IntegrityError, 'ya existe en la fila'):
+            loader._check_unique_collisions([User(pk=self.admin.pk + 100, username='admin')])
+
+    def test_reader_handles_indented_json_across_chunks(self):
+        path = f'{self.directory}/legacy.json'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(serializers.serialize('json', Poll.objects.all(), indent=2))
+        with mock.patch.object(backups, 'CHUNK_SIZE', 64), open(path, encoding='utf-8') as f:
+            titles = [obj['fields']['title'] for obj in backups.iter_backup_objects(f)]
+        self.assertEqual(titles, list(Poll.objects.order_by('pk').values_list('title', flat=True)))
+
+
+class BackupJobTests(TestCase):
+    """Los respaldos corren como trabajos y el candado impide dos a la vez"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='clave', rol=Rol.objects.create(name='Administrador'))
+        Poll.objects.create(title='Encuesta', created_by=cls.admin)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = mock.patch.object(backups, 'BACKUP_DIR', self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lock_allows_one_job_and_is_released(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.get(reverse('dashboard:create_backup'))
+        self.assertEqual(len(callbacks), 1)
+        job = BackupJob.objects.get()
+
+        with self.assertRaises(backup_jobs.BackupJobBusy):
+            backup_jobs.start_backup_job(BackupJob.Kind.RESTAURAR, filename='otro.json.gz', background=False)
+        response = self.client.get(reverse('dashboard:create_backup'), follow=True)
+        self.assertContains(response, 'Ya hay un respaldo o restauración en curso')
+        self.assertEqual(BackupJob.objects.count(), 1)
+
+        backup_jobs.run_backup_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackupJob.Status.COMPLETADO)
+        self.assertIsNone(job.lock)
+        self.assertIsNotNone(job.duration)
+
+        data = self.client.get(reverse('dashboard:backup_job_status', args=[job.id])).json()
+        self.assertEqual(data['percent'], 100)
+        self.assertEqual(data['download_url'], reverse('dashboard:download_backup_file', args=[job.filename]))
+        backup_jobs.start_backup_job(BackupJob.Kind.CREAR, background=False)
+
+    def test_failed_restore_releases_lock(self):
+        job = backup_jobs.start_backup_job(BackupJob.Kind.RESTAURAR, filename='no_existe.json.gz', background=False)
+        backup_jobs.run_backup_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackupJob.Status.ERROR)
+        self.assertIsNone(backup_jobs.active_job())
+
+    def test_restore_progress_is_visible_to_other_processes(self):
+        job = backup_jobs.start_backup_job(BackupJob.Kind.CREAR, background=False)
+        backup_jobs.run_backup_job(job.id)
+        job.refresh_from_db()
+        restore_job = backup_jobs.start_backup_job(BackupJob.Kind.RESTAURAR, filename=job.filename, background=False)
+        # Otra instancia del backend equivale a otro proceso del servidor
+        other_process = caches.create_connection('default')
+        seen = []
+
+        def progress(count, fraction, detail):
+            seen.append((count, connection.in_atomic_block, other_process.get(backup_jobs._progress_key(restore_job.id))))
+
+        backup_jobs.run_backup_job(restore_job.id, progress=progress)
+
+        restore_job.refresh_from_db()
+        self.assertEqual(restore_job.status, BackupJob.Status.COMPLETADO)
+        self.assertTrue(seen)
+        count, in_transaction, stored = seen[-1]
+        self.assertTrue(in_transaction)
+        self.assertEqual(stored['processed'], count)
+        self.assertIsNone(other_process.get(backup_jobs._progress_key(restore_job.id)))
+
+
+class BackupStoreTests(TestCase):
+    """Los respaldos comparten fragmentos en el almacén y la retención libera los que sobran"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='clave', rol=Rol.objects.create(name='Administrador'))
+        Poll.objects.bulk_create([Poll(title=f'Encuesta {i}', description='x' * 200, created_by=cls.admin) for i in range(400)])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        # Fragmentos pequeños: con pocos datos de prueba los cortes no dependen del azar
+        for name, value in (('BACKUP_DIR', self.directory), ('CHUNK_MIN', 2048), ('CHUNK_MASK', 0x7)):
+            patcher = mock.patch.object(backups, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _set_date(self, filename, days_ago):
+        timestamp = (backups.datetime.now() - backups.timedelta(days=days_ago)).timestamp()
+        os.utime(backups._manifest_path(filename), (timestamp, timestamp))
+        backups.register_backup(filename, backups.STATUS_OK)
+
+    def test_unchanged_rows_are_stored_once(self):
+        first = backups.create_backup_file()
+        self.assertGreater(len(backups.read_meta(first['filename'])['chunks']), 1)
+        Poll.objects.filter(title='Encuesta 399').update(title='Encuesta cambiada')
+        with mock.patch.object(backups, 'datetime', wraps=backups.datetime) as clock:
+            clock.now.return_value = backups.datetime(2030, 1, 1)
+            second = backups.create_backup_file()
+        self.assertLess(second['new_size'], second['size'] / 2)
+
+        # La descarga (con Range) es un .json.gz válido formado por los fragmentos
+        url = reverse('dashboard:download_backup_file', args=[second['filename']])
+        data = b''.join(self.client.get(url).streaming_content)
+        tail = b''.join(self.client.get(url, HTTP_RANGE='bytes=100-').streaming_content)
+        self.assertEqual(tail, data[100:])
+        self.assertIn(b'Encuesta cambiada', gzip.decompress(data))
+
+    def test_retention_keeps_daily_and_weekly_and_collects_chunks(self):
+        names = []
+        for days_ago in (0, 1, 2, 9, 30):
+            Poll.objects.create(title=f'Hace {days_ago} días', created_by=self.admin)
+            with mock.patch.object(backups, 'datetime', wraps=backups.datetime) as clock:
+                clock.now.return_value = backups.datetime(2030, 1, 1) - backups.timedelta(days=days_ago)
+                names.append(backups.create_backup_file()['filename'])
+            self._set_date(names[-1], days_ago)
+
+        keep, remove = backups.retention_plan(keep_daily=2, keep_weekly=2)
+        self.assertIn(names[0], keep)
+        self.assertIn(names[1], keep)
+        self.assertEqual(remove[-1], names[-1])
+        before = backups.store_usage()
+
+        # Un respaldo que no se puede eliminar no detiene a los demás
+        delete = backups.delete_backup_file
+        def failing_delete(filename, collect=True):
+            if filename == remove[0]:
+                raise OSError('sin permiso')
+            delete(filename, collect)
+        with mock.patch.object(backups, 'delete_backup_file', failing_delete):
+            deleted, failed, _ = backups.apply_retention(keep_daily=2, keep_weekly=2)
+        self.assertEqual(failed, [(remove[0], 'sin permiso')])
+        self.assertEqual(deleted, remove[1:])
+
+        backups.apply_retention(keep_daily=2, keep_weekly=2)
+        backups.collect_garbage(grace=backups.timedelta(0))
+        self.assertEqual({info['filename'] for info in backups.list_backups()}, set(keep))
+        self.assertLess(backups.store_usage(), before)
+
+    def test_upload_with_existing_name_is_renamed(self):
+        backup = backups.create_backup_file()
+        data = b''.join(self.client.get(reverse('dashboard:download_backup_file', args=[backup['filename']])).streaming_content)
+        upload = SimpleUploadedFile(backup['filename'], data)
+        self.client.post(reverse('dashboard:upload_backup'), {'backup_file': upload})
+        stem = backup['filename'][:-len('.json.gz')]
+        # El manifiesto original (con los datos de su creación) no se reemplaza
+        self.assertIn('started_at', backups.read_meta(backup['filename']))
+        self.assertTrue(backups.is_stored(f'{stem}_1.json.gz'))
+        self.assertEqual(backups.read_meta(backup['filename'])['sha256'], backups.read_meta(f'{stem}_1.json.gz')['sha256'])
+
+    def test_catalog_lists_backups_and_verification_flags_corrupt_chunks(self):
+        backup = backups.create_backup_file()
+        entry = backups.read_catalog()[backup['filename']]
+        self.assertEqual(entry['status'], backups.STATUS_OK)
+        self.assertEqual(entry['counts']['model_poll.poll'], 400)
+        self.assertEqual(backups.list_backups()[0]['polls'], 400)
+
+        # Archivo suelto sin metadatos: desconocido tras actualizar el catálogo
+        with gzip.open(os.path.join(self.directory, 'backup_ait_20200101_000000.json.gz'), 'wt') as f:
+            f.write('[]')
+        backups.rebuild_catalog()
+        self.assertEqual(backups.read_catalog()['backup_ait_20200101_000000.json.gz']['status'], backups.STATUS_UNKNOWN)
+
+        self.assertEqual(backups.verify_backup(backup['filename'])['status'], backups.STATUS_OK)
+        digest, _ = backups.read_meta(backup['filename'])['chunks'][1]
+        with open(backups.chunk_path(digest, 'gz'), 'r+b') as f:
+            f.seek(20)
+            f.write(b'\0' * 8)
+        self.assertEqual(backups.verify_backup(backup['filename'])['status'], backups.STATUS_CORRUPT)
+
+        response = self.client.post(reverse('dashboard:restore_backup', args=[backup['filename']]))
+        self.assertRedirects(response, reverse('dashboard:backup'))
+        self.assertFalse(BackupJob.objects.exists())
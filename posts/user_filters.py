@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.db.models import Count, Q
+from model_poll.models import User, UserSearchToken, search_tokens
+
+# Usuarios por página en el listado del panel
+USERS_PER_PAGE = 15
+
+
+def user_search_q(search_query):
+    """Condición de búsqueda de usuarios que pueden resolver los índices.
+
+    - Solo dígitos: ID exacto o cédula por prefijo (índices únicos de id y cedula;
+      una cédula completa es un prefijo de una sola fila).
+    - Texto: cada palabra debe ser prefijo del username o de alguna palabra
+      del nombre (tabla UserSearchToken).
+    Se usa istartswith (LIKE 'texto%') para que MySQL pueda usar los índices.
+    """
+    search_query = search_query.strip()
+    if not search_query:
+        return Q()
+
+    if search_query.isdigit() and len(search_query) <= 18:
+        return Q(pk=int(search_query)) | Q(cedula__istartswith=search_query)
+
+    condition = Q()
+    for term in search_tokens(search_query):
+        condition &= (
+            Q(username__istartswith=term) |
+            Q(pk__in=UserSearchToken.objects.filter(token__istartswith=term).values('user'))
+        )
+    # Textos como cédulas con letra (V12345678) o usernames con símbolos
+    condition |= Q(cedula__iexact=search_query) | Q(username__istartswith=search_query)
+    return condition
+
+
+def rebuild_user_search():
+    """Reconstruye UserSearchToken para todos los usuarios (tras cargas masivas o restauraciones)"""
+    with transaction.atomic():
+        UserSearchToken.objects.all().delete()
+        rows = User.objects.values_list('id', 'first_name', 'last_name', 'full_name')
+        UserSearchToken.objects.bulk_create(
+            [
+                UserSearchToken(user_id=user_id, token=token)
+                for user_id, first_name, last_name, full_name in rows.iterator()
+                for token in set(search_tokens(f'{first_name} {last_name} {full_name}'))
+            ],
+            batch_size=1000
+        )
+    return UserSearchToken.objects.count()
+
+
+def user_filter_q(params):
+    """Condición (Q) con los filtros del listado de usuarios: search, role y status.
+
+    Se devuelve como Q para usarla tanto en el listado como en el conteo agregado.
+    """
+    search_query = params.get('search', '')
+    role_filter = params.get('role', '')
+    status_filter = params.get('status', '')
+
+    condition = Q()
+    if search_query:
+        condition &= user_search_q(search_query)
+
+    if role_filter:
+        condition &= Q(rol__name=role_filter)
+
+    if status_filter == 'active':
+        condition &= Q(is_active=True)
+    elif status_filter == 'inactive':
+        condition &= Q(is_active=False)
+
+    return condition
+
+
+def user_statistics(condition):
+    """Total filtrado y usuarios por rol en una sola consulta con agregados condicionales"""
+    return User.objects.aggregate(
+        total=Count('id', filter=condition) if condition else Count('id'),
+        admin_count=Count('id', filter=Q(rol__name='Administrador')),
+        worker_count=Count('id', filter=Q(rol__name='Trabajador')),
+        user_count=Count('id', filter=Q(rol__name='Usuario') | Q(rol__isnull=True)),
+    )
+
+
+def keyset_page(users, after=None, before=None, size=USERS_PER_PAGE):
+    """Página de usuarios ordenada por username usando el último/primer username como cursor.
+
+    A diferencia de OFFSET, el costo no crece con la profundidad de la página:
+    la consulta usa el índice único de username. Devuelve un diccionario con
+    'users', 'next' (cursor de la página siguiente) y 'previous'.
+    """
+    if before:
+        # Página anterior: se recorre hacia atrás y se invierte el resultado
+        rows = list(users.filter(username__lt=before).order_by('-username')[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size][::-1]
+        has_previous, has_next = has_more, True
+    else:
+        if after:
+            users = users.filter(username__gt=after)
+        rows = list(users.order_by('username')[:size + 1])
+        has_next = len(rows) > size
+        rows = rows[:size]
+        has_previous = bool(after)
+
+    return {
+        'users': rows,
+        'next': rows[-1].username if rows and has_next else None,
+        'previous': rows[0].username if rows and has_previous else None,
+    }
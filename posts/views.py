@@ -1,50 +1,42 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden, JsonResponse, HttpResponse
-from django.db.models import Count, Avg, Q
+from django.http import HttpResponseForbidden, JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.template.loader import render_to_string
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Avg
 from django.core.paginator import Paginator
-from model_poll.models import Poll, Question, Options, Participation, QuestionDetails, User, Rol, SiteContent
+from model_poll.models import Poll, Question, Options, Participation, QuestionDetails, User, Rol, SiteContent, ReportJob, BackupJob
+from .tallies import polls_tallies, question_tally, record_answers, rebuild_tallies
+from .results_cache import get_results_snapshot, bump_results_version
+from .report_jobs import enqueue_report, job_progress
+from .poll_filters import can_view_statistics, filter_manager_polls, manager_polls, statistics_polls, with_poll_counts
+from .bulk_export import stream_reports_zip
+from .csv_export import stream_poll_answers_csv
+from .content_cache import active_content_of
+from .backups import (
+    STATUS_CORRUPT, backup_exists, backup_file_response, catalog_store_size, delete_backup_file, is_backup_filename,
+    list_backups, read_catalog, save_uploaded_backup
+)
+from .backup_jobs import BackupJobBusy, active_job, job_progress as backup_job_progress, start_backup_job
+from .user_filters import keyset_page, user_filter_q, user_search_q, user_statistics
 import json
-from django.conf import settings
 import os
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from io import BytesIO
 from datetime import datetime
-import matplotlib.pyplot as plt
-import matplotlib
-from django.core.management import call_command
-matplotlib.use('Agg')  # Backend sin GUI
 
-def format_datetime_12h(dt):
-    """Formatea fecha y hora en formato 12 horas: DD/MM/AAAA h:mm A.M/P.M"""
-    if not dt:
-        return 'No definida'
-    hour = dt.hour
-    minute = dt.minute
-    am_pm = 'A.M' if hour < 12 else 'P.M'
-    hour_12 = hour if hour <= 12 else hour - 12
-    hour_12 = 12 if hour_12 == 0 else hour_12
-    return f"{dt.strftime('%d/%m/%Y')} a las {hour_12}:{minute:02d} {am_pm}"
+# Encuestas por página en el listado del panel
+POLLS_PER_PAGE = 10
 
 @login_required
 def poll_list(request):
     """Vista para mostrar todas las encuestas"""
-    # Verificar y actualizar estado de encuestas vencidas
-    active_polls = Poll.objects.filter(status='ACTIVA')
-    for poll in active_polls:
-        poll.check_and_update_status()
-    
     # Obtener todas las encuestas (activas y cerradas) excluyendo borradores
     polls = Poll.objects.exclude(status='BORRADOR').order_by('-star_date')
     
     # Obtener slides del carousel
-    carousel_slides = SiteContent.objects.filter(content_type='CAROUSEL_SLIDE', is_active=True).order_by('order')
+    carousel_slides = active_content_of('CAROUSEL_SLIDE')
     
     context = {
         'polls': polls,
@@ -67,7 +59,6 @@ def poll_manager(request):
     
     # Administrador: Ve todas las encuestas y puede CRUD completo
     if request.user.rol.name == 'Administrador':
-        polls = Poll.objects.all().order_by('-star_date')
         users = User.objects.all().order_by('username')
         
         # Filtros de búsqueda para usuarios
@@ -75,32 +66,32 @@ def poll_manager(request):
         role_filter = request.GET.get('role', '')
         
         if search_query:
-            users = users.filter(
-                Q(username__icontains=search_query) |
-                Q(first_name__icontains=search_query) |
-                Q(last_name__icontains=search_query) |
-                Q(email__icontains=search_query)
-            )
+            users = users.filter(user_search_q(search_query))
         
         if role_filter:
             users = users.filter(rol__name=role_filter)
             
     # Trabajador: Solo ve encuestas públicas y solo puede editar las suyas
     else:
-        polls = Poll.objects.filter(is_public=True).order_by('-star_date')
         users = User.objects.all().order_by('username')
     
-    # Verificar y actualizar encuestas vencidas
-    for poll in polls.filter(status='ACTIVA'):
-        poll.check_and_update_status()
+    users = users.select_related('rol')
     
     # Calcular estadísticas para el dashboard
+    polls = manager_polls(request.user)
+    total_polls = polls.count()
     active_polls = polls.filter(status='ACTIVA').count()
     total_responses = Participation.objects.count()
     total_users = User.objects.count()
     
+    # Solo se envía la página pedida; el resto se carga con poll_manager_rows
+    page_obj = _manager_polls_page(request)
+    authors = User.objects.filter(encuestas_creadas__in=polls).distinct().order_by('username')
+    
     context = {
-        'polls': polls, 
+        'page_obj': page_obj,
+        'total_polls': total_polls,
+        'authors': authors,
         'users': users,
         'active_polls': active_polls,
         'total_responses': total_responses,
@@ -109,53 +100,80 @@ def poll_manager(request):
     
     return render(request, 'posts/dashboard_home.html', context)
 
+def _manager_polls_page(request):
+    """Página del listado de encuestas del panel según los filtros de request.GET"""
+    polls = filter_manager_polls(manager_polls(request.user), request.GET)
+    return Paginator(polls, POLLS_PER_PAGE).get_page(request.GET.get('page'))
+
+@login_required
+def poll_manager_rows(request):
+    """Devuelve en JSON las filas de una página del listado de encuestas (botón "Cargar más")"""
+    if not request.user.rol or request.user.rol.name not in ['Administrador', 'Trabajador']:
+        return JsonResponse({'success': False, 'message': 'No tienes permisos para ver las encuestas.'}, status=403)
+    
+    page_obj = _manager_polls_page(request)
+    html = render_to_string('posts/dashboard_poll_rows.html', {'page_obj': page_obj}, request=request)
+    
+    return JsonResponse({
+        'success': True,
+        'html': html,
+        'page': page_obj.number,
+        'has_next': page_obj.has_next(),
+        'next_page': page_obj.next_page_number() if page_obj.has_next() else None,
+        'total': page_obj.paginator.count,
+    })
+
 @login_required
 def user_list(request):
     """Vista para listado completo de usuarios - Administradores y Trabajadores"""
     if not request.user.rol or request.user.rol.name not in ['Administrador', 'Trabajador']:
         return HttpResponseForbidden("No tienes permisos para ver el listado de usuarios.")
     
-    # Obtener todos los usuarios
-    users = User.objects.all().order_by('username')
-    
-    # Filtros de búsqueda
-    search_query = request.GET.get('search', '')
-    role_filter = request.GET.get('role', '')
-    status_filter = request.GET.get('status', '')
-    
-    if search_query:
-        users = users.filter(
-            Q(id__icontains=search_query) |
-            Q(cedula__icontains=search_query) |
-            Q(username__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query)
-        )
+    # Filtros de búsqueda (search, role, status)
+    condition = user_filter_q(request.GET)
+    users = User.objects.filter(condition).select_related('rol')
     
-    if role_filter:
-        users = users.filter(rol__name=role_filter)
+    # Paginación por cursor (username) en lugar de OFFSET
+    page = keyset_page(users, after=request.GET.get('after'), before=request.GET.get('before'))
     
-    if status_filter == 'active':
-        users = users.filter(is_active=True)
-    elif status_filter == 'inactive':
-        users = users.filter(is_active=False)
+    # Variante JSON para scroll infinito
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'success': True,
+            'users': [
+                {
+                    'id': usuario.id,
+                    'username': usuario.username,
+                    'full_name': usuario.get_full_name(),
+                    'cedula': usuario.cedula,
+                    'rol': usuario.rol.name if usuario.rol else 'Usuario',
+                    'is_active': usuario.is_active,
+                    'date_joined': usuario.date_joined.strftime('%d/%m/%Y'),
+                    'profile_image': usuario.profile_image.url if usuario.profile_image else None,
+                }
+                for usuario in page['users']
+            ],
+            'next': page['next'],
+            'previous': page['previous'],
+        })
     
-    # Calcular estadísticas por rol
-    admin_count = User.objects.filter(rol__name='Administrador').count()
-    worker_count = User.objects.filter(rol__name='Trabajador').count()
-    user_count = User.objects.filter(Q(rol__name='Usuario') | Q(rol__isnull=True)).count()
+    # Total filtrado y estadísticas por rol en una sola consulta
+    stats = user_statistics(condition)
     
-    # Paginación - 15 usuarios por página
-    paginator = Paginator(users, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Filtros actuales para conservarlos en los enlaces de paginación
+    filter_params = urlencode({
+        key: request.GET[key] for key in ('search', 'role', 'status') if request.GET.get(key)
+    })
     
     context = {
-        'users': users,
-        'page_obj': page_obj,
-        'admin_count': admin_count,
-        'worker_count': worker_count,
-        'user_count': user_count,
+        'users': page['users'],
+        'next_cursor': page['next'],
+        'previous_cursor': page['previous'],
+        'filter_params': filter_params,
+        'total_users': stats['total'],
+        'admin_count': stats['admin_count'],
+        'worker_count': stats['worker_count'],
+        'user_count': stats['user_count'],
     }
     
     return render(request, 'posts/dashboard_users.html', context)
@@ -189,7 +207,7 @@ def create_poll(request):
             star_date_obj = dt.fromisoformat(star_date)
             end_date = star_date_obj + timezone.timedelta(days=30)
         
-        # Crear encuesta
+        # Crear encuesta; un borrador se activa en su fecha de inicio solo si se pidió explícitamente
         poll = Poll.objects.create(
             title=title,
             description=description,
@@ -198,7 +216,8 @@ def create_poll(request):
             status=status,
             is_public=is_public,
             star_date=star_date,
-            end_date=end_date
+            end_date=end_date,
+            auto_activate=status == 'BORRADOR' and request.POST.get('auto_activate') == 'on'
         )
         
         # Procesar preguntas
@@ -279,6 +298,7 @@ def edit_poll(request, poll_id):
         poll.title = request.POST.get('title')
         poll.description = request.POST.get('description')
         poll.status = request.POST.get('status')
+        poll.auto_activate = poll.status == 'BORRADOR' and request.POST.get('auto_activate') == 'on'
         
         # Solo Administrador puede cambiar is_public
         if request.user.rol.name == 'Administrador':
@@ -294,98 +314,104 @@ def edit_poll(request, poll_id):
             # Reemplazar con nueva imagen
             poll.image = request.FILES['image']
         
-        poll.save()
+        # La edición y el cambio de versión se confirman juntos: una lectura de
+        # resultados ve la versión anterior con las preguntas anteriores
+        with transaction.atomic():
+            poll.save()
         
-        # Procesar eliminación de preguntas
-        for key in request.POST.keys():
-            if key.startswith('delete_question_'):
-                question_id = key.split('_')[-1]
-                try:
-                    question = Question.objects.get(id=question_id, poll=poll)
-                    question.delete()
-                except Question.DoesNotExist:
-                    pass
-        
-        # Procesar eliminación de opciones
-        for key in request.POST.keys():
-            if key.startswith('delete_option_'):
-                parts = key.split('_')
-                if len(parts) >= 4:
-                    option_id = parts[-1]
+            # Procesar eliminación de preguntas
+            for key in request.POST.keys():
+                if key.startswith('delete_question_'):
+                    question_id = key.split('_')[-1]
                     try:
-                        option = Options.objects.get(id=option_id)
-                        option.delete()
-                    except Options.DoesNotExist:
+                        question = Question.objects.get(id=question_id, poll=poll)
+                        question.delete()
+                    except Question.DoesNotExist:
                         pass
         
-        # Actualizar preguntas existentes
-        for key, value in request.POST.items():
-            if key.startswith('existing_question_text_'):
-                question_id = key.split('_')[-1]
-                try:
-                    question = Question.objects.get(id=question_id, poll=poll)
-                    question.question_text = value
-                    question.question_type = request.POST.get(f'existing_question_type_{question_id}')
-                    question.is_obligatory = request.POST.get(f'existing_is_obligatory_{question_id}') == 'true'
-                    question.save()
+            # Procesar eliminación de opciones
+            for key in request.POST.keys():
+                if key.startswith('delete_option_'):
+                    parts = key.split('_')
+                    if len(parts) >= 4:
+                        option_id = parts[-1]
+                        try:
+                            option = Options.objects.get(id=option_id)
+                            option.delete()
+                        except Options.DoesNotExist:
+                            pass
+        
+            # Actualizar preguntas existentes
+            for key, value in request.POST.items():
+                if key.startswith('existing_question_text_'):
+                    question_id = key.split('_')[-1]
+                    try:
+                        question = Question.objects.get(id=question_id, poll=poll)
+                        question.question_text = value
+                        question.question_type = request.POST.get(f'existing_question_type_{question_id}')
+                        question.is_obligatory = request.POST.get(f'existing_is_obligatory_{question_id}') == 'true'
+                        question.save()
                     
-                    # Actualizar opciones existentes
-                    for opt_key, opt_value in request.POST.items():
-                        if opt_key.startswith(f'existing_option_text_{question_id}_'):
-                            option_id = opt_key.split('_')[-1]
-                            try:
-                                option = Options.objects.get(id=option_id, question=question)
-                                option.options_text = opt_value
-                                option.save()
-                            except Options.DoesNotExist:
-                                pass
+                        # Actualizar opciones existentes
+                        for opt_key, opt_value in request.POST.items():
+                            if opt_key.startswith(f'existing_option_text_{question_id}_'):
+                                option_id = opt_key.split('_')[-1]
+                                try:
+                                    option = Options.objects.get(id=option_id, question=question)
+                                    option.options_text = opt_value
+                                    option.save()
+                                except Options.DoesNotExist:
+                                    pass
                     
-                    # Agregar nuevas opciones a preguntas existentes
-                    for new_opt_key, new_opt_value in request.POST.items():
-                        if new_opt_key.startswith(f'new_existing_option_{question_id}_') and new_opt_value:
-                            Options.objects.create(
-                                question=question,
-                                options_text=new_opt_value
-                            )
+                        # Agregar nuevas opciones a preguntas existentes
+                        for new_opt_key, new_opt_value in request.POST.items():
+                            if new_opt_key.startswith(f'new_existing_option_{question_id}_') and new_opt_value:
+                                Options.objects.create(
+                                    question=question,
+                                    options_text=new_opt_value
+                                )
                 
-                except Question.DoesNotExist:
-                    pass
+                    except Question.DoesNotExist:
+                        pass
         
-        # Procesar nuevas preguntas
-        question_order = poll.preguntas.count()
-        for key, value in request.POST.items():
-            if key.startswith('new_question_text_'):
-                question_id = key.split('_')[-1]
-                question_text = value
-                question_type = request.POST.get(f'new_question_type_{question_id}')
-                is_obligatory = request.POST.get(f'new_is_obligatory_{question_id}') == 'true'
+            # Procesar nuevas preguntas
+            question_order = poll.preguntas.count()
+            for key, value in request.POST.items():
+                if key.startswith('new_question_text_'):
+                    question_id = key.split('_')[-1]
+                    question_text = value
+                    question_type = request.POST.get(f'new_question_type_{question_id}')
+                    is_obligatory = request.POST.get(f'new_is_obligatory_{question_id}') == 'true'
                 
-                if question_text and question_type:
-                    question = Question.objects.create(
-                        poll=poll,
-                        question_text=question_text,
-                        question_type=question_type,
-                        is_obligatory=is_obligatory,
-                        order=question_order
-                    )
-                    question_order += 1
+                    if question_text and question_type:
+                        question = Question.objects.create(
+                            poll=poll,
+                            question_text=question_text,
+                            question_type=question_type,
+                            is_obligatory=is_obligatory,
+                            order=question_order
+                        )
+                        question_order += 1
                     
-                    # Procesar opciones de nuevas preguntas
-                    if question_type == 'SELECCION_MULTIPLE':
-                        for option_key, option_value in request.POST.items():
-                            if option_key.startswith(f'new_option_{question_id}_') and option_value:
+                        # Procesar opciones de nuevas preguntas
+                        if question_type == 'SELECCION_MULTIPLE':
+                            for option_key, option_value in request.POST.items():
+                                if option_key.startswith(f'new_option_{question_id}_') and option_value:
+                                    Options.objects.create(
+                                        question=question,
+                                        options_text=option_value
+                                    )
+                        elif question_type == 'ESCALA_NUMERICA':
+                            # Crear opciones automáticamente para escala 1-5
+                            for i in range(1, 6):
                                 Options.objects.create(
                                     question=question,
-                                    options_text=option_value
+                                    options_text=str(i),
+                                    value=i
                                 )
-                    elif question_type == 'ESCALA_NUMERICA':
-                        # Crear opciones automáticamente para escala 1-5
-                        for i in range(1, 6):
-                            Options.objects.create(
-                                question=question,
-                                options_text=str(i),
-                                value=i
-                            )
+            
+            # Cualquier cambio en preguntas u opciones invalida los resultados en caché
+            bump_results_version(Poll.objects.filter(id=poll.id))
         
         messages.success(request, 'Encuesta actualizada exitosamente con todas sus preguntas.')
         return redirect('dashboard:home')
@@ -440,8 +466,8 @@ def answer_poll(request, poll_id):
     """Vista para que usuarios y trabajadores respondan encuestas"""
     poll = get_object_or_404(Poll, id=poll_id)
     
-    # Verificar y actualizar estado si es necesario
-    if poll.check_and_update_status():
+    # Verificar si ya finalizó (el cierre en base de datos lo aplica run_poll_scheduler)
+    if poll.status == 'ACTIVA' and poll.has_ended():
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return HttpResponse('<div class="alert alert-warning"><i class="fas fa-exclamation-triangle me-2"></i>Esta encuesta ha finalizado y ya no acepta respuestas.</div>')
         messages.error(request, 'Esta encuesta ha finalizado y ya no acepta respuestas.')
@@ -486,36 +512,59 @@ def submit_poll(request, poll_id):
     # Usuarios y Trabajadores pueden responder encuestas
     if request.user.rol and request.user.rol.name == 'Administrador':
         messages.error(request, 'Los administradores no pueden responder encuestas.')
-        return redirect('posts:poll_list')
+        return redirect('posts:list')
     
     if request.method == 'POST':
         poll = get_object_or_404(Poll, id=poll_id, status='ACTIVA')
         
-        # Verificar si el usuario ya participó
-        if Participation.objects.filter(poll=poll, user=request.user).exists():
-            messages.error(request, 'Ya has participado en esta encuesta.')
-            return redirect('posts:poll_list')
+        if poll.has_ended():
+            messages.error(request, 'Esta encuesta ha finalizado y ya no acepta respuestas.')
+            return redirect('posts:list')
         
-        # Crear participación
-        participation = Participation.objects.create(
-            poll=poll,
-            user=request.user
+        # Opciones enviadas por pregunta (question_<id> = <id de opción>); como antes,
+        # solo se guardan las preguntas con opciones y las demás (texto libre) se ignoran
+        option_questions = poll.preguntas.filter(
+            question_type__in=['SELECCION_MULTIPLE', 'ESCALA_LINEAL', 'CALIFICACION']
+        ).values_list('id', flat=True)
+        submitted = {}
+        for question_id in option_questions:
+            value = request.POST.get(f'question_{question_id}')
+            if value:
+                try:
+                    submitted[question_id] = int(value)
+                except ValueError:
+                    messages.error(request, 'Las respuestas enviadas no son válidas.')
+                    return redirect('posts:list')
+        
+        # Validar todas las opciones contra la encuesta en una sola consulta
+        valid_options = dict(
+            Options.objects.filter(id__in=submitted.values(), question__poll=poll).values_list('id', 'question_id')
         )
+        if any(valid_options.get(option_id) != question_id for question_id, option_id in submitted.items()):
+            messages.error(request, 'Las respuestas enviadas no son válidas.')
+            return redirect('posts:list')
         
-        # Procesar cada pregunta
-        for question in poll.preguntas.all():
-            question_key = f'question_{question.id}'
-            
-            if question_key in request.POST:
-                if question.question_type in ['SELECCION_MULTIPLE', 'ESCALA_LINEAL', 'CALIFICACION']:
-                    option_id = request.POST[question_key]
-                    if option_id:
-                        option = question.opciones.get(id=option_id)
-                        QuestionDetails.objects.create(
-                            participation=participation,
-                            question=question,
-                            selected_options=option
-                        )
+        # Crear participación, respuestas y contadores en una sola transacción;
+        # una participación repetida la detecta la restricción única (poll, user)
+        try:
+            with transaction.atomic():
+                participation = Participation.objects.create(
+                    poll=poll,
+                    user=request.user
+                )
+                answers = QuestionDetails.objects.bulk_create([
+                    QuestionDetails(
+                        participation=participation,
+                        question_id=question_id,
+                        selected_options_id=option_id
+                    )
+                    for question_id, option_id in submitted.items()
+                ])
+                record_answers(answers)
+                bump_results_version(Poll.objects.filter(id=poll.id))
+        except IntegrityError:
+            messages.error(request, 'Ya has participado en esta encuesta.')
+            return redirect('posts:list')
         
         messages.success(request, '¡Gracias por participar en la encuesta!')
         return redirect('posts:list')
@@ -542,74 +591,13 @@ def poll_results(request, poll_id):
                 return HttpResponseForbidden("Solo puedes ver resultados de tus propias encuestas activas.")
     # Las encuestas cerradas son públicas para todos los usuarios autenticados
     
-    # Calcular estadísticas
-    total_participations = poll.participaciones.count()
-    
-    # Crear lista de preguntas con sus resultados
-    questions_with_results = []
-    
-    for question in Question.objects.filter(poll=poll).prefetch_related('opciones'):
-        question_data = {
-            'id': question.id,
-            'text': question.question_text,
-            'type': question.question_type,
-            'options_list': [],
-            'text_responses': [],
-            'average_rating': 0,
-            'rating_counts': [0, 0, 0, 0, 0]
-        }
-        
-        if question.question_type == 'SELECCION_MULTIPLE':
-            # Calcular porcentajes para opciones
-            for option in question.opciones.all():
-                count = QuestionDetails.objects.filter(
-                    question=question,
-                    selected_options=option
-                ).count()
-                percentage = (count / total_participations * 100) if total_participations > 0 else 0
-                question_data['options_list'].append({
-                    'text': option.options_text,
-                    'count': count,
-                    'percentage': percentage
-                })
-        
-        elif question.question_type == 'TEXTO_LIBRE':
-            # Obtener respuestas de texto
-            question_data['text_responses'] = QuestionDetails.objects.filter(
-                question=question,
-                answer_text__isnull=False
-            ).select_related('participation__user')
-        
-        elif question.question_type in ['ESCALA_LINEAL', 'CALIFICACION']:
-            # Calcular promedio y distribución
-            responses = QuestionDetails.objects.filter(
-                question=question,
-                selected_options__isnull=False
-            )
-            
-            if responses.exists():
-                ratings = []
-                for response in responses:
-                    try:
-                        rating = response.selected_options.value
-                        if rating:
-                            ratings.append(rating)
-                    except (ValueError, AttributeError):
-                        pass
-                
-                if ratings:
-                    question_data['average_rating'] = sum(ratings) / len(ratings)
-                    min_val = question.scale_min or 1
-                    max_val = question.scale_max or (question.rating_stars or 5)
-                    question_data['rating_counts'] = [ratings.count(i) for i in range(min_val, max_val + 1)]
-                    question_data['max_rating_count'] = max(question_data['rating_counts']) if question_data['rating_counts'] else 1
-        
-        questions_with_results.append(question_data)
+    # Resultados desde la caché (se invalidan con cada participación o edición)
+    snapshot = get_results_snapshot(poll)
     
     context = {
         'poll': poll,
-        'total_participations': total_participations,
-        'questions_with_results': questions_with_results,
+        'total_participations': snapshot['total_participations'],
+        'questions_with_results': snapshot['questions_with_results'],
     }
     
     # Si es una petición AJAX, devolver solo el contenido del modal
@@ -734,36 +722,31 @@ def poll_statistics(request):
     if not request.user.rol or request.user.rol.name not in ['Administrador', 'Trabajador']:
         return HttpResponseForbidden("No tienes permisos para ver estadísticas.")
     
-    # Administrador: Ve todas las encuestas
-    # Trabajador: Solo ve encuestas públicas (is_public=True)
-    if request.user.rol.name == 'Administrador':
-        all_polls = Poll.objects.all().order_by('-star_date')
-    else:
-        all_polls = Poll.objects.filter(is_public=True).order_by('-star_date')
-    
-    # Aplicar filtros
-    search_query = request.GET.get('search', '')
-    status_filter = request.GET.get('status', '')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
-    
-    if search_query:
-        all_polls = all_polls.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(created_by__username__icontains=search_query) |
-            Q(created_by__first_name__icontains=search_query) |
-            Q(created_by__last_name__icontains=search_query)
-        )
+    # Encuestas visibles según el rol, con los filtros de búsqueda aplicados
+    all_polls = statistics_polls(request.user, request.GET)
     
-    if status_filter:
-        all_polls = all_polls.filter(status=status_filter)
+    # Cargar encuestas con sus conteos, preguntas y opciones en consultas fijas
+    all_polls = with_poll_counts(all_polls).select_related('created_by').prefetch_related('preguntas__opciones')
     
-    if date_from:
-        all_polls = all_polls.filter(star_date__gte=date_from)
+    # Conteos de todas las encuestas filtradas en una sola consulta agrupada
+    tallies = polls_tallies(all_polls)
     
-    if date_to:
-        all_polls = all_polls.filter(star_date__lte=date_to)
+    # Respuestas de texto libre de todas las encuestas en una sola consulta
+    responses_by_question = {}
+    text_question_ids = [
+        question.id
+        for poll in all_polls
+        for question in poll.preguntas.all()
+        if question.question_type == 'TEXTO_LIBRE'
+    ]
+    if text_question_ids:
+        responses = QuestionDetails.objects.filter(
+            question_id__in=text_question_ids,
+            answer_text__isnull=False,
+            answer_text__gt=''
+        ).select_related('participation__user')
+        for response in responses:
+            responses_by_question.setdefault(response.question_id, []).append(response)
     
     # Crear diccionario con respuestas de texto libre y datos de gráficas
     text_responses = {}
@@ -772,24 +755,16 @@ def poll_statistics(request):
         text_responses[poll.id] = {}
         chart_data[poll.id] = {}
         for question in poll.preguntas.all():
+            tally = question_tally(tallies, question)
             if question.question_type == 'TEXTO_LIBRE':
-                responses = QuestionDetails.objects.filter(
-                    question=question,
-                    answer_text__isnull=False,
-                    answer_text__gt=''
-                ).select_related('participation__user')
-                text_responses[poll.id][question.id] = list(responses)
+                text_responses[poll.id][question.id] = responses_by_question.get(question.id, [])
             
             elif question.question_type == 'SELECCION_MULTIPLE':
                 labels = []
                 data = []
                 for option in question.opciones.all():
-                    count = QuestionDetails.objects.filter(
-                        question=question,
-                        selected_options=option
-                    ).count()
                     labels.append(option.options_text)
-                    data.append(count)
+                    data.append(tally['options'].get(option.id, 0))
                 
                 chart_data[poll.id][question.id] = {
                     'labels': labels,
@@ -802,12 +777,8 @@ def poll_statistics(request):
                 data = []
                 
                 for i in range(question.scale_min or 1, (question.scale_max or 5) + 1):
-                    count = QuestionDetails.objects.filter(
-                        question=question,
-                        selected_options__value=i
-                    ).count()
                     labels.append(str(i))
-                    data.append(count)
+                    data.append(tally['values'].get(i, 0))
                 
                 chart_data[poll.id][question.id] = {
                     'labels': labels,
@@ -824,11 +795,7 @@ def poll_statistics(request):
                     'counts': {}
                 }
                 for i in range(1, (question.rating_stars or 5) + 1):
-                    count = QuestionDetails.objects.filter(
-                        question=question,
-                        selected_options__value=i
-                    ).count()
-                    chart_data[poll.id][question.id]['counts'][i] = count
+                    chart_data[poll.id][question.id]['counts'][i] = tally['values'].get(i, 0)
     
     context = {
         'all_polls': all_polls,
@@ -845,212 +812,112 @@ def export_poll_pdf(request, poll_id):
         return HttpResponseForbidden("No tienes permisos para exportar reportes.")
     
     poll = get_object_or_404(Poll, id=poll_id)
+    if not can_view_statistics(request.user, poll):
+        return HttpResponseForbidden("Solo puedes exportar reportes de encuestas públicas.")
+    snapshot = get_results_snapshot(poll)
     
     # Crear respuesta HTTP para PDF
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="Reporte_{poll.title.replace(" ", "_")}.pdf"'
     
-    # Crear documento PDF
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    
-    # Estilos con Helvetica
-    title_style = ParagraphStyle('CustomTitle', fontSize=14, fontName='Helvetica-Bold', spaceAfter=20, alignment=TA_CENTER)
-    heading_style = ParagraphStyle('CustomHeading', fontSize=14, fontName='Helvetica-Bold', spaceAfter=12, textColor=colors.HexColor('#184da1'))
-    normal_style = ParagraphStyle('Normal', fontSize=12, fontName='Helvetica')
-    
-    # Contenido del PDF
-    story = []
-    
-    # Encabezado con logo
-    logo_path = os.path.join(settings.BASE_DIR, 'static', 'SVG', 'GOB AIT Color_3.png')
-    subheader_style = ParagraphStyle('SubHeader', fontSize=12, fontName='Helvetica', alignment=TA_LEFT, textColor=colors.HexColor('#666666'), leading=16)
-    
-    # Crear tabla para encabezado con logo
-    if os.path.exists(logo_path):
-        logo = Image(logo_path, width=2*inch, height=0.7*inch)
-        header_text = [[Paragraph("REPÚBLICA BOLIVARIANA DE VENEZUELA<br/>GOBERNACIÓN DEL ESTADO ANZOÁTEGUI<br/>DIRECCIÓN DE AUTOMATIZACIÓN, INFORMÁTICA Y TELECOMUNICACIONES (AIT ANZOÁTEGUI)<br/>RIF: G-200001224", subheader_style), logo]]
-        header_table = Table(header_text, colWidths=[4*inch, 2*inch])
-        header_table.setStyle(TableStyle([('VALIGN', (0, 0), (-1, -1), 'TOP'), ('ALIGN', (0, 0), (0, 0), 'LEFT'), ('ALIGN', (1, 0), (1, 0), 'RIGHT')]))
-        story.append(header_table)
-    else:
-        story.append(Paragraph("REPÚBLICA BOLIVARIANA DE VENEZUELA", subheader_style))
-        story.append(Paragraph("GOBERNACIÓN DEL ESTADO ANZOÁTEGUI", subheader_style))
-        story.append(Paragraph("DIRECCIÓN DE AUTOMATIZACIÓN, INFORMÁTICA Y TELECOMUNICACIONES (AIT ANZOÁTEGUI)", subheader_style))
-        story.append(Paragraph("RIF: G-200001224", subheader_style))
-    
-    story.append(Spacer(1, 20))
-    
-    # Título del reporte centrado
-    story.append(Paragraph(f"REPORTE DE ENCUESTA: {poll.title.upper()}", title_style))
-    
-    # Información básica
-    story.append(Paragraph("INFORMACIÓN GENERAL", heading_style))
-    
-    # Título y descripción arriba de la tabla
-    story.append(Paragraph(f"<b>Título:</b> {poll.title}", normal_style))
-    story.append(Spacer(1, 6))
-    description = poll.description or 'Sin descripción'
-    story.append(Paragraph(f"<b>Descripción:</b> {description}", normal_style))
-    story.append(Spacer(1, 12))
-    
-    # Obtener nombre del autor
-    autor = f"{poll.created_by.first_name} {poll.created_by.last_name}" if poll.created_by.first_name else poll.created_by.username
-    
-    info_data = [
-        ['Autor:', autor],
-        ['Estado:', poll.status],
-        ['Fecha de inicio:', format_datetime_12h(poll.star_date)],
-        ['Fecha de fin:', format_datetime_12h(poll.end_date)],
-        ['Total participaciones:', str(poll.participaciones.count())],
-        ['Fecha del reporte:', format_datetime_12h(datetime.now())]
-    ]
+    # reportlab y matplotlib se cargan solo cuando se genera un reporte
+    from .reports import build_poll_report
+    pdf = build_poll_report(poll, snapshot)
+    response.write(pdf)
     
-    info_table = Table(info_data, colWidths=[2*inch, 4*inch])
-    info_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f8f9fa')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(info_table)
-    story.append(Spacer(1, 30))
-    
-    # Preguntas y respuestas
-    story.append(Paragraph("PREGUNTAS Y RESPUESTAS", heading_style))
-    
-    for i, question in enumerate(poll.preguntas.all(), 1):
-        question_style = ParagraphStyle('QuestionStyle', fontSize=12, fontName='Helvetica-Bold', spaceAfter=10)
-        story.append(Paragraph(f"Pregunta {i}: {question.question_text}", question_style))
-        story.append(Paragraph(f"Tipo: {question.get_question_type_display()}", normal_style))
-        
-        if question.question_type == 'TEXTO_LIBRE':
-            responses = QuestionDetails.objects.filter(
-                question=question,
-                answer_text__isnull=False,
-                answer_text__gt=''
-            ).select_related('participation__user')
-            
-            if responses.exists():
-                subheading_style = ParagraphStyle('SubHeading', fontSize=12, fontName='Helvetica-Bold', spaceAfter=5)
-                story.append(Paragraph("Respuestas:", subheading_style))
-                for resp in responses:
-                    story.append(Paragraph(f"• {resp.participation.user.username} ({format_datetime_12h(resp.participation.sent_date)}): {resp.answer_text}", normal_style))
-            else:
-                story.append(Paragraph("No hay respuestas", normal_style))
-        
-        elif question.question_type in ['SELECCION_MULTIPLE', 'ESCALA_LINEAL', 'CALIFICACION']:
-            # Generar gráfica
-            chart_buffer = BytesIO()
-            fig, ax = plt.subplots(figsize=(6, 4))
-            
-            if question.question_type == 'SELECCION_MULTIPLE':
-                labels = []
-                sizes = []
-                colors_list = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40']
-                
-                for option in question.opciones.all():
-                    count = QuestionDetails.objects.filter(question=question, selected_options=option).count()
-                    if count > 0:
-                        labels.append(option.options_text)
-                        sizes.append(count)
-                
-                if sizes:
-                    ax.pie(sizes, labels=labels, autopct='%1.1f%%', colors=colors_list[:len(sizes)])
-                else:
-                    ax.text(0.5, 0.5, 'Sin respuestas', ha='center', va='center', transform=ax.transAxes, fontsize=12)
-            
-            elif question.question_type == 'ESCALA_LINEAL':
-                labels = []
-                values = []
-                
-                for i in range(question.scale_min or 1, (question.scale_max or 5) + 1):
-                    count = QuestionDetails.objects.filter(question=question, selected_options__value=i).count()
-                    labels.append(str(i))
-                    values.append(count)
-                
-                ax.bar(labels, values, color='#36A2EB')
-                ax.set_xlabel('Escala', fontsize=10)
-                ax.set_ylabel('Número de respuestas', fontsize=10)
-                ax.set_ylim(0, max(values) + 1 if max(values) > 0 else 1)
-            
-            elif question.question_type == 'CALIFICACION':
-                labels = []
-                values = []
-                
-                for i in range(1, (question.rating_stars or 5) + 1):
-                    count = QuestionDetails.objects.filter(question=question, selected_options__value=i).count()
-                    labels.append(f'{i}★')
-                    values.append(count)
-                
-                ax.bar(labels, values, color='#FFD700')
-                ax.set_xlabel('Calificación', fontsize=10)
-                ax.set_ylabel('Número de respuestas', fontsize=10)
-                ax.set_ylim(0, max(values) + 1 if max(values) > 0 else 1)
-            
-            plt.tight_layout()
-            plt.savefig(chart_buffer, format='png', dpi=150, bbox_inches='tight')
-            plt.close()
-            
-            # Añadir gráfica al PDF
-            chart_buffer.seek(0)
-            chart_img = Image(chart_buffer, width=4.5*inch, height=3*inch)
-            chart_img.hAlign = 'CENTER'
-            story.append(Spacer(1, 10))
-            story.append(chart_img)
-            story.append(Spacer(1, 15))
-            
-            # Estadísticas de opciones
-            stats_data = [['Opción', 'Respuestas', 'Porcentaje']]
-            total_responses = QuestionDetails.objects.filter(question=question, selected_options__isnull=False).count()
-            
-            if question.question_type == 'SELECCION_MULTIPLE':
-                for option in question.opciones.all():
-                    count = QuestionDetails.objects.filter(question=question, selected_options=option).count()
-                    percentage = (count / total_responses * 100) if total_responses > 0 else 0
-                    stats_data.append([option.options_text, str(count), f"{percentage:.1f}%"])
-            
-            elif question.question_type in ['ESCALA_LINEAL', 'CALIFICACION']:
-                for i in range(question.scale_min or 1, (question.scale_max or question.rating_stars or 5) + 1):
-                    count = QuestionDetails.objects.filter(
-                        question=question,
-                        selected_options__value=i
-                    ).count()
-                    percentage = (count / total_responses * 100) if total_responses > 0 else 0
-                    label = f'{i}★' if question.question_type == 'CALIFICACION' else str(i)
-                    stats_data.append([label, str(count), f"{percentage:.1f}%"])
-            
-            if len(stats_data) > 1:
-                stats_table = Table(stats_data, colWidths=[2*inch, 1*inch, 1*inch])
-                stats_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#184da1')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 12),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                story.append(stats_table)
-            else:
-                story.append(Paragraph("No hay respuestas", normal_style))
-        
-        story.append(Spacer(1, 20))
+    return response
+
+@login_required
+def export_poll_csv(request, poll_id):
+    """Vista para exportar en CSV todas las respuestas individuales de una encuesta"""
+    if not request.user.rol or request.user.rol.name not in ['Administrador', 'Trabajador']:
+        return HttpResponseForbidden("No tienes permisos para exportar reportes.")
     
-    # Construir PDF
-    doc.build(story)
+    poll = get_object_or_404(Poll, id=poll_id)
+    # Incluye la cédula de cada participante: mismas encuestas que en estadísticas
+    if not can_view_statistics(request.user, poll):
+        return HttpResponseForbidden("Solo puedes exportar reportes de encuestas públicas.")
     
-    # Obtener contenido del buffer
-    pdf = buffer.getvalue()
-    buffer.close()
-    response.write(pdf)
+    response = StreamingHttpResponse(stream_poll_answers_csv(poll), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="Respuestas_{poll.title.replace(" ", "_")}.csv"'
+    return response
+
+@login_required
+def export_polls_zip(request):
+    """Vista para exportar en un ZIP los reportes PDF de las encuestas filtradas en estadísticas"""
+    if not request.user.rol or request.user.rol.name not in ['Administrador', 'Trabajador']:
+        return HttpResponseForbidden("No tienes permisos para exportar reportes.")
     
+    # Mismos filtros y permisos que el dashboard de estadísticas (Trabajador: solo públicas)
+    poll_ids = list(statistics_polls(request.user, request.GET).values_list('id', flat=True))
+    if not poll_ids:
+        messages.error(request, 'No hay encuestas que coincidan con los filtros.')
+        return redirect('dashboard:statistics')
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    response = StreamingHttpResponse(stream_reports_zip(poll_ids), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="Reportes_AIT_{timestamp}.zip"'
     return response
 
+@login_required
+def enqueue_poll_report(request, poll_id):
+    """Vista para solicitar la exportación a PDF en segundo plano"""
+    if not request.user.rol or request.user.rol.name not in ['Administrador', 'Trabajador']:
+        return JsonResponse({'success': False, 'error': 'No tienes permisos para exportar reportes.'}, status=403)
+    
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido.'}, status=405)
+    
+    poll = get_object_or_404(Poll, id=poll_id)
+    if not can_view_statistics(request.user, poll):
+        return JsonResponse({'success': False, 'error': 'Solo puedes exportar reportes de encuestas públicas.'}, status=403)
+    job = enqueue_report(poll, request.user)
+    
+    return JsonResponse({
+        'success': True,
+        'job_id': job.id,
+        'status_url': reverse('dashboard:export_job_status', args=[job.id]),
+    })
+
+def _get_report_job(request, job_id):
+    """Obtiene un trabajo de exportación visible para el usuario (propio o Administrador)"""
+    job = get_object_or_404(ReportJob, id=job_id)
+    if request.user.rol.name != 'Administrador' and job.requested_by_id != request.user.id:
+        return None
+    return job
+
+@login_required
+def report_job_status(request, job_id):
+    """Vista JSON con el progreso por pregunta de un trabajo de exportación"""
+    if not request.user.rol or request.user.rol.name not in ['Administrador', 'Trabajador']:
+        return JsonResponse({'success': False, 'error': 'No tienes permisos para exportar reportes.'}, status=403)
+    
+    job = _get_report_job(request, job_id)
+    if job is None:
+        return JsonResponse({'success': False, 'error': 'No tienes acceso a este reporte.'}, status=403)
+    
+    data = job_progress(job)
+    data['success'] = True
+    if job.status == ReportJob.Status.COMPLETADO:
+        data['download_url'] = reverse('dashboard:export_job_download', args=[job.id])
+    return JsonResponse(data)
+
+@login_required
+def download_report_job(request, job_id):
+    """Vista para descargar el PDF generado por un trabajo de exportación"""
+    if not request.user.rol or request.user.rol.name not in ['Administrador', 'Trabajador']:
+        return HttpResponseForbidden("No tienes permisos para exportar reportes.")
+    
+    job = _get_report_job(request, job_id)
+    if job is None:
+        return HttpResponseForbidden("No tienes acceso a este reporte.")
+    
+    if job.status != ReportJob.Status.COMPLETADO or not os.path.exists(job.file_path):
+        return HttpResponse("El reporte aún no está disponible.", status=404)
+    
+    filename = f'Reporte_{job.poll.title.replace(" ", "_")}.pdf'
+    return FileResponse(open(job.file_path, 'rb'), as_attachment=True, filename=filename, content_type='application/pdf')
+
 
 @login_required
 def manage_user(request, user_id):
@@ -1146,7 +1013,15 @@ def delete_user(request, user_id):
     
     if request.method == 'POST':
         username = usuario.username
-        usuario.delete()
+        # Las respuestas del usuario se eliminan en cascada: recalcular sus contadores
+        with transaction.atomic():
+            question_ids = list(
+                QuestionDetails.objects.filter(participation__user=usuario)
+                .values_list('question_id', flat=True).distinct()
+            )
+            usuario.delete()
+            rebuild_tallies(question_ids)
+            bump_results_version(Poll.objects.filter(preguntas__id__in=question_ids))
         
         return JsonResponse({
             'success': True,
@@ -1162,122 +1037,97 @@ def backup_manager(request):
     if not request.user.rol or request.user.rol.name != 'Administrador':
         return HttpResponseForbidden("Solo los administradores pueden gestionar respaldos.")
     
-    # Obtener información de respaldos existentes
-    backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-    backups = []
-    
-    if os.path.exists(backup_dir):
-        for filename in os.listdir(backup_dir):
-            if filename.endswith('.json'):
-                filepath = os.path.join(backup_dir, filename)
-                file_stats = os.stat(filepath)
-                backups.append({
-                    'filename': filename,
-                    'size': round(file_stats.st_size / 1024, 2),  # KB
-                    'date': datetime.fromtimestamp(file_stats.st_mtime)
-                })
-        backups.sort(key=lambda x: x['date'], reverse=True)
-    
+    # Todo sale del catálogo: no se abre ni se recorre ningún archivo de respaldo
     context = {
-        'backups': backups,
+        'backups': list_backups(),
+        'store_size': round(catalog_store_size() / 1024, 2),  # KB ocupados por el almacén
         'total_polls': Poll.objects.count(),
         'total_users': User.objects.count(),
         'total_participations': Participation.objects.count(),
+        'active_job': active_job(),
+        'jobs': BackupJob.objects.select_related('requested_by')[:15],
     }
     
     return render(request, 'posts/dashboard_backup.html', context)
 
+def _start_backup_job(request, kind, **options):
+    """Encola un trabajo de respaldo; avisa si ya hay otro en curso"""
+    try:
+        return start_backup_job(kind, user=request.user, **options)
+    except BackupJobBusy as e:
+        owner = e.job.requested_by.username if e.job and e.job.requested_by else 'otro proceso'
+        messages.warning(request, f'Ya hay un respaldo o restauración en curso (iniciado por {owner}). Espera a que termine.')
+        return None
+
 @login_required
 def download_backup(request):
-    """Vista para descargar respaldo de base de datos - Solo Administradores"""
+    """Vista para crear un respaldo y descargarlo al terminar - Solo Administradores"""
     if not request.user.rol or request.user.rol.name != 'Administrador':
         return HttpResponseForbidden("Solo los administradores pueden descargar respaldos.")
     
-    # Crear directorio de respaldos si no existe
-    backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-    os.makedirs(backup_dir, exist_ok=True)
-    
-    # Generar nombre de archivo con fecha y hora
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'backup_ait_{timestamp}.json'
-    filepath = os.path.join(backup_dir, filename)
-    
-    # Crear respaldo usando dumpdata
-    with open(filepath, 'w', encoding='utf-8') as f:
-        call_command(
-            'dumpdata',
-            '--exclude', 'contenttypes',
-            '--exclude', 'auth.permission',
-            '--exclude', 'sessions',
-            '--indent', 2,
-            stdout=f
-        )
+    # El respaldo se genera en segundo plano; la página descarga el archivo al terminar
+    if _start_backup_job(request, BackupJob.Kind.CREAR, download=True):
+        messages.info(request, 'Generando respaldo. La descarga comenzará al terminar.')
+    return redirect('dashboard:backup')
+
+@login_required
+def download_backup_file(request, filename):
+    """Vista para descargar un respaldo existente (admite descargas reanudables) - Solo Administradores"""
+    if not request.user.rol or request.user.rol.name != 'Administrador':
+        return HttpResponseForbidden("Solo los administradores pueden descargar respaldos.")
     
-    # Leer archivo y enviarlo como descarga
-    with open(filepath, 'rb') as f:
-        response = HttpResponse(f.read(), content_type='application/json')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if not backup_exists(filename):
+        messages.error(request, 'El archivo de respaldo no existe.')
+        return redirect('dashboard:backup')
     
-    messages.success(request, f'Respaldo creado exitosamente: {filename}')
-    return response
+    return backup_file_response(request, filename)
 
 @login_required
 def restore_backup(request, filename):
-    """Vista para restaurar respaldo de base de datos - Solo Administradores"""
+    """Vista para restaurar respaldo de base de datos en segundo plano - Solo Administradores"""
     if not request.user.rol or request.user.rol.name != 'Administrador':
         return HttpResponseForbidden("Solo los administradores pueden restaurar respaldos.")
     
     if request.method == 'POST':
-        backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-        filepath = os.path.join(backup_dir, filename)
-        
-        if not os.path.exists(filepath):
+        if not backup_exists(filename):
             messages.error(request, 'El archivo de respaldo no existe.')
             return redirect('dashboard:backup')
         
-        try:
-            # Restaurar usando loaddata
-            call_command('loaddata', filepath)
-            messages.success(request, f'Base de datos restaurada exitosamente desde: {filename}')
-        except Exception as e:
-            messages.error(request, f'Error al restaurar: {str(e)}')
+        entry = read_catalog().get(filename, {})
+        if entry.get('status') == STATUS_CORRUPT:
+            messages.error(request, f'El respaldo está dañado y no se puede restaurar: {entry["error"]}')
+            return redirect('dashboard:backup')
         
+        # Carga por lotes del respaldo (y de su cadena si es incremental) y reconstrucción de conteos e índices
+        if _start_backup_job(request, BackupJob.Kind.RESTAURAR, filename=filename):
+            messages.info(request, f'Restauración de {filename} en proceso.')
         return redirect('dashboard:backup')
     
     return HttpResponseForbidden("Método no permitido.")
 
 @login_required
 def create_backup(request):
-    """Vista para crear y guardar respaldo en el servidor - Solo Administradores"""
+    """Vista para crear y guardar respaldo en el servidor en segundo plano - Solo Administradores"""
     if not request.user.rol or request.user.rol.name != 'Administrador':
         return HttpResponseForbidden("Solo los administradores pueden crear respaldos.")
     
-    # Crear directorio de respaldos si no existe
-    backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-    os.makedirs(backup_dir, exist_ok=True)
-    
-    # Generar nombre de archivo con fecha y hora
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'backup_ait_{timestamp}.json'
-    filepath = os.path.join(backup_dir, filename)
-    
-    try:
-        # Crear respaldo usando dumpdata
-        with open(filepath, 'w', encoding='utf-8') as f:
-            call_command(
-                'dumpdata',
-                '--exclude', 'contenttypes',
-                '--exclude', 'auth.permission',
-                '--exclude', 'sessions',
-                '--indent', 2,
-                stdout=f
-            )
-        messages.success(request, f'Respaldo creado y guardado exitosamente: {filename}')
-    except Exception as e:
-        messages.error(request, f'Error al crear respaldo: {str(e)}')
-    
+    # JSON compacto escrito directamente en el archivo comprimido
+    incremental = request.GET.get('tipo') == 'incremental'
+    if _start_backup_job(request, BackupJob.Kind.CREAR, incremental=incremental):
+        messages.info(request, f'Respaldo {"incremental" if incremental else "completo"} en proceso.')
     return redirect('dashboard:backup')
 
+@login_required
+def backup_job_status(request, job_id):
+    """Vista JSON con el estado y progreso de un trabajo de respaldo - Solo Administradores"""
+    if not request.user.rol or request.user.rol.name != 'Administrador':
+        return JsonResponse({'success': False, 'error': 'Solo los administradores pueden gestionar respaldos.'}, status=403)
+    
+    job = get_object_or_404(BackupJob, id=job_id)
+    data = backup_job_progress(job)
+    data['success'] = True
+    return JsonResponse(data)
+
 @login_required
 def upload_backup(request):
     """Vista para subir respaldo externo - Solo Administradores"""
@@ -1288,21 +1138,20 @@ def upload_backup(request):
         backup_file = request.FILES['backup_file']
         
         # Validar extensión
-        if not backup_file.name.endswith('.json'):
-            messages.error(request, 'Solo se permiten archivos JSON.')
+        if not is_backup_filename(os.path.basename(backup_file.name)):
+            messages.error(request, 'Solo se permiten archivos JSON (.json, .json.gz o .json.xz).')
             return redirect('dashboard:backup')
         
-        # Crear directorio de respaldos si no existe
-        backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-        os.makedirs(backup_dir, exist_ok=True)
-        
-        # Guardar archivo
-        filepath = os.path.join(backup_dir, backup_file.name)
-        with open(filepath, 'wb+') as destination:
-            for chunk in backup_file.chunks():
-                destination.write(chunk)
+        # Guardar en el almacén por fragmentos (se descomprime para compartir fragmentos con otros respaldos)
+        try:
+            filename = save_uploaded_backup(backup_file)
+        except Exception as e:
+            messages.error(request, f'El archivo no es un respaldo válido: {str(e)}')
+            return redirect('dashboard:backup')
         
-        messages.success(request, f'Respaldo subido exitosamente: {backup_file.name}')
+        if filename != os.path.basename(backup_file.name):
+            messages.warning(request, f'Ya existía un respaldo con ese nombre; se guardó como {filename}.')
+        messages.success(request, f'Respaldo subido exitosamente: {filename}')
         return redirect('dashboard:backup')
     
     messages.error(request, 'No se proporcionó ningún archivo.')
@@ -1315,12 +1164,12 @@ def delete_backup(request, filename):
         return HttpResponseForbidden("Solo los administradores pueden eliminar respaldos.")
     
     if request.method == 'POST':
-        backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-        filepath = os.path.join(backup_dir, filename)
-        
-        if os.path.exists(filepath):
+        if active_job():
+            messages.error(request, 'No se pueden eliminar respaldos mientras hay un respaldo o restauración en curso.')
+        elif backup_exists(filename):
             try:
-                os.remove(filepath)
+                # Los fragmentos que solo usaba este respaldo se liberan
+                delete_backup_file(filename)
                 messages.success(request, f'Respaldo eliminado exitosamente: {filename}')
             except Exception as e:
                 messages.error(request, f'Error al eliminar respaldo: {str(e)}')